@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import List
+
 from fastapi import APIRouter, Depends, HTTPException
 
 from app.schemas.predict import PredictRequest
@@ -20,3 +22,15 @@ def predict_delay(
     except PredictionError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return wrap_response(prediction)
+
+
+@router.post("/predict/batch")
+def predict_delay_batch(
+    payloads: List[PredictRequest],
+    predictor: Predictor = Depends(get_predictor),
+) -> dict:
+    try:
+        predictions = predictor.predict_batch([payload.dict() for payload in payloads])
+    except PredictionError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return wrap_response({"items": predictions})
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.live_updates import HEARTBEAT_S, hub
+
+router = APIRouter(prefix="/api/v1", tags=["stream"])
+
+
+@router.get("/stream", summary="Server-sent live traffic, stats and model updates")
+async def stream_updates(
+    request: Request,
+    airport: Optional[str] = Query(None, min_length=3, max_length=4, description="Airport IATA/ICAO code; all airports if omitted"),
+) -> StreamingResponse:
+    airport = airport.upper() if airport else None
+    queue = hub.subscribe(airport)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            yield await asyncio.to_thread(hub.hello, airport)
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            hub.unsubscribe(airport, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -8,10 +8,26 @@ class Settings(BaseSettings):
     api_icn_passenger_base_url: str = Field("https://apis.data.go.kr/B551177/passgrAnncmt", env="API_ICN_PASSENGER_BASE_URL")
     api_icn_arrival_base_url: str = Field("https://apis.data.go.kr/B551177/StatusOfArrivals", env="API_ICN_ARRIVAL_BASE_URL")
     data_root: str = Field("data", env="DATA_ROOT")
+    ml_dir: str = Field("ml", env="ML_DIR")
     model_dir: str = Field("ml/artifacts/models", env="MODEL_DIR")
     metrics_path: str = Field("ml/artifacts/reports/metrics.json", env="METRICS_PATH")
+    # Bundles from ml/pipelines/05_export_artifacts.py; preferred over MODEL_DIR when present.
+    serving_dir: str = Field("ml/artifacts/serving", env="SERVING_DIR")
+    # Clean API store (scripts/run_ingestion.py, ingestion_daemon.py) feeding
+    # today's traffic counts into predictions; empty disables them.
+    live_clean_dir: str = Field("data/external/api_clean", env="LIVE_CLEAN_DIR")
+    live_refresh_s: float = Field(60.0, env="LIVE_REFRESH_S")
+    # Seconds between the update stream's change checks (/api/v1/stream).
+    stream_poll_s: float = Field(5.0, env="STREAM_POLL_S")
     train_table_path: str = Field("data/processed/train_table.parquet", env="TRAIN_TABLE_PATH")
-    default_model_name: str = Field("lightgbm", env="MODEL_NAME")
+    # Optional pushdown filters for the train table: comma-separated airport
+    # codes and the first flight date (YYYY-MM-DD) to load.
+    train_table_airports: str = Field("", env="TRAIN_TABLE_AIRPORTS")
+    train_table_start_date: str = Field("", env="TRAIN_TABLE_START_DATE")
+    # Empty: serve the model picked by training (model_selection.json),
+    # falling back to lightgbm.
+    default_model_name: str = Field("", env="MODEL_NAME")
+    model_selection_path: str = Field("ml/artifacts/reports/model_selection.json", env="MODEL_SELECTION_PATH")
     log_level: str = Field("INFO", env="LOG_LEVEL")
 
     class Config:
@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.logging import configure_logging, get_logger
 from app.api.v1 import api_router
+from app.services.live_updates import hub
 
 configure_logging(settings.log_level)
 logger = get_logger(__name__)
@@ -35,8 +36,14 @@ def health() -> dict[str, str]:
 
 
 @app.on_event("startup")
-def on_startup() -> None:
+async def on_startup() -> None:
     logger.info("API starting with data_root=%s model_dir=%s", settings.data_root, settings.model_dir)
+    hub.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await hub.stop()
 
 
 app.include_router(api_router)
@@ -2,22 +2,45 @@ from __future__ import annotations
 
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 
+from app.services.features import SlotLookup, read_table
+
 
 class DataRepository:
     """Provides access to processed training data for stats and inference."""
 
-    def __init__(self, table_path: Path) -> None:
+    def __init__(
+        self,
+        table_path: Path,
+        airports: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+    ) -> None:
         self.table_path = table_path
+        self.airports = airports
+        self.start_date = start_date
+        self.signature = self._signature()
         self._df = self._load()
+        self._index_latest()
+
+    def _signature(self) -> Tuple[int, int]:
+        """File count and newest mtime of the table; changes when it is rewritten."""
+        if not self.table_path.exists():
+            return (0, 0)
+        files = [self.table_path] if self.table_path.is_file() else list(self.table_path.rglob("*.parquet"))
+        return (len(files), max((f.stat().st_mtime_ns for f in files), default=0))
+
+    def is_stale(self) -> bool:
+        return self._signature() != self.signature
 
     def _load(self) -> pd.DataFrame:
         if not self.table_path.exists():
             raise FileNotFoundError(f"Train table not found at {self.table_path}")
-        df = pd.read_parquet(self.table_path)
+        # `table_path` may be a single file or the partitioned dataset; the
+        # airport/date filters are applied while reading.
+        df = read_table(self.table_path, airports=self.airports, start_date=self.start_date)
         df["flight_date"] = pd.to_datetime(df["flight_date"])
         if "airport_code" not in df.columns:
             df["airport_code"] = df["airport_name"]
@@ -29,7 +52,12 @@ class DataRepository:
         return self._df
 
     def refresh(self) -> None:
+        self.signature = self._signature()
         self._df = self._load()
+        self._index_latest()
+
+    def _index_latest(self) -> None:
+        self._lookup = SlotLookup.from_table(self._df)
 
     def _filter(
         self,
@@ -145,3 +173,7 @@ class DataRepository:
         if candidates.empty:
             candidates = df
         return candidates.sort_values("flight_date").iloc[-1]
+
+    def sample_record(self, airport_code: str, hour: int, weekday: int) -> Dict[str, Any]:
+        """Dict version of `sample_row` served from the precomputed index."""
+        return self._lookup.record(airport_code, hour, weekday)
@@ -1,24 +1,96 @@
 from __future__ import annotations
 
+import json
+import logging
+import threading
 from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 from app.core.config import settings
 from app.services.data_repository import DataRepository
+from app.services.features import SERVING_MANIFEST, LiveTraffic, load_feature_engine
 from app.services.model import Predictor
 
+FALLBACK_MODEL_NAME = "lightgbm"
+
 
 @lru_cache
 def get_repository() -> DataRepository:
-    return DataRepository(Path(settings.train_table_path))
+    airports = [code.strip() for code in settings.train_table_airports.split(",") if code.strip()]
+    return DataRepository(
+        Path(settings.train_table_path),
+        airports=airports or None,
+        start_date=settings.train_table_start_date or None,
+    )
+
+
+def resolve_model_name() -> str:
+    """MODEL_NAME if set, else the model chosen by training's selection rule."""
+    if settings.default_model_name:
+        return settings.default_model_name
+    try:
+        selected = json.loads(Path(settings.model_selection_path).read_text()).get("selected")
+    except (OSError, ValueError):
+        selected = None
+    if not selected:
+        logging.info("No model selection found; serving %s", FALLBACK_MODEL_NAME)
+    return selected or FALLBACK_MODEL_NAME
 
 
 @lru_cache
-def get_predictor() -> Predictor:
-    repo = get_repository()
+def get_live_traffic() -> Optional[LiveTraffic]:
+    if not settings.live_clean_dir:
+        return None
+    live = LiveTraffic(
+        Path(settings.live_clean_dir),
+        airport_code=load_feature_engine().standardize_airport,
+        refresh_s=settings.live_refresh_s,
+    )
+    live.refresh(force=True)
+    return live
+
+
+def model_version() -> str:
+    """Served model name plus its bundle version (or model file mtime); changes on re-export or retrain."""
+    name = resolve_model_name()
+    manifest = Path(settings.serving_dir) / name / SERVING_MANIFEST
+    if manifest.exists():
+        return f"{name}:{json.loads(manifest.read_text()).get('version')}"
+    model_path = Path(settings.model_dir) / f"{name}.joblib"
+    return f"{name}:{model_path.stat().st_mtime_ns if model_path.exists() else 'missing'}"
+
+
+def build_predictor() -> Predictor:
     return Predictor(
-        repository=repo,
+        repository=get_repository(),
         model_dir=Path(settings.model_dir),
-        model_name=settings.default_model_name,
+        model_name=resolve_model_name(),
         metrics_path=Path(settings.metrics_path),
+        serving_dir=Path(settings.serving_dir),
+        live=get_live_traffic(),
     )
+
+
+# Not lru_cache'd: a new model version swaps the instance in place.
+_predictor: Optional[Predictor] = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor() -> Predictor:
+    global _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            _predictor = build_predictor()
+        return _predictor
+
+
+def reload_predictor() -> Optional[Predictor]:
+    """Swap in a predictor for the current model; requests keep the old one until it is built."""
+    global _predictor
+    if _predictor is None:
+        return None
+    predictor = build_predictor()
+    with _predictor_lock:
+        _predictor = predictor
+    return predictor
@@ -0,0 +1,38 @@
+"""Exposes the shared feature engine (`ml/feature_engine.py`), train table
+reader (`ml/table_io.py`), serving bundle loader (`ml/serving_bundle.py`) and
+live traffic counts (`ml/live_traffic.py`) to the API."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from app.core.config import settings
+
+_ML_DIR = str(Path(settings.ml_dir).resolve())
+if _ML_DIR not in sys.path:
+    sys.path.append(_ML_DIR)
+
+from feature_engine import (  # noqa: E402
+    FeatureEncoder,
+    FeatureEngine,
+    check_encoder_parity,
+    load_feature_engine,
+)
+from live_traffic import LiveTraffic  # noqa: E402
+from serving_bundle import MANIFEST as SERVING_MANIFEST  # noqa: E402
+from serving_bundle import ServingBundle, SlotLookup, load_serving_bundle  # noqa: E402
+from table_io import read_table  # noqa: E402
+
+__all__ = [
+    "FeatureEncoder",
+    "FeatureEngine",
+    "LiveTraffic",
+    "SERVING_MANIFEST",
+    "ServingBundle",
+    "SlotLookup",
+    "check_encoder_parity",
+    "load_feature_engine",
+    "load_serving_bundle",
+    "read_table",
+]
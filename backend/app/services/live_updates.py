@@ -0,0 +1,184 @@
+"""
+In-process fan-out of dashboard updates over server-sent events.
+
+One watcher task checks every `stream_poll_s` seconds, whatever the number
+of clients:
+
+- live traffic (`LiveTraffic`): counters moved by newly ingested records
+  become `traffic` events with only the changed hours;
+- the train table: when its files change, the repository reloads and every
+  airport with subscribers gets one `stats` event holding the changed
+  hourly/timeseries rows and airport stat fields;
+- the served model: a new bundle version or retrained file swaps the
+  predictor and emits a `model` event.
+
+Each delta is computed and encoded once per topic. The same message goes on
+the queue of every subscriber of that topic. A client whose queue fills up is
+disconnected; `EventSource` reconnects and the dashboard refetches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.data_repository import DataRepository
+from app.services.dependencies import get_live_traffic, get_repository, model_version, reload_predictor
+
+# Subscribers without an airport: all-airport stats and every airport's traffic.
+ALL_AIRPORTS = "*"
+# Messages a slow client may fall behind before it is dropped.
+QUEUE_SIZE = 64
+HEARTBEAT_S = 15.0
+# Client reconnect delay sent with the first message, in milliseconds.
+RETRY_MS = 3000
+
+Message = Tuple[Optional[str], str, Dict[str, Any]]
+
+
+def encode(event: str, data: Dict[str, Any], event_id: int) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+def stats_snapshot(repo: DataRepository, airport: str) -> Dict[str, Any]:
+    """What the dashboard fetches for `airport`, keyed for diffing."""
+    code = None if airport == ALL_AIRPORTS else airport
+    snapshot: Dict[str, Any] = {
+        "hourly": {row["hour"]: row for row in repo.hourly_stats(code)},
+        "timeseries": {row["date"]: row for row in repo.timeseries_stats(code)},
+        "airport_stats": {},
+    }
+    if code is not None:
+        try:
+            snapshot["airport_stats"] = repo.airport_stats(code, None, None)
+        except ValueError:
+            pass
+    return snapshot
+
+
+def stats_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Rows and fields of `after` that differ from `before`, plus removed keys."""
+    delta: Dict[str, Any] = {}
+    for part in ("hourly", "timeseries"):
+        changed = [row for key, row in after[part].items() if before[part].get(key) != row]
+        removed = [key for key in before[part] if key not in after[part]]
+        if changed:
+            delta[part] = changed
+        if removed:
+            delta[f"{part}_removed"] = removed
+    fields = {k: v for k, v in after["airport_stats"].items() if before["airport_stats"].get(k) != v}
+    if fields:
+        delta["airport_stats"] = fields
+    return delta
+
+
+class UpdateHub:
+    def __init__(self, poll_s: float) -> None:
+        self.poll_s = poll_s
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.sequence = 0
+        self.model_version: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self, airport: Optional[str]) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[airport or ALL_AIRPORTS].add(queue)
+        return queue
+
+    def unsubscribe(self, airport: Optional[str], queue: asyncio.Queue) -> None:
+        topic = airport or ALL_AIRPORTS
+        self.subscribers[topic].discard(queue)
+        if not self.subscribers[topic]:
+            del self.subscribers[topic]
+
+    def hello(self, airport: Optional[str]) -> str:
+        """First message of a stream: the state deltas will apply to; blocking, like `collect`."""
+        data: Dict[str, Any] = {"airport": airport or ALL_AIRPORTS, "model": self.model_version}
+        live = get_live_traffic()
+        if airport and live is not None:
+            today = live.now().date()
+            counts = live.day_counts_of(airport, today)
+            if counts["daily_flights"]:
+                data["traffic"] = {"airport": airport, "date": today.isoformat(), **counts}
+        return f"retry: {RETRY_MS}\n" + encode("hello", data, self.sequence)
+
+    def publish(self, topic: Optional[str], event: str, data: Dict[str, Any]) -> int:
+        """Queue one encoded message for every subscriber of `topic` (None: everyone)."""
+        self.sequence += 1
+        message = encode(event, data, self.sequence)
+        if topic is None:
+            targets = [q for queues in self.subscribers.values() for q in queues]
+        else:
+            targets = list(self.subscribers.get(topic, ()))
+            if event == "traffic" and topic != ALL_AIRPORTS:
+                targets += self.subscribers.get(ALL_AIRPORTS, ())
+        for queue in targets:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind for deltas to make sense; the stream ends and the client resyncs.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+        return len(targets)
+
+    def collect(self, topics: List[str]) -> List[Message]:
+        """Detect changes and build their deltas; blocking, so it runs in a worker thread."""
+        messages: List[Message] = []
+        live = get_live_traffic()
+        if live is not None:
+            live.refresh()
+            for (airport, day), entry in live.drain_changes().items():
+                messages.append((airport, "traffic", {"airport": airport, "date": day.isoformat(), **entry}))
+
+        repo = get_repository()
+        if repo.is_stale():
+            before = {topic: stats_snapshot(repo, topic) for topic in topics}
+            repo.refresh()
+            logging.info("Train table reloaded (%d rows)", len(repo.df))
+            for topic in topics:
+                delta = stats_delta(before[topic], stats_snapshot(repo, topic))
+                if delta:
+                    messages.append((topic, "stats", {"airport": topic, **delta}))
+
+        version = model_version()
+        if version != self.model_version:
+            if self.model_version is not None:
+                predictor = reload_predictor()
+                logging.info("Serving model %s", version)
+                data: Dict[str, Any] = {"model": version}
+                if predictor is not None:
+                    data["threshold"] = predictor.threshold
+                messages.append((None, "model", data))
+            self.model_version = version
+        return messages
+
+    async def watch(self) -> None:
+        while True:
+            try:
+                messages = await asyncio.to_thread(self.collect, list(self.subscribers))
+                for topic, event, data in messages:
+                    self.publish(topic, event, data)
+            except Exception:  # the watcher must outlive a bad reload
+                logging.exception("Live update check failed")
+            await asyncio.sleep(self.poll_s)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.watch())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+hub = UpdateHub(settings.stream_poll_s)
@@ -2,14 +2,32 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence
 
 import joblib
-import numpy as np
-import pandas as pd
-from sklearn.base import BaseEstimator
 
 from app.services.data_repository import DataRepository
+from app.services.features import (
+    SERVING_MANIFEST,
+    FeatureEncoder,
+    LiveTraffic,
+    SlotLookup,
+    check_encoder_parity,
+    load_feature_engine,
+    load_serving_bundle,
+)
+
+# Payload fields copied onto the base row verbatim.
+OVERRIDE_FIELDS = [
+    "airport_hour_flights",
+    "daily_flights",
+    "airport_daily_avg_flights",
+]
+# Rows of the train table re-encoded at startup to check serving parity.
+PARITY_SAMPLE_ROWS = 256
+# Live counts replace the base row's once today's feed holds this share of the
+# airport's average daily flights.
+LIVE_MIN_DAILY_SHARE = 0.5
 
 
 class PredictionError(Exception):
@@ -23,19 +41,64 @@ class Predictor:
         model_dir: Path,
         model_name: str,
         metrics_path: Path,
+        serving_dir: Optional[Path] = None,
+        live: Optional[LiveTraffic] = None,
     ) -> None:
         self.repository = repository
+        self.features = load_feature_engine()
+        # Today's traffic from the clean API store replaces the base row's
+        # congestion features when the request is for today.
+        self.live = live
+        # Base rows come from the serving bundle when there is one, else from
+        # the train table loaded by the repository.
+        self.lookup: Optional[SlotLookup] = None
+        if serving_dir is not None and (serving_dir / model_name / SERVING_MANIFEST).exists():
+            self._load_serving(serving_dir / model_name)
+            return
         self.model_path = model_dir / f"{model_name}.joblib"
         if not self.model_path.exists():
             raise FileNotFoundError(f"Model file not found at {self.model_path}")
         bundle = joblib.load(self.model_path)
-        self.model: BaseEstimator = bundle["model"]
-        self.preprocessor = bundle["preprocessor"]
-        self.feature_list = getattr(self.preprocessor, "feature_list_", None)
+        self.model: Any = bundle["model"]
+        # Out-of-core bundles ship their FeatureEncoder instead of a sklearn
+        # preprocessor; there is nothing to check parity against.
+        self.preprocessor = bundle.get("preprocessor")
+        # "encoded": one-hot matrix; "native" (CatBoost): imputed numerics plus
+        # string categoricals; "coded" (out-of-core LightGBM): float32 codes.
+        self.input_format = bundle.get("input_format", "encoded")
+        self.encoder = FeatureEncoder.from_bundle(bundle)
+        self.feature_list = self.encoder.feature_list
         if not self.feature_list:
             raise PredictionError("Preprocessor feature list is missing.")
+        self.transform_records = self.encoder.records_transform(self.input_format)
+        if self.preprocessor is not None:
+            self._check_parity()
         self.threshold = self._load_threshold(metrics_path, model_name)
 
+    def _load_serving(self, directory: Path) -> None:
+        """Model, encoder, threshold and base rows from `05_export_artifacts.py` output.
+
+        The export already checked the bundle against the joblib model, so the
+        sklearn preprocessor is neither needed nor loaded.
+        """
+        bundle = load_serving_bundle(directory)
+        self.model_path = directory
+        self.model = bundle.model
+        self.preprocessor = None
+        self.input_format = bundle.input_format
+        self.encoder = bundle.encoder
+        self.feature_list = self.encoder.feature_list
+        self.transform_records = self.encoder.records_transform(self.input_format)
+        self.threshold = bundle.threshold
+        self.lookup = bundle.lookup
+
+    def _check_parity(self) -> None:
+        sample = self.repository.df.tail(PARITY_SAMPLE_ROWS)
+        try:
+            check_encoder_parity(self.preprocessor, self.encoder, sample)
+        except ValueError as exc:
+            raise PredictionError(str(exc)) from exc
+
     @staticmethod
     def _load_threshold(metrics_path: Path, model_name: str) -> float:
         if not metrics_path.exists():
@@ -46,38 +109,45 @@ class Predictor:
         except Exception:
             return 0.5
 
-    def _build_feature_row(self, payload: Dict[str, Any]) -> pd.DataFrame:
+    def _build_feature_record(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         airport_code = payload["airport"].upper()
         hour = payload["hour"]
         weekday = payload["weekday"]
-        base_row = self.repository.sample_row(airport_code, hour, weekday)
-        row = base_row.copy()
-        row["airport_code"] = airport_code
-        row["hour"] = hour
-        row["weekday"] = weekday
-        row["month"] = payload.get("month") or row["month"]
+        if self.lookup is not None:
+            record = self.lookup.record(airport_code, hour, weekday)
+        else:
+            record = self.repository.sample_record(airport_code, hour, weekday)
+        record["airport_code"] = airport_code
+        record["hour"] = hour
+        record["weekday"] = weekday
+        record["month"] = payload.get("month") or record.get("month")
+        if self.live is not None:
+            min_daily = LIVE_MIN_DAILY_SHARE * float(record.get("airport_daily_avg_flights") or 0.0)
+            record.update(self.live.slot(airport_code, hour, weekday, payload.get("month"), min_daily=max(min_daily, 1.0)) or {})
         if "congestion_ratio" in payload and payload["congestion_ratio"] is not None:
-            row["hourly_congestion_ratio"] = payload["congestion_ratio"]
-        for field in [
-            "airport_hour_flights",
-            "daily_flights",
-            "airport_daily_avg_flights",
-        ]:
+            record["hourly_congestion_ratio"] = payload["congestion_ratio"]
+        for field in OVERRIDE_FIELDS:
             if payload.get(field) is not None:
-                row[field] = payload[field]
-        frame = pd.DataFrame([row])
-        missing_cols = set(self.feature_list) - set(frame.columns)
-        for col in missing_cols:
-            frame[col] = np.nan
-        frame = frame[self.feature_list]
-        return frame
+                record[field] = payload[field]
+        return record
+
+    def predict_batch(self, payloads: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not payloads:
+            return []
+        records = [self._build_feature_record(payload) for payload in payloads]
+        # Derived columns (e.g. is_weekend) follow the requested slot; the slot
+        # keys themselves come from the payload.
+        self.features.apply_records(records, "train_table", fixed=["airport_code", "hour", "weekday", "month"])
+        encoded = self.transform_records(records)
+        probabilities = self.model.predict_proba(encoded)[:, 1]
+        return [
+            {
+                "delay_probability": float(proba),
+                "predicted_label": int(proba >= self.threshold),
+                "threshold": self.threshold,
+            }
+            for proba in probabilities
+        ]
 
     def predict(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        features = self._build_feature_row(payload)
-        transformed = self.preprocessor.transform(features)
-        proba = self.model.predict_proba(transformed)[:, 1][0]
-        return {
-            "delay_probability": float(proba),
-            "predicted_label": int(proba >= self.threshold),
-            "threshold": self.threshold,
-        }
+        return self.predict_batch([payload])[0]
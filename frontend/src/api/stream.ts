@@ -0,0 +1,67 @@
+import { API_BASE_URL, withQuery } from "./client";
+import { LiveTraffic, ModelUpdate, StatsDelta } from "../types/stats";
+
+export interface LiveUpdateHandlers {
+  onTraffic?: (traffic: LiveTraffic) => void;
+  onStats?: (delta: StatsDelta) => void;
+  onModel?: (update: ModelUpdate) => void;
+  // The stream reconnected: deltas were missed, refetch the full payload.
+  onResync?: () => void;
+}
+
+// One EventSource per view; the server fans a single change feed out to all of them.
+export function subscribeLiveUpdates(airport: string, handlers: LiveUpdateHandlers) {
+  const source = new EventSource(`${API_BASE_URL}/api/v1/stream${withQuery({ airport })}`);
+  let connected = false;
+
+  source.addEventListener("hello", (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    if (data.traffic) handlers.onTraffic?.(data.traffic);
+    if (connected) handlers.onResync?.();
+    connected = true;
+  });
+  source.addEventListener("traffic", (event) => {
+    handlers.onTraffic?.(JSON.parse((event as MessageEvent).data));
+  });
+  source.addEventListener("stats", (event) => {
+    handlers.onStats?.(JSON.parse((event as MessageEvent).data));
+  });
+  source.addEventListener("model", (event) => {
+    handlers.onModel?.(JSON.parse((event as MessageEvent).data));
+  });
+
+  return () => source.close();
+}
+
+export function mergeRows<T, K extends keyof T>(
+  rows: T[],
+  changed: T[] | undefined,
+  removed: T[K][] | undefined,
+  key: K
+): T[] {
+  if (!changed?.length && !removed?.length) return rows;
+  const merged = new Map(rows.map((row) => [row[key], row]));
+  removed?.forEach((value) => merged.delete(value));
+  changed?.forEach((row) => merged.set(row[key], row));
+  return Array.from(merged.values()).sort((a, b) => (a[key] < b[key] ? -1 : a[key] > b[key] ? 1 : 0));
+}
+
+// Live counts are dated in Korea time, like the ingested schedules.
+export function seoulToday() {
+  return new Intl.DateTimeFormat("en-CA", { timeZone: "Asia/Seoul" }).format(new Date());
+}
+
+export function seoulHour() {
+  return Number(
+    new Intl.DateTimeFormat("en-GB", { timeZone: "Asia/Seoul", hour: "2-digit", hourCycle: "h23" }).format(new Date())
+  );
+}
+
+// Traffic events carry only the hours that moved; fold today's into the last known state.
+export function mergeTraffic(current: LiveTraffic | null, update: LiveTraffic): LiveTraffic | null {
+  if (update.date !== seoulToday()) return current;
+  if (!current || current.airport !== update.airport || current.date !== update.date) {
+    return update;
+  }
+  return { ...update, hours: { ...current.hours, ...update.hours } };
+}
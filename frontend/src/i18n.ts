@@ -43,7 +43,9 @@ const translations = {
         peakDelayHour: "Peak Delay Hour",
         throughput: "Runway Throughput",
         throughputValue: "74 ops/hr",
-        throughputSubtitle: "Derived from historical operations"
+        throughputSubtitle: "Derived from historical operations",
+        liveFlights: "Today's Flights (live)",
+        liveFlightsSubtitle: "{count} in the current hour"
       }
     },
     detail: {
@@ -159,7 +161,9 @@ const translations = {
         peakDelayHour: "최대 지연 시간대",
         throughput: "활주로 처리량",
         throughputValue: "시간당 74회",
-        throughputSubtitle: "과거 운항 이력 기반 추정"
+        throughputSubtitle: "과거 운항 이력 기반 추정",
+        liveFlights: "오늘 운항 편수 (실시간)",
+        liveFlightsSubtitle: "현재 시간대 {count}편"
       }
     },
     detail: {
@@ -3,6 +3,7 @@ import Loader from "../components/Loader";
 import ErrorState from "../components/ErrorState";
 import PageLayout from "../components/PageLayout";
 import { fetchHourlyStats, fetchTimeseriesStats } from "../api/stats";
+import { mergeRows, subscribeLiveUpdates } from "../api/stream";
 import { HourlyStat, TimeseriesPoint } from "../types/stats";
 import { useTranslation } from "../i18n";
 
@@ -23,6 +24,8 @@ const AirportDetail: React.FC<AirportDetailProps> = ({ airport }) => {
   const [timeline, setTimeline] = useState<TimeseriesPoint[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Bumped when the live stream missed deltas, to refetch everything.
+  const [resyncs, setResyncs] = useState(0);
 
   useEffect(() => {
     let mounted = true;
@@ -42,7 +45,19 @@ const AirportDetail: React.FC<AirportDetailProps> = ({ airport }) => {
     return () => {
       mounted = false;
     };
-  }, [airport, t.common.errorDetail]);
+  }, [airport, resyncs, t.common.errorDetail]);
+
+  useEffect(
+    () =>
+      subscribeLiveUpdates(airport, {
+        onStats: (delta) => {
+          setHourly((rows) => mergeRows(rows, delta.hourly, delta.hourly_removed, "hour"));
+          setTimeline((rows) => mergeRows(rows, delta.timeseries, delta.timeseries_removed, "date"));
+        },
+        onResync: () => setResyncs((count) => count + 1)
+      }),
+    [airport]
+  );
 
   if (loading) {
     return <Loader label={t.common.loadingDetail} />;
@@ -14,7 +14,8 @@ import ErrorState from "../components/ErrorState";
 import StatCard from "../components/StatCard";
 import PageLayout from "../components/PageLayout";
 import { fetchAirportStats, fetchHourlyStats, fetchTimeseriesStats } from "../api/stats";
-import { AirportStats, HourlyStat, TimeseriesPoint } from "../types/stats";
+import { mergeRows, mergeTraffic, seoulHour, subscribeLiveUpdates } from "../api/stream";
+import { AirportStats, HourlyStat, LiveTraffic, TimeseriesPoint } from "../types/stats";
 import { useTranslation } from "../i18n";
 
 interface DashboardProps {
@@ -28,6 +29,9 @@ const Dashboard: React.FC<DashboardProps> = ({ airport }) => {
   const [timeline, setTimeline] = useState<TimeseriesPoint[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [liveTraffic, setLiveTraffic] = useState<LiveTraffic | null>(null);
+  // Bumped when the live stream missed deltas, to refetch everything.
+  const [resyncs, setResyncs] = useState(0);
 
   useEffect(() => {
     let mounted = true;
@@ -52,7 +56,24 @@ const Dashboard: React.FC<DashboardProps> = ({ airport }) => {
     return () => {
       mounted = false;
     };
-  }, [airport, t.common.errorDashboard]);
+  }, [airport, resyncs, t.common.errorDashboard]);
+
+  useEffect(() => {
+    setLiveTraffic(null);
+    return subscribeLiveUpdates(airport, {
+      onTraffic: (update) => setLiveTraffic((current) => mergeTraffic(current, update)),
+      onStats: (delta) => {
+        if (delta.airport_stats) {
+          setAirportStats((current) => (current ? { ...current, ...delta.airport_stats } : current));
+        }
+        setHourly((rows) => mergeRows(rows, delta.hourly, delta.hourly_removed, "hour"));
+        setTimeline((rows) =>
+          mergeRows(rows, delta.timeseries, delta.timeseries_removed, "date").slice(-14)
+        );
+      },
+      onResync: () => setResyncs((count) => count + 1)
+    });
+  }, [airport]);
 
   const statCards = useMemo(() => {
     if (!airportStats) return [];
@@ -71,13 +92,22 @@ const Dashboard: React.FC<DashboardProps> = ({ airport }) => {
         value: airportStats.peak_hour !== null ? `${airportStats.peak_hour}:00` : "-",
         subtitle: `${airportStats.from_date} → ${airportStats.to_date}`
       },
-      {
-        title: statText.throughput,
-        value: statText.throughputValue,
-        subtitle: statText.throughputSubtitle
-      }
+      liveTraffic
+        ? {
+            title: statText.liveFlights,
+            value: liveTraffic.daily_flights.toLocaleString(),
+            subtitle: statText.liveFlightsSubtitle.replace(
+              "{count}",
+              String(liveTraffic.hours[String(seoulHour())] ?? 0)
+            )
+          }
+        : {
+            title: statText.throughput,
+            value: statText.throughputValue,
+            subtitle: statText.throughputSubtitle
+          }
     ];
-  }, [airportStats, t.dashboard.statCards]);
+  }, [airportStats, liveTraffic, t.dashboard.statCards]);
 
   if (loading) {
     return <Loader label={t.common.loadingDashboard} />;
@@ -24,3 +24,24 @@ export interface ApiResponseEnvelope<T> {
   data: T;
   meta: { request_id: string };
 }
+
+export interface LiveTraffic {
+  airport: string;
+  date: string;
+  daily_flights: number;
+  hours: Record<string, number>;
+}
+
+export interface StatsDelta {
+  airport: string;
+  airport_stats?: Partial<AirportStats>;
+  hourly?: HourlyStat[];
+  hourly_removed?: number[];
+  timeseries?: TimeseriesPoint[];
+  timeseries_removed?: string[];
+}
+
+export interface ModelUpdate {
+  model: string;
+  threshold?: number;
+}
@@ -0,0 +1,252 @@
+"""
+Partitioned, upserting store for the cleaned API records of `scripts/run_ingestion.py`.
+
+    <root>/source=kac_status/date=2025-12-15/delta-20251215T162049Z-1a2b3c4d.parquet
+    <root>/source=kac_status/date=2025-12-15/part-20251216T031500Z-5e6f7a8b.parquet
+
+Every fetch appends its records as one small delta file per event date. Each
+row carries:
+
+- `record_key`: the source's primary key fields joined, or a hash of the whole
+  record when the source has no key or a key field is missing;
+- `event_time`: naive Korea time from the source's time fields, or the fetch
+  time when they are missing or unparseable;
+- `fetched_at`: the poll's UTC timestamp (`YYYYMMDDTHHMMSSZ`).
+
+A key's latest fetch wins. `read_records` applies that upsert on read, so
+appends never rewrite old files. `compact` rewrites the files of a partition
+into one file sorted by `event_time` in sized row groups and drops superseded
+rows. A time-range read only opens the date directories in range, and within
+them pyarrow skips row groups by their `event_time` statistics.
+
+Record fields are stored as strings, as the APIs deliver them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+KEY_COLUMN = "record_key"
+EVENT_COLUMN = "event_time"
+FETCHED_COLUMN = "fetched_at"
+SYSTEM_COLUMNS = [KEY_COLUMN, EVENT_COLUMN, FETCHED_COLUMN]
+FETCHED_FORMAT = "%Y%m%dT%H%M%SZ"
+# The APIs report local times; fetch times are converted to match.
+EVENT_TZ = "Asia/Seoul"
+DELTA_PREFIX = "delta-"
+PART_PREFIX = "part-"
+# A partition is compacted once it holds this many files.
+COMPACT_MIN_FILES = 16
+ROW_GROUP_SIZE = 64 * 1024
+KEY_SEPARATOR = "\x1f"
+
+DateLike = Union[str, date, pd.Timestamp]
+
+
+def partition_dir(root: Path, source: str, day: DateLike) -> Path:
+    return Path(root) / f"source={source}" / f"date={pd.Timestamp(day):%Y-%m-%d}"
+
+
+def _fetch_time(fetched_at: str) -> pd.Timestamp:
+    return pd.Timestamp(pd.to_datetime(fetched_at, format=FETCHED_FORMAT, utc=True)).tz_convert(EVENT_TZ).tz_localize(None)
+
+
+def _record_hash(record: Mapping[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def _field_keys(frame: pd.DataFrame, primary_key: Optional[Sequence[str]]) -> Optional[pd.Series]:
+    if not primary_key or not all(field in frame.columns for field in primary_key):
+        return None
+    parts = frame[list(primary_key)].fillna("")
+    return parts.iloc[:, 0].str.cat([parts[c] for c in parts.columns[1:]], sep=KEY_SEPARATOR)
+
+
+def _field_times(frame: pd.DataFrame, event_time: Optional[Mapping[str, Any]]) -> Optional[pd.Series]:
+    if not event_time or not all(field in frame.columns for field in event_time["fields"]):
+        return None
+    fields = list(event_time["fields"])
+    text = frame[fields[0]].str.cat([frame[f] for f in fields[1:]]) if len(fields) > 1 else frame[fields[0]]
+    return pd.to_datetime(text, format=event_time["format"], errors="coerce")
+
+
+def prepare_records(
+    records: Sequence[Mapping[str, Any]],
+    fetched_at: str,
+    primary_key: Optional[Sequence[str]] = None,
+    event_time: Optional[Mapping[str, Any]] = None,
+) -> pd.DataFrame:
+    """Frame of string record fields plus `record_key`, `event_time` and `fetched_at`.
+
+    `event_time` is `{"fields": [...], "format": "%Y%m%d%H%M"}`: the fields are
+    concatenated and parsed with the format.
+    """
+    frame = pd.DataFrame.from_records(records)
+    frame = frame.drop(columns=[c for c in SYSTEM_COLUMNS if c in frame.columns])
+    frame = frame.astype("string")
+    keys = _field_keys(frame, primary_key)
+    if keys is None:
+        keys = pd.Series([_record_hash(record) for record in records], index=frame.index, dtype="string")
+
+    fallback = _fetch_time(fetched_at)
+    times = _field_times(frame, event_time)
+    times = pd.Series(fallback, index=frame.index) if times is None else times.fillna(fallback)
+    frame[KEY_COLUMN] = keys
+    frame[EVENT_COLUMN] = times.astype("datetime64[us]")
+    frame[FETCHED_COLUMN] = fetched_at
+    return frame
+
+
+def from_fields(frame: pd.DataFrame, primary_key: Sequence[str], event_time: Mapping[str, Any]) -> pd.Series:
+    """Rows whose `record_key` and `event_time` came from these fields, not from the hash or fetch-time fallbacks."""
+    keys = _field_keys(frame.astype({f: "string" for f in primary_key if f in frame.columns}), primary_key)
+    times = _field_times(frame.astype({f: "string" for f in event_time["fields"] if f in frame.columns}), event_time)
+    if keys is None or times is None:
+        return pd.Series(False, index=frame.index)
+    present = frame[list(primary_key)].notna().all(axis=1)
+    return present & (keys == frame[KEY_COLUMN]).fillna(False) & (times == frame[EVENT_COLUMN]).fillna(False)
+
+
+def _write(table: pa.Table, path: Path, row_group_size: int = ROW_GROUP_SIZE) -> None:
+    """Write through a temp name so readers never open a partial file."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp, row_group_size=row_group_size, write_statistics=True)
+    os.replace(tmp, path)
+
+
+def _to_table(frame: pd.DataFrame) -> pa.Table:
+    fields = [pa.field(c, pa.timestamp("us") if c == EVENT_COLUMN else pa.string()) for c in frame.columns]
+    return pa.Table.from_pandas(frame, schema=pa.schema(fields), preserve_index=False)
+
+
+def append_records(root: Path, source: str, frame: pd.DataFrame) -> List[Path]:
+    """Append prepared records as one delta file per event date."""
+    if frame.empty:
+        return []
+    paths = []
+    fetched_at = frame[FETCHED_COLUMN].iloc[0]
+    for day, rows in frame.groupby(frame[EVENT_COLUMN].dt.normalize(), sort=True):
+        directory = partition_dir(root, source, day)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{DELTA_PREFIX}{fetched_at}-{uuid.uuid4().hex[:8]}.parquet"
+        _write(_to_table(rows.sort_values(EVENT_COLUMN, kind="stable")), path)
+        paths.append(path)
+    return paths
+
+
+def partition_dirs(root: Path, source: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> List[Path]:
+    """Date directories of `source` that can hold events in [start, end)."""
+    source_dir = Path(root) / f"source={source}"
+    if not source_dir.is_dir():
+        return []
+    first = f"date={pd.Timestamp(start):%Y-%m-%d}" if start is not None else None
+    last = f"date={pd.Timestamp(end):%Y-%m-%d}" if end is not None else None
+    dirs = []
+    for path in sorted(source_dir.iterdir()):
+        # ISO dates compare correctly as strings.
+        if not path.name.startswith("date=") or (first and path.name < first) or (last and path.name > last):
+            continue
+        dirs.append(path)
+    return dirs
+
+
+def _data_files(directory: Path) -> List[Path]:
+    return sorted(p for p in directory.iterdir() if p.suffix == ".parquet" and not p.name.startswith("."))
+
+
+def data_files(root: Path, source: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> List[Path]:
+    """Delta and part files of the date directories `partition_dirs` selects."""
+    return [f for directory in partition_dirs(root, source, start, end) for f in _data_files(directory)]
+
+
+def latest_records(frame: pd.DataFrame) -> pd.DataFrame:
+    """Keep the most recently fetched row of each `record_key`, ordered by `event_time`."""
+    frame = frame.sort_values(FETCHED_COLUMN, kind="stable").drop_duplicates(KEY_COLUMN, keep="last")
+    return frame.sort_values([EVENT_COLUMN, KEY_COLUMN], kind="stable", ignore_index=True)
+
+
+def read_files(files: Sequence[Path], columns: Optional[Sequence[str]] = None, expression: Optional[ds.Expression] = None) -> pd.DataFrame:
+    """Rows of `files` as stored, without the upsert; `columns` missing from a file read as nulls."""
+    # Sources add fields over time; every field is a string, so the union is the schema.
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files])
+    if columns is not None:
+        wanted = list(dict.fromkeys([*columns, *SYSTEM_COLUMNS]))
+        schema = pa.schema([schema.field(c) if c in schema.names else pa.field(c, pa.string()) for c in wanted])
+    dataset = ds.dataset([str(f) for f in files], format="parquet", schema=schema)
+    return dataset.to_table(filter=expression).to_pandas()
+
+
+def read_records(
+    root: Path,
+    source: str,
+    start: Optional[DateLike] = None,
+    end: Optional[DateLike] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """Current version of every record of `source` with `start <= event_time < end`."""
+    expression = None
+    if start is not None:
+        expression = ds.field(EVENT_COLUMN) >= pa.scalar(pd.Timestamp(start), type=pa.timestamp("us"))
+    if end is not None:
+        upper = ds.field(EVENT_COLUMN) < pa.scalar(pd.Timestamp(end), type=pa.timestamp("us"))
+        expression = upper if expression is None else expression & upper
+    for attempt in range(2):
+        files = data_files(root, source, start, end)
+        if not files:
+            return pd.DataFrame(columns=list(dict.fromkeys([*(columns or []), *SYSTEM_COLUMNS])))
+        try:
+            return latest_records(read_files(files, columns, expression))
+        except FileNotFoundError:
+            # A concurrent compaction removed a listed file; its rows are in the new part.
+            if attempt:
+                raise
+    raise AssertionError("unreachable")
+
+
+def compact_partition(directory: Path, row_group_size: int = ROW_GROUP_SIZE) -> Dict[str, int]:
+    """Merge a partition's files into one, dropping superseded rows.
+
+    Only the files listed at the start are removed, so deltas appended
+    meanwhile survive; until they are removed, readers see both copies and
+    the upsert keeps one.
+    """
+    files = _data_files(directory)
+    frame = read_files(files)
+    merged = latest_records(frame)
+    newest = merged[FETCHED_COLUMN].max()
+    path = directory / f"{PART_PREFIX}{newest}-{uuid.uuid4().hex[:8]}.parquet"
+    _write(_to_table(merged), path, row_group_size)
+    for f in files:
+        f.unlink()
+    return {"files_in": len(files), "rows_in": len(frame), "rows_out": len(merged)}
+
+
+def compact(
+    root: Path,
+    sources: Optional[Iterable[str]] = None,
+    min_files: int = COMPACT_MIN_FILES,
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> List[Dict[str, Any]]:
+    """Compact every partition (of `sources`, default all) holding at least `min_files` files."""
+    root = Path(root)
+    if sources is None:
+        sources = [p.name.split("=", 1)[1] for p in sorted(root.glob("source=*")) if p.is_dir()]
+    results = []
+    for source in sources:
+        for directory in partition_dirs(root, source):
+            if len(_data_files(directory)) < max(min_files, 2):
+                continue
+            stats = compact_partition(directory, row_group_size)
+            results.append({"source": source, "partition": directory.name, **stats})
+    return results
@@ -0,0 +1,396 @@
+"""
+Feature engine shared by the ML pipelines and the API.
+
+`ml/configs/features.yaml` declares the airport code map and the derived flight
+columns. `FeatureEngine` compiles those definitions once into vectorized NumPy
+operations that run on whole columns: pandas frames in the batch pipelines and
+plain record dicts at serving time go through the same code, so training and
+serving compute identical values.
+
+`FeatureEncoder` is the serving-side counterpart of the fitted sklearn
+`ColumnTransformer` built in `03_train.py` (median imputation + scaling for
+numeric columns, one-hot encoding for categoricals). It holds the fitted
+parameters as arrays and encodes records without building a DataFrame.
+
+Usage:
+    engine = load_feature_engine()
+    flights = engine.apply_frame(flights, "train_table")
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import yaml
+from scipy import sparse
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / "configs" / "features.yaml"
+
+# Placeholder written by the categorical SimpleImputer for NaN values.
+MISSING_CATEGORY = "missing"
+
+
+def _is_missing(value: Any) -> bool:
+    if value is None or value is pd.NA or value is pd.NaT:
+        return True
+    return isinstance(value, (float, np.floating)) and np.isnan(value)
+
+
+def as_numeric(values: Any) -> np.ndarray:
+    """Coerce a column to float64 with NaN for missing values."""
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype="float64", na_value=np.nan)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiub":
+        return values.astype("float64", copy=False)
+    return np.array([np.nan if _is_missing(v) else float(v) for v in values], dtype="float64")
+
+
+def as_datetime(values: Any) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return pd.to_datetime(values).to_numpy(dtype="datetime64[ns]")
+    return pd.to_datetime(pd.Index(list(values))).to_numpy(dtype="datetime64[ns]")
+
+
+def as_text(values: Any) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=object)
+    return np.asarray(list(values), dtype=object)
+
+
+def _date_part(values: np.ndarray, part: str) -> np.ndarray:
+    missing = np.isnat(values)
+    if part == "weekday":
+        # 1970-01-01 was a Thursday (weekday 3).
+        result = (values.astype("datetime64[D]").astype("int64") + 3) % 7
+    elif part == "month":
+        result = values.astype("datetime64[M]").astype("int64") % 12 + 1
+    else:
+        result = values.astype("datetime64[Y]").astype("int64") + 1970
+    result = result.astype("float64")
+    result[missing] = np.nan
+    return result
+
+
+class FeatureEngine:
+    """Compiled form of the `derived` section of `features.yaml`."""
+
+    def __init__(self, config: Mapping[str, Any]) -> None:
+        self.config = config
+        self.airports: Dict[str, str] = dict(config.get("airports", {}))
+        self.numeric_features: List[str] = list(config.get("numeric_features", []))
+        self.feature_sets: Dict[str, List[str]] = {
+            name: list(columns) for name, columns in config.get("feature_sets", {}).items()
+        }
+        self.definitions: Dict[str, Dict[str, Any]] = dict(config.get("derived", {}))
+        self._ops: Dict[str, Callable[[Any], np.ndarray]] = {
+            name: self._compile(name, spec) for name, spec in self.definitions.items()
+        }
+
+    def _compile(self, name: str, spec: Mapping[str, Any]) -> Callable[[Any], np.ndarray]:
+        op = spec.get("op")
+        if op == "floordiv":
+            divisor = float(spec["divisor"])
+            return lambda values: np.floor_divide(as_numeric(values), divisor)
+        if op == "hhmm_to_minutes":
+            return lambda values: np.floor_divide(as_numeric(values), 100.0) * 60.0 + np.mod(as_numeric(values), 100.0)
+        if op == "isin":
+            allowed = np.array(spec["values"], dtype="float64")
+            return lambda values: np.isin(as_numeric(values), allowed).astype("float64")
+        if op in {"weekday", "month", "year"}:
+            return lambda values: _date_part(as_datetime(values), op)
+        if op == "strip":
+            return lambda values: self._map_text(as_text(values), self._strip)
+        if op == "airport_code":
+            return lambda values: self._map_text(as_text(values), self.standardize_airport)
+        raise ValueError(f"Unknown op {op!r} for derived feature {name!r}")
+
+    @staticmethod
+    def _strip(value: Any) -> Optional[str]:
+        if _is_missing(value):
+            return None
+        return str(value).strip()
+
+    @staticmethod
+    def _map_text(values: np.ndarray, fn: Callable[[Any], Any]) -> np.ndarray:
+        # Map each distinct value once; flight tables repeat a handful of names.
+        codes, uniques = pd.factorize(values)
+        mapped = np.array([fn(value) for value in uniques] + [None], dtype=object)
+        return mapped[codes]
+
+    def standardize_airport(self, name: object) -> Optional[str]:
+        if _is_missing(name):
+            return None
+        cleaned = str(name).strip()
+        if not cleaned:
+            return None
+        return self.airports.get(cleaned, cleaned.upper())
+
+    def columns_for(self, feature_set: str | Sequence[str]) -> List[str]:
+        if isinstance(feature_set, str):
+            return self.feature_sets[feature_set]
+        return list(feature_set)
+
+    def derive_columns(
+        self,
+        columns: Mapping[str, Any],
+        feature_set: str | Sequence[str],
+        fixed: Iterable[str] = (),
+    ) -> Dict[str, np.ndarray]:
+        """Evaluate derived features over column arrays in one pass.
+
+        `columns` maps source names to column values (Series, arrays or lists).
+        Features listed in `fixed`, or whose source is absent, are skipped.
+        Derived values are visible to later definitions (e.g. `is_weekend`
+        reads `weekday`).
+        """
+        available: Dict[str, Any] = dict(columns)
+        fixed = set(fixed)
+        derived: Dict[str, np.ndarray] = {}
+        for name in self.columns_for(feature_set):
+            source = self.definitions[name]["source"]
+            if name in fixed or source not in available:
+                continue
+            derived[name] = self._ops[name](available[source])
+            available[name] = derived[name]
+        return derived
+
+    def apply_frame(self, df: pd.DataFrame, feature_set: str | Sequence[str]) -> pd.DataFrame:
+        """Add the derived columns of `feature_set` to `df` in place."""
+        derived = self.derive_columns(df, feature_set)
+        for name, values in derived.items():
+            df[name] = self._to_pandas(values, self.definitions[name].get("dtype"), df.index)
+        return df
+
+    def apply_records(
+        self,
+        records: Sequence[Dict[str, Any]],
+        feature_set: str | Sequence[str],
+        fixed: Iterable[str] = (),
+    ) -> Sequence[Dict[str, Any]]:
+        """Recompute derived features of `records` in place (serving path)."""
+        if not records:
+            return records
+        names = {self.definitions[name]["source"] for name in self.columns_for(feature_set)}
+        columns = {name: [record.get(name) for record in records] for name in names if name in records[0]}
+        derived = self.derive_columns(columns, feature_set, fixed)
+        for name, values in derived.items():
+            integral = str(self.definitions[name].get("dtype", "")).lower().startswith("int")
+            for record, value in zip(records, values.tolist()):
+                if _is_missing(value):
+                    value = None
+                elif integral:
+                    value = int(value)
+                record[name] = value
+        return records
+
+    @staticmethod
+    def _to_pandas(values: np.ndarray, dtype: Optional[str], index: pd.Index) -> Any:
+        if dtype in (None, "object") or values.dtype == object:
+            return pd.Series(values, index=index, dtype=object)
+        if dtype[0].isupper():
+            return pd.Series(pd.array(values, dtype=dtype), index=index)
+        if np.isnan(values).any():
+            return pd.Series(values, index=index)
+        return pd.Series(values.astype(dtype), index=index)
+
+
+def load_feature_config(path: Path = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    with Path(path).open(encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_feature_engine(path: Path = DEFAULT_CONFIG_PATH) -> FeatureEngine:
+    return FeatureEngine(load_feature_config(path))
+
+
+class FeatureEncoder:
+    """Array form of the fitted `ColumnTransformer` from `03_train.build_preprocessor`.
+
+    Numeric columns are median-imputed and divided by the scaler's scale;
+    categoricals are one-hot encoded, unknown values encode to all zeros. The
+    output matches `preprocessor.transform` value for value and in sparsity.
+    """
+
+    def __init__(
+        self,
+        feature_list: Sequence[str],
+        numeric_cols: Sequence[str],
+        numeric_fill: np.ndarray,
+        numeric_scale: np.ndarray,
+        categorical_cols: Sequence[str],
+        categories: Sequence[Sequence[Any]],
+        sparse_output: bool,
+    ) -> None:
+        self.feature_list = list(feature_list)
+        self.numeric_cols = list(numeric_cols)
+        self.numeric_fill = np.asarray(numeric_fill, dtype="float64")
+        self.numeric_scale = np.asarray(numeric_scale, dtype="float64")
+        self.categorical_cols = list(categorical_cols)
+        self.categories = [list(values) for values in categories]
+        self.sparse_output = sparse_output
+        self._lookups = [{value: idx for idx, value in enumerate(values)} for values in self.categories]
+        offsets = np.cumsum([len(self.numeric_cols)] + [len(values) for values in self.categories])
+        self._offsets = offsets[:-1]
+        self.n_features_out = int(offsets[-1])
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor: Any) -> "FeatureEncoder":
+        numeric = preprocessor.named_transformers_["num"]
+        categorical = preprocessor.named_transformers_["cat"]
+        numeric_cols = list(preprocessor.numeric_cols_)
+        statistics = numeric.named_steps["imputer"].statistics_
+        # SimpleImputer drops columns that were entirely missing during fit.
+        kept = ~np.isnan(statistics)
+        return cls(
+            feature_list=preprocessor.feature_list_,
+            numeric_cols=[col for col, keep in zip(numeric_cols, kept) if keep],
+            numeric_fill=statistics[kept],
+            numeric_scale=numeric.named_steps["scaler"].scale_,
+            categorical_cols=preprocessor.categorical_cols_,
+            categories=categorical.named_steps["encoder"].categories_,
+            sparse_output=bool(getattr(preprocessor, "sparse_output_", False)),
+        )
+
+    def _category_index(self, position: int, values: np.ndarray) -> np.ndarray:
+        lookup = self._lookups[position]
+        index = np.empty(len(values), dtype="int64")
+        for row, value in enumerate(values):
+            if value is not None and _is_missing(value):
+                value = MISSING_CATEGORY
+            index[row] = lookup.get(value, -1)
+        return index
+
+    def transform_columns(self, columns: Mapping[str, Any], n_rows: int) -> Any:
+        """Encode column arrays keyed by feature name into the model matrix."""
+        matrix = np.zeros((n_rows, self.n_features_out), dtype="float64")
+        for position, col in enumerate(self.numeric_cols):
+            values = as_numeric(columns[col]) if col in columns else np.full(n_rows, np.nan)
+            values = np.where(np.isnan(values), self.numeric_fill[position], values)
+            matrix[:, position] = values / self.numeric_scale[position]
+        rows = np.arange(n_rows)
+        for position, col in enumerate(self.categorical_cols):
+            values = as_text(columns[col]) if col in columns else np.full(n_rows, None, dtype=object)
+            index = self._category_index(position, values)
+            known = index >= 0
+            matrix[rows[known], self._offsets[position] + index[known]] = 1.0
+        if self.sparse_output:
+            return sparse.csr_matrix(matrix)
+        return matrix
+
+    def transform_records(self, records: Sequence[Mapping[str, Any]]) -> Any:
+        columns = {col: [record.get(col) for record in records] for col in self.feature_list}
+        return self.transform_columns(columns, len(records))
+
+    def transform_frame(self, df: pd.DataFrame) -> Any:
+        return self.transform_columns({col: df[col] for col in self.feature_list if col in df}, len(df))
+
+    @property
+    def native_columns(self) -> List[str]:
+        """Column order of the native form: kept numerics, then categoricals."""
+        return self.numeric_cols + self.categorical_cols
+
+    @property
+    def native_categorical_indices(self) -> List[int]:
+        start = len(self.numeric_cols)
+        return list(range(start, start + len(self.categorical_cols)))
+
+    def transform_native_columns(self, columns: Mapping[str, Any], n_rows: int) -> pd.DataFrame:
+        """Frame for models with native categorical support (CatBoost).
+
+        Numerics are median-imputed float32 (unscaled: trees split on order,
+        not magnitude); categoricals stay strings with missing values mapped
+        to `MISSING_CATEGORY`, so nothing is one-hot expanded.
+        """
+        data: Dict[str, Any] = {}
+        for position, col in enumerate(self.numeric_cols):
+            values = as_numeric(columns[col]) if col in columns else np.full(n_rows, np.nan)
+            data[col] = np.where(np.isnan(values), self.numeric_fill[position], values).astype("float32")
+        for col in self.categorical_cols:
+            values = as_text(columns[col]) if col in columns else np.full(n_rows, None, dtype=object)
+            data[col] = [MISSING_CATEGORY if _is_missing(value) else str(value) for value in values]
+        return pd.DataFrame(data, columns=self.native_columns)
+
+    def transform_native_records(self, records: Sequence[Mapping[str, Any]]) -> pd.DataFrame:
+        columns = {col: [record.get(col) for record in records] for col in self.feature_list}
+        return self.transform_native_columns(columns, len(records))
+
+    def transform_native_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.transform_native_columns({col: df[col] for col in self.feature_list if col in df}, len(df))
+
+    def transform_coded_columns(self, columns: Mapping[str, Any], n_rows: int) -> np.ndarray:
+        """float32 matrix in `native_columns` order for the out-of-core LightGBM path.
+
+        Numerics are left as they are (NaN stays missing for the booster);
+        categoricals become their index in `categories`, NaN when unknown.
+        Categorical-dtype columns are recoded without materializing strings.
+        """
+        matrix = np.empty((n_rows, len(self.native_columns)), dtype="float32")
+        for position, col in enumerate(self.numeric_cols):
+            matrix[:, position] = as_numeric(columns[col]) if col in columns else np.nan
+        offset = len(self.numeric_cols)
+        for position, col in enumerate(self.categorical_cols):
+            values = columns.get(col)
+            if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+                if MISSING_CATEGORY not in values.cat.categories:
+                    values = values.cat.add_categories(MISSING_CATEGORY)
+                codes = pd.Categorical(values.fillna(MISSING_CATEGORY), categories=self.categories[position]).codes
+            else:
+                text = as_text(values) if col in columns else np.full(n_rows, None, dtype=object)
+                lookup = self._lookups[position]
+                codes = np.array([lookup.get(MISSING_CATEGORY if _is_missing(v) else v, -1) for v in text], dtype="int64")
+            matrix[:, offset + position] = np.where(codes >= 0, codes, np.nan)
+        return matrix
+
+    def transform_coded_records(self, records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        columns = {col: [record.get(col) for record in records] for col in self.feature_list}
+        return self.transform_coded_columns(columns, len(records))
+
+    def transform_coded_frame(self, df: pd.DataFrame) -> np.ndarray:
+        return self.transform_coded_columns({col: df[col] for col in self.feature_list if col in df}, len(df))
+
+    def frame_transform(self, input_format: str = "encoded") -> Callable[[pd.DataFrame], Any]:
+        """The `transform_*frame` matching a model bundle's `input_format`."""
+        transforms = {
+            "encoded": self.transform_frame,
+            "native": self.transform_native_frame,
+            "coded": self.transform_coded_frame,
+        }
+        if input_format not in transforms:
+            raise ValueError(f"Unknown input format {input_format!r}")
+        return transforms[input_format]
+
+    def records_transform(self, input_format: str = "encoded") -> Callable[[Sequence[Mapping[str, Any]]], Any]:
+        """The `transform_*records` matching a model bundle's `input_format`."""
+        transforms = {
+            "encoded": self.transform_records,
+            "native": self.transform_native_records,
+            "coded": self.transform_coded_records,
+        }
+        if input_format not in transforms:
+            raise ValueError(f"Unknown input format {input_format!r}")
+        return transforms[input_format]
+
+    @classmethod
+    def from_bundle(cls, bundle: Mapping[str, Any]) -> "FeatureEncoder":
+        """Encoder of a saved model bundle: stored as-is, or derived from its preprocessor."""
+        if "encoder" in bundle:
+            return bundle["encoder"]
+        return cls.from_preprocessor(bundle["preprocessor"])
+
+
+def check_encoder_parity(preprocessor: Any, encoder: FeatureEncoder, frame: pd.DataFrame) -> None:
+    """Raise if `encoder` and `preprocessor` disagree on any value of `frame`."""
+    expected = preprocessor.transform(frame[encoder.feature_list])
+    actual = encoder.transform_frame(frame)
+    if sparse.issparse(expected):
+        expected = expected.toarray()
+    if sparse.issparse(actual):
+        actual = actual.toarray()
+    if expected.shape != actual.shape or not np.array_equal(expected, actual):
+        mismatched = int((expected != actual).sum()) if expected.shape == actual.shape else -1
+        raise ValueError(
+            f"Serving encoder diverges from the fitted preprocessor ({mismatched} mismatched values)."
+        )
@@ -0,0 +1,236 @@
+"""
+Rolling per-airport traffic counts for today, fed by the clean API store (`ml/api_store.py`).
+
+The train table only knows historical days, so a prediction's base row carries
+the congestion of the latest matching day in the table. `LiveTraffic` keeps the
+same three features for the days in its window from `kac_status` and
+`icn_arrivals`:
+
+- `airport_hour_flights`: records scheduled at the airport in that hour;
+- `daily_flights`: records scheduled at the airport that day;
+- `hourly_congestion_ratio`: `airport_hour_flights / (daily_flights / 24)`,
+  as in `02_feature_build.py`.
+
+`refresh` reads only the store files it has not seen yet, oldest fetch first,
+and applies each record in O(1). A record's latest fetch moves it between
+counters, a repeated or older fetch is a no-op, so files rewritten by
+`compact` change nothing. Days leaving the window are evicted with their
+records. `drain_changes` hands the moved counters to the API's update
+stream.
+
+Only rows keyed by their flight fields and timed by their schedule fields
+are counted. A row stored under a content hash or the fetch time (a record
+missing those fields, or written before its source had a key) would count
+once per version, in the hour it was fetched.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Set, Tuple
+
+import pandas as pd
+
+from api_store import EVENT_COLUMN, EVENT_TZ, FETCHED_COLUMN, KEY_COLUMN, data_files, from_fields, read_files
+
+# Source → where its records' airport comes from (a record field holding an
+# airport name or code, or one fixed airport), plus the `primary_key` and
+# `event_time` of its spec in scripts/run_ingestion.py.
+LIVE_SOURCES: Dict[str, Dict[str, Any]] = {
+    # KAC reports the flights of every airport it runs; each item names its airport.
+    "kac_status": {
+        "airport_field": "airport",
+        "primary_key": ["schDate", "airFln", "std"],
+        "event_time": {"fields": ["schDate", "std"], "format": "%Y%m%d%H%M"},
+    },
+    # The Incheon arrivals board.
+    "icn_arrivals": {
+        "airport": "ICN",
+        "primary_key": ["flightId", "scheduleDateTime"],
+        "event_time": {"fields": ["scheduleDateTime"], "format": "%Y%m%d%H%M"},
+    },
+}
+# Today and yesterday.
+WINDOW_DAYS = 2
+# Seconds between store scans triggered by lookups.
+REFRESH_S = 60.0
+
+Slot = Tuple[str, date, int]
+
+
+def local_now() -> pd.Timestamp:
+    """Naive Korea time, the clock of `event_time`."""
+    return pd.Timestamp.now(tz=EVENT_TZ).tz_localize(None)
+
+
+def _fetched_order(path: Path) -> str:
+    # delta-<fetched_at>-<id>.parquet / part-<newest fetched_at>-<id>.parquet
+    return path.name.split("-", 1)[1]
+
+
+class LiveTraffic:
+    """Flights per (airport, day, hour) and (airport, day) over the last `window_days` days."""
+
+    def __init__(
+        self,
+        root: Path,
+        sources: Optional[Mapping[str, Mapping[str, Any]]] = None,
+        airport_code: Callable[[Any], Optional[str]] = lambda name: str(name).strip().upper() or None,
+        window_days: int = WINDOW_DAYS,
+        refresh_s: float = REFRESH_S,
+        now: Callable[[], pd.Timestamp] = local_now,
+    ) -> None:
+        self.root = Path(root)
+        self.sources = dict(sources if sources is not None else LIVE_SOURCES)
+        for source, feed in self.sources.items():
+            if not feed.get("primary_key") or not feed.get("event_time"):
+                raise ValueError(f"{source}: live traffic needs the source's primary_key and event_time")
+        self.airport_code = airport_code
+        self.window_days = window_days
+        self.refresh_s = refresh_s
+        self.now = now
+        self.hour_counts: Dict[Slot, int] = defaultdict(int)
+        self.day_counts: Dict[Tuple[str, date], int] = defaultdict(int)
+        # (source, record_key) → (slot, fetched_at) of its latest fetch.
+        self.records: Dict[Tuple[str, str], Tuple[Slot, str]] = {}
+        self.day_records: Dict[date, Set[Tuple[str, str]]] = defaultdict(set)
+        self.seen_files: Dict[str, Set[Path]] = {source: set() for source in self.sources}
+        # Slots whose counts moved since the last `drain_changes`.
+        self.changed: Set[Slot] = set()
+        self.refreshed_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def _count(self, slot: Slot, delta: int) -> None:
+        airport, day, hour = slot
+        self.changed.add(slot)
+        for counts, key in ((self.hour_counts, slot), (self.day_counts, (airport, day))):
+            counts[key] += delta
+            if not counts[key]:
+                del counts[key]
+
+    def apply(self, source: str, record_key: str, slot: Optional[Slot], fetched_at: str) -> bool:
+        """Count one fetched record; False when an equal or newer fetch was applied already."""
+        key = (source, record_key)
+        current = self.records.get(key)
+        if current is not None:
+            old_slot, old_fetched = current
+            if fetched_at <= old_fetched:
+                return False
+            if old_slot == slot:
+                self.records[key] = (slot, fetched_at)
+                return True
+            self._count(old_slot, -1)
+            self.day_records[old_slot[1]].discard(key)
+            del self.records[key]
+        if slot is not None:
+            self.records[key] = (slot, fetched_at)
+            self._count(slot, 1)
+            self.day_records[slot[1]].add(key)
+        return True
+
+    def evict(self, first_day: date) -> int:
+        """Drop every record of days before `first_day`."""
+        evicted = 0
+        for day in [d for d in self.day_records if d < first_day]:
+            for key in self.day_records.pop(day):
+                slot, _ = self.records.pop(key)
+                self._count(slot, -1)
+                evicted += 1
+        return evicted
+
+    def _apply_frame(self, source: str, frame: pd.DataFrame, first_day: date) -> int:
+        feed = self.sources[source]
+        if "airport" in feed:
+            airports = pd.Series(feed["airport"], index=frame.index)
+        else:
+            # Map each distinct name once.
+            names = frame[feed["airport_field"]]
+            airports = names.map({name: self.airport_code(name) for name in names.dropna().unique()})
+        times = frame[EVENT_COLUMN]
+        keyed = from_fields(frame, feed["primary_key"], feed["event_time"])
+        applied = 0
+        for key, airport, day, hour, fetched_at, ok in zip(
+            frame[KEY_COLUMN], airports, times.dt.date, times.dt.hour, frame[FETCHED_COLUMN], keyed
+        ):
+            if not ok:
+                continue
+            # A record without an airport, or rescheduled out of the window, leaves the counts.
+            slot = (airport, day, int(hour)) if isinstance(airport, str) and day >= first_day else None
+            applied += self.apply(source, key, slot, fetched_at)
+        return applied
+
+    def refresh(self, force: bool = False) -> int:
+        """Apply the store files written since the last refresh; returns the records applied."""
+        with self.lock:
+            if not force and self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_s:
+                return 0
+            first_day = (self.now() - timedelta(days=self.window_days - 1)).date()
+            self.evict(first_day)
+            applied = 0
+            for source, feed in self.sources.items():
+                files = data_files(self.root, source, start=first_day)
+                seen = self.seen_files[source]
+                columns = [*([feed["airport_field"]] if "airport_field" in feed else []), *feed["primary_key"], *feed["event_time"]["fields"]]
+                for path in sorted((f for f in files if f not in seen), key=_fetched_order):
+                    try:
+                        frame = read_files([path], columns)
+                    except FileNotFoundError:
+                        # Compacted meanwhile; its rows are in a part file the next scan finds.
+                        continue
+                    applied += self._apply_frame(source, frame, first_day)
+                    seen.add(path)
+                # Forget files compacted away or out of the window.
+                seen.intersection_update(files)
+            self.refreshed_at = time.monotonic()
+            return applied
+
+    def slot(
+        self,
+        airport_code: str,
+        hour: int,
+        weekday: int,
+        month: Optional[int] = None,
+        min_daily: float = 1.0,
+    ) -> Optional[Dict[str, float]]:
+        """Today's features for a request slot.
+
+        None when the slot is not today or fewer than `min_daily` records of
+        the airport's day were ingested (a feed that started mid-day or
+        missed polls undercounts).
+        """
+        self.refresh()
+        today = self.now()
+        if weekday != today.weekday() or (month is not None and month != today.month):
+            return None
+        day = today.date()
+        with self.lock:
+            daily = self.day_counts.get((airport_code.upper(), day), 0)
+            flights = self.hour_counts.get((airport_code.upper(), day, hour), 0)
+        if not daily or daily < min_daily:
+            return None
+        return {
+            "airport_hour_flights": float(flights),
+            "daily_flights": float(daily),
+            "hourly_congestion_ratio": flights / (daily / 24.0),
+        }
+
+    def day_counts_of(self, airport_code: str, day: date) -> Dict[str, Any]:
+        """`daily_flights` and the non-zero hourly counts of one airport's day."""
+        airport_code = airport_code.upper()
+        with self.lock:
+            hours = {h: self.hour_counts[(airport_code, day, h)] for h in range(24) if (airport_code, day, h) in self.hour_counts}
+            return {"daily_flights": self.day_counts.get((airport_code, day), 0), "hours": hours}
+
+    def drain_changes(self) -> Dict[Tuple[str, date], Dict[str, Any]]:
+        """Current counts of every (airport, day) whose counters moved since the last call."""
+        with self.lock:
+            changed, self.changed = self.changed, set()
+            result: Dict[Tuple[str, date], Dict[str, Any]] = {}
+            for airport, day, hour in sorted(changed):
+                entry = result.setdefault((airport, day), {"daily_flights": self.day_counts.get((airport, day), 0), "hours": {}})
+                entry["hours"][hour] = self.hour_counts.get((airport, day, hour), 0)
+            return result
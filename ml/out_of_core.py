@@ -0,0 +1,307 @@
+"""
+Out-of-core LightGBM training over the partitioned train table.
+
+    python ml/pipelines/03_train.py --out-of-core --input data/processed/train_table
+
+The hive-partitioned dataset written by `03_build_train_table.py --partitioned`
+is never loaded whole:
+
+1. `scan_dataset` reads only labels, flight dates and categorical columns, one
+   partition file at a time, to collect category vocabularies and the
+   train/validation/test row ranges.
+2. Each range is exposed to LightGBM as a `ParquetSequence`, which decodes
+   one row group at a time into float32 features
+   (`FeatureEncoder.transform_coded_columns`: numerics as-is, categoricals as
+   integer codes). LightGBM samples rows from the sequences to find bin edges
+   and then pushes them in batches into its binned `Dataset`.
+
+Peak memory is the binned dataset (about one byte per feature per row),
+LightGBM's bin-construction sample (at most `bin_construct_sample_cnt` rows)
+and one decoded row group, instead of the table plus its encoded copies.
+
+The last `holdout_months` year_month partitions are held out. Since every
+partition file is sorted by flight date, their earlier days form the validation
+range (early stopping, threshold) and the later days the test range.
+"""
+
+from __future__ import annotations
+
+import numbers
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from feature_engine import MISSING_CATEGORY, FeatureEncoder
+from table_io import PARTITIONING, table_schema
+
+# LGBMClassifier parameters that are not booster parameters.
+WRAPPER_ONLY_PARAMS = {"n_estimators", "class_weight", "importance_type"}
+
+
+@dataclass
+class FilePart:
+    """Rows [start, stop) of one partition file plus its partition values."""
+
+    path: str
+    constants: Dict[str, Any]
+    start: int
+    stop: int
+
+
+@dataclass
+class ScanResult:
+    parts: Dict[str, List[FilePart]]
+    labels: Dict[str, np.ndarray]
+    categories: List[List[str]]
+    trained_through: str
+    rows: int
+    dataset_bytes: int
+    holdout_months: List[str] = field(default_factory=list)
+
+
+def _fragments(root: Path) -> List[ds.ParquetFileFragment]:
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    return sorted(dataset.get_fragments(), key=lambda fragment: fragment.path)
+
+
+def scan_dataset(root: Path, target: str, categorical_cols: Sequence[str], holdout_months: int = 1) -> ScanResult:
+    """First pass: category vocabularies (train rows only), labels and row ranges per split.
+
+    The holdout grows past `holdout_months` while it spans a single day, so
+    a month that has only just started still leaves days for val and test.
+    """
+    files = []
+    # Categories seen per year_month; the train vocabulary is the union over train months.
+    seen: Dict[str, List[set]] = {}
+    dataset_bytes = 0
+    for fragment in _fragments(root):
+        constants = ds.get_partition_keys(fragment.partition_expression)
+        parquet = pq.ParquetFile(fragment.path)
+        dataset_bytes += Path(fragment.path).stat().st_size
+        stored = [col for col in categorical_cols if col in parquet.schema_arrow.names]
+        table = parquet.read(columns=[target, "flight_date", *stored])
+        y = table.column(target).to_numpy(zero_copy_only=False).astype("float32")
+        dates = table.column("flight_date").to_numpy().astype("datetime64[D]")
+        if len(dates) and (np.diff(dates) < np.timedelta64(0, "D")).any():
+            raise ValueError(f"{fragment.path} is not sorted by flight_date; rewrite it with write_partitioned_table")
+        files.append((fragment.path, constants, y, dates))
+        month = seen.setdefault(constants["year_month"], [set() for _ in categorical_cols])
+        for position, col in enumerate(categorical_cols):
+            if col in stored:
+                values = table.column(col).to_pandas()
+                month[position].update(values.dropna().unique())
+                if values.isna().any():
+                    month[position].add(MISSING_CATEGORY)
+            elif col in constants:
+                month[position].add(constants[col])
+
+    months = sorted(seen)
+    n_holdout = holdout_months
+    while n_holdout < len(months):
+        holdout = set(months[-n_holdout:])
+        days = np.unique(np.concatenate([dates for _, constants, _, dates in files if constants["year_month"] in holdout]))
+        if len(days) > 1:
+            break
+        n_holdout += 1
+    if n_holdout >= len(months):
+        raise ValueError(f"{root} has {len(months)} month(s); need training months before a holdout of {holdout_months}")
+
+    parts: Dict[str, List[FilePart]] = {"train": [], "val": [], "test": []}
+    labels: Dict[str, List[np.ndarray]] = {"train": [], "val": [], "test": []}
+    first_test_day = days[len(days) // 2]
+    for path, constants, y, dates in files:
+        if constants["year_month"] not in holdout:
+            parts["train"].append(FilePart(path, constants, 0, len(y)))
+            labels["train"].append(y)
+            continue
+        # Files are sorted by flight date, so the split point is a single index.
+        cut = int(np.searchsorted(dates, first_test_day))
+        for split, start, stop in (("val", 0, cut), ("test", cut, len(y))):
+            if stop > start:
+                parts[split].append(FilePart(path, constants, start, stop))
+                labels[split].append(y[start:stop])
+
+    train_dates = [dates.max() for path, constants, y, dates in files if constants["year_month"] not in holdout and len(dates)]
+    return ScanResult(
+        parts=parts,
+        labels={split: np.concatenate(values) if values else np.empty(0, "float32") for split, values in labels.items()},
+        categories=[sorted(set().union(*(seen[month][position] for month in months[:-n_holdout]))) for position in range(len(categorical_cols))],
+        trained_through=str(max(train_dates)),
+        rows=sum(len(y) for _, _, y, _ in files),
+        dataset_bytes=dataset_bytes,
+        holdout_months=sorted(holdout),
+    )
+
+
+def coded_encoder(schema_features: Sequence[str], numeric_cols: Sequence[str], categorical_cols: Sequence[str], categories: Sequence[Sequence[str]]) -> FeatureEncoder:
+    """A `FeatureEncoder` for the coded form; nothing is imputed or scaled."""
+    return FeatureEncoder(
+        feature_list=schema_features,
+        numeric_cols=numeric_cols,
+        numeric_fill=np.full(len(numeric_cols), np.nan),
+        numeric_scale=np.ones(len(numeric_cols)),
+        categorical_cols=categorical_cols,
+        categories=categories,
+        sparse_output=False,
+    )
+
+
+class RowGroupCache:
+    """The most recently decoded row group, shared by all sequences of a dataset.
+
+    LightGBM walks the sequences one after another, so a single slot is
+    enough, and only one decoded row group is ever held at a time.
+    """
+
+    def __init__(self) -> None:
+        self.key: Optional[Tuple[str, int]] = None
+        self.matrix: Optional[np.ndarray] = None
+
+
+class ParquetSequence(lgb.Sequence):
+    """Random and range access to one `FilePart` as coded float32 rows.
+
+    With the shared `RowGroupCache`, LightGBM's sorted sampling and its
+    batched pushes decode each row group about twice in total.
+    """
+
+    def __init__(self, part: FilePart, encoder: FeatureEncoder, cache: Optional[RowGroupCache] = None, batch_size: int = 16 * 1024) -> None:
+        self.part = part
+        self.encoder = encoder
+        self.cache = cache or RowGroupCache()
+        self.batch_size = batch_size
+        self._file = pq.ParquetFile(part.path)
+        sizes = [self._file.metadata.row_group(i).num_rows for i in range(self._file.num_row_groups)]
+        self._starts = np.concatenate([[0], np.cumsum(sizes)])
+        self._columns = [col for col in encoder.feature_list if col in self._file.schema_arrow.names]
+
+    def __len__(self) -> int:
+        return self.part.stop - self.part.start
+
+    def _row_group(self, index: int) -> np.ndarray:
+        if self.cache.key != (self.part.path, index):
+            self.cache.matrix = None
+            table = self._file.read_row_group(index, columns=self._columns)
+            columns: Dict[str, Any] = {}
+            for name in table.column_names:
+                column = table.column(name)
+                # Strings stay dictionary-encoded: a row group is codes, not Python objects.
+                if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+                    column = column.dictionary_encode()
+                columns[name] = column.to_pandas()
+            for col, value in self.part.constants.items():
+                if col in self.encoder.feature_list:
+                    columns[col] = pd.Series(pd.Categorical.from_codes(np.zeros(table.num_rows, dtype="int8"), [value]))
+            self.cache.matrix = self.encoder.transform_coded_columns(columns, table.num_rows)
+            self.cache.key = (self.part.path, index)
+        assert self.cache.matrix is not None
+        return self.cache.matrix
+
+    def _rows(self, start: int, stop: int) -> np.ndarray:
+        """Rows [start, stop) of the part, across row group boundaries."""
+        start += self.part.start
+        stop += self.part.start
+        chunks = []
+        group = int(np.searchsorted(self._starts, start, side="right")) - 1
+        while start < stop:
+            matrix = self._row_group(group)
+            end = min(stop, int(self._starts[group + 1]))
+            chunks.append(matrix[start - self._starts[group] : end - self._starts[group]])
+            start = end
+            group += 1
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def __getitem__(self, idx: Union[int, slice, List[int]]) -> np.ndarray:
+        if isinstance(idx, numbers.Integral):
+            # Single rows feed LightGBM's bin sampling, which wants float64.
+            return self._rows(int(idx), int(idx) + 1)[0].astype("float64")
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            rows = self._rows(start, stop)
+            return rows if step == 1 else rows[::step]
+        if isinstance(idx, list):
+            return np.stack([self[i] for i in idx])
+        raise TypeError(f"Sequence index must be integer, slice or list, got {type(idx).__name__}")
+
+
+def booster_params(model: Any) -> Dict[str, Any]:
+    """`lgb.train` parameters equivalent to an unfitted `LGBMClassifier`."""
+    params = {key: value for key, value in model.get_params().items() if key not in WRAPPER_ONLY_PARAMS and value is not None}
+    params.update(objective="binary", metric="auc", verbose=-1)
+    return params
+
+
+def train_booster(
+    scan: ScanResult,
+    encoder: FeatureEncoder,
+    params: Dict[str, Any],
+    num_rounds: int,
+    early_stopping_rounds: int,
+) -> Tuple[lgb.Booster, Dict[str, List[ParquetSequence]]]:
+    """Bin the train and val ranges from their sequences and boost with early stopping on val.
+
+    Rows without a label keep their place in the sequence with weight 0.
+    """
+    cache = RowGroupCache()
+    sequences = {split: [ParquetSequence(part, encoder, cache) for part in parts] for split, parts in scan.parts.items()}
+
+    def dataset(split: str, reference: Optional[lgb.Dataset] = None) -> lgb.Dataset:
+        y = scan.labels[split]
+        known = ~np.isnan(y)
+        return lgb.Dataset(
+            sequences[split],
+            label=np.where(known, y, 0),
+            weight=None if known.all() else known.astype("float32"),
+            feature_name=encoder.native_columns,
+            categorical_feature=encoder.native_categorical_indices,
+            reference=reference,
+        )
+
+    train = dataset("train")
+    booster = lgb.train(
+        params,
+        train,
+        num_boost_round=num_rounds,
+        valid_sets=[dataset("val", reference=train)],
+        callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
+    )
+    return booster, sequences
+
+
+def predict_sequences(booster: lgb.Booster, sequences: Sequence[ParquetSequence]) -> np.ndarray:
+    """Streamed `booster.predict` over the sequences, at the best iteration."""
+    scores = []
+    for seq in sequences:
+        for start in range(0, len(seq), seq.batch_size):
+            scores.append(booster.predict(seq[start : start + seq.batch_size], num_iteration=booster.best_iteration or None))
+    return np.concatenate(scores) if scores else np.empty(0)
+
+
+def sample_records(root: Path, columns: Sequence[str], n_rows: int) -> List[Dict[str, Any]]:
+    """The first `n_rows` rows of the dataset as feature records (partition columns included)."""
+    schema = table_schema(root).append(pa.field("year_month", pa.string()))
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING, schema=schema)
+    return dataset.head(n_rows, columns=list(columns)).to_pandas().to_dict("records")
+
+
+class BoosterClassifier:
+    """`predict_proba` over a binary `lightgbm.Booster`, for the API and the benchmark."""
+
+    def __init__(self, booster: lgb.Booster) -> None:
+        self.booster = booster
+        self.best_iteration = booster.best_iteration or None
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positive = self.booster.predict(X, num_iteration=self.best_iteration)
+        return np.column_stack([1.0 - positive, positive])
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.booster.feature_importance(importance_type="split", iteration=self.best_iteration)
@@ -13,11 +13,15 @@ from __future__ import annotations
 import argparse
 import logging
 import re
+import sys
 from pathlib import Path
 from typing import Iterable
 
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from profiling import StageProfiler  # noqa: E402
+
 COLUMN_MAP = {
     "출발/도착": "direction",
     "공항명": "airport_name",
@@ -57,6 +61,12 @@ def parse_args() -> argparse.Namespace:
         type=Path,
         help="CSV log path for rows dropped due to invalid data.",
     )
+    parser.add_argument(
+        "--profile",
+        default="data/interim/flights_master_profile.json",
+        type=Path,
+        help="JSON report with per-step timing, memory and row counts.",
+    )
     return parser.parse_args()
 
 
@@ -172,35 +182,44 @@ def drop_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     return result
 
 
-def run_pipeline(input_dir: Path, output: Path, invalid_log: Path) -> None:
+def run_pipeline(input_dir: Path, output: Path, invalid_log: Path, profile_path: Path) -> None:
     files: Iterable[Path] = sorted(input_dir.glob("molit_flights_*.xlsx"))
     if not files:
         raise FileNotFoundError(f"No molit_flights_*.xlsx files found under {input_dir}")
 
+    profiler = StageProfiler("00_merge_raw")
     logging.info("Found %d workbook(s)", len(files))
-    frames = [normalize_frame(load_excel(path)) for path in files]
-    merged = pd.concat(frames, ignore_index=True)
+    with profiler.step("read_workbooks") as step:
+        frames = [normalize_frame(load_excel(path)) for path in files]
+        merged = pd.concat(frames, ignore_index=True)
+        step.rows_out = len(merged)
     logging.info("Merged %d rows from %d files", len(merged), len(frames))
 
-    valid, invalid = log_invalid_rows(merged)
+    with profiler.step("validate", rows_in=len(merged)) as step:
+        valid, invalid = log_invalid_rows(merged)
+        step.rows_out = len(valid)
     logging.info("Valid rows: %d, Invalid rows: %d", len(valid), len(invalid))
 
-    valid = drop_duplicates(valid)
+    with profiler.step("drop_duplicates", rows_in=len(valid)) as step:
+        valid = drop_duplicates(valid)
+        step.rows_out = len(valid)
 
-    output.parent.mkdir(parents=True, exist_ok=True)
-    valid.to_parquet(output, index=False)
+    with profiler.step("write", rows_in=len(valid)):
+        output.parent.mkdir(parents=True, exist_ok=True)
+        valid.to_parquet(output, index=False)
     logging.info("Saved flights master table → %s", output)
 
     if not invalid.empty:
         invalid_log.parent.mkdir(parents=True, exist_ok=True)
         invalid.to_csv(invalid_log, index=False)
         logging.info("Logged %d invalid rows → %s", len(invalid), invalid_log)
+    profiler.write(profile_path)
 
 
 def main() -> None:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     args = parse_args()
-    run_pipeline(args.input_dir, args.output, args.invalid_log)
+    run_pipeline(args.input_dir, args.output, args.invalid_log, args.profile)
 
 
 if __name__ == "__main__":
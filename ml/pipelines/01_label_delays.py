@@ -6,21 +6,42 @@ python ml/pipelines/01_label_delays.py \
   --input data/interim/flights_master.parquet \
   --output data/interim/flights_labeled.parquet \
   --stats data/interim/flights_labeled_stats.json
+
+Add `--streaming` to process the input row group by row group with bounded
+memory; the output parquet is written incrementally.
 """
 
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
 import logging
+import sys
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from profiling import StageProfiler, profile_path_for  # noqa: E402
 
 DELAY_THRESHOLD_MINUTES = 15
 CANCELLATION_KEYWORDS = {"취소", "결항"}
 DIVERSION_KEYWORDS = {"회항"}
+DEFAULT_BATCH_SIZE = 65_536
+
+# Arrow types for the columns added by labeling. Pinned so that a chunk whose
+# values are all null does not fix the writer schema to the `null` type.
+LABEL_COLUMN_TYPES: dict[str, pa.DataType] = {
+    "special_status": pa.string(),
+    "delay_minutes": pa.float64(),
+    "delay_label": pa.int64(),
+    "label_source": pa.string(),
+}
 
 
 def parse_args() -> argparse.Namespace:
@@ -28,7 +49,10 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--input", type=Path, default=Path("data/interim/flights_master.parquet"))
     parser.add_argument("--output", type=Path, default=Path("data/interim/flights_labeled.parquet"))
     parser.add_argument("--stats", type=Path, default=Path("data/interim/flights_labeled_stats.json"))
+    parser.add_argument("--profile", type=Path, default=None, help="Profile report (default: next to --stats).")
     parser.add_argument("--log", type=Path, default=Path("logs/ml/01_label_delays.log"))
+    parser.add_argument("--streaming", action="store_true", help="Process the input in row-group batches.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch in streaming mode.")
     return parser.parse_args()
 
 
@@ -83,39 +107,116 @@ def label_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def compute_stats(df: pd.DataFrame) -> dict[str, float]:
+def compute_counts(df: pd.DataFrame) -> dict[str, int]:
     valid = df["delay_label"].dropna()
-    if valid.empty:
-        return {
-            "total_rows": len(df),
-            "labeled_rows": 0,
-            "delay_rate": None,
-            "cancelled_rows": int(df["special_status"].eq("cancelled").sum()),
-            "diverted_rows": int(df["special_status"].eq("diverted").sum()),
-        }
-    delay_rate = float(valid.mean())
     return {
-        "total_rows": len(df),
+        "total_rows": int(len(df)),
         "labeled_rows": int(valid.count()),
-        "delay_rate": round(delay_rate, 4),
+        "delayed_rows": int(valid.sum()),
         "cancelled_rows": int(df["special_status"].eq("cancelled").sum()),
         "diverted_rows": int(df["special_status"].eq("diverted").sum()),
     }
 
 
-def run(input_path: Path, output: Path, stats_path: Path) -> dict[str, float]:
-    df = pd.read_parquet(input_path)
-    labeled = label_dataframe(df)
-    labeled["label_source"] = "ICAO15"
+def merge_counts(total: dict[str, int], counts: dict[str, int]) -> dict[str, int]:
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def stats_from_counts(counts: dict[str, int]) -> dict[str, float]:
+    labeled = counts.get("labeled_rows", 0)
+    delay_rate = round(counts["delayed_rows"] / labeled, 4) if labeled else None
+    return {
+        "total_rows": counts.get("total_rows", 0),
+        "labeled_rows": labeled,
+        "delay_rate": delay_rate,
+        "cancelled_rows": counts.get("cancelled_rows", 0),
+        "diverted_rows": counts.get("diverted_rows", 0),
+    }
+
 
+def compute_stats(df: pd.DataFrame) -> dict[str, float]:
+    return stats_from_counts(compute_counts(df))
+
+
+def _writer_schema(input_schema: pa.Schema, chunk: pa.Table) -> pa.Schema:
+    known = {field.name: field.type for field in input_schema}
+    known.update(LABEL_COLUMN_TYPES)
+    fields = [pa.field(field.name, known.get(field.name, field.type)) for field in chunk.schema]
+    return pa.schema(fields, metadata=chunk.schema.metadata)
+
+
+def label_batches(input_path: Path, output: Path, batch_size: int = DEFAULT_BATCH_SIZE) -> dict[str, int]:
+    """Label `input_path` batch by batch, appending each batch to `output`.
+
+    Only one batch is held in memory at a time; the stats counters are summed
+    across batches. An empty input gives a zero-row file with the pinned
+    schema, as the in-memory path does.
+    """
+    source = pq.ParquetFile(input_path)
+    counts: dict[str, int] = {}
+    writer: pq.ParquetWriter | None = None
     output.parent.mkdir(parents=True, exist_ok=True)
-    labeled.to_parquet(output, index=False)
-    logging.info("Saved labeled flights → %s", output)
+    batches = source.iter_batches(batch_size=batch_size)
+    first = next(batches, None)
+    if first is None:
+        # Empty input: one zero-row batch, so the file still gets the pinned schema.
+        first = source.schema_arrow.empty_table()
+    try:
+        for batch in itertools.chain([first], batches):
+            labeled = label_dataframe(batch.to_pandas())
+            labeled["label_source"] = "ICAO15"
+            merge_counts(counts, compute_counts(labeled))
+
+            table = pa.Table.from_pandas(labeled, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output, _writer_schema(source.schema_arrow, table))
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return counts
+
+
+def run(
+    input_path: Path,
+    output: Path,
+    stats_path: Path,
+    streaming: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    profile_path: Optional[Path] = None,
+) -> dict[str, float]:
+    profiler = StageProfiler("01_label_delays")
+    if streaming:
+        with profiler.step("label_batches") as step:
+            stats = stats_from_counts(label_batches(input_path, output, batch_size))
+            step.rows_in = step.rows_out = int(stats["total_rows"])
+        logging.info("Saved labeled flights (streaming) → %s", output)
+    else:
+        with profiler.step("read") as step:
+            df = pd.read_parquet(input_path)
+            step.rows_out = len(df)
+        with profiler.step("label", rows_in=len(df)) as step:
+            labeled = label_dataframe(df)
+            labeled["label_source"] = "ICAO15"
+            step.rows_out = len(labeled)
+
+        with profiler.step("write", rows_in=len(labeled)):
+            output.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(labeled, preserve_index=False)
+            # Pinned types, as in streaming mode; bounded row groups let readers
+            # skip whole date ranges by their statistics.
+            table = table.cast(_writer_schema(pq.read_schema(input_path), table))
+            pq.write_table(table, output, row_group_size=batch_size)
+        logging.info("Saved labeled flights → %s", output)
+        with profiler.step("stats", rows_in=len(labeled)):
+            stats = compute_stats(labeled)
 
-    stats = compute_stats(labeled)
     stats_path.parent.mkdir(parents=True, exist_ok=True)
     stats_path.write_text(json.dumps(stats, indent=2, ensure_ascii=False))
     logging.info("Stats: %s", stats)
+    profiler.write(profile_path or profile_path_for(stats_path))
 
     return stats
 
@@ -123,7 +224,14 @@ def run(input_path: Path, output: Path, stats_path: Path) -> dict[str, float]:
 def main() -> None:
     args = parse_args()
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-    run(args.input, args.output, args.stats)
+    run(
+        args.input,
+        args.output,
+        args.stats,
+        streaming=args.streaming,
+        batch_size=args.batch_size,
+        profile_path=args.profile,
+    )
 
 
 if __name__ == "__main__":
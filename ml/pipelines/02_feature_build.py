@@ -7,37 +7,43 @@ Outputs
 1. `data/interim/features_congestion.parquet`
 2. `data/interim/congestion_features_stats.json`
 3. Normalized reference tables in `data/interim/kac_*.parquet`
+
+The KAC reference tables are cached: `kac_cache_manifest.json` in the cache
+directory records the SHA-256 of each source workbook, and a workbook is only
+re-parsed when its hash changes. Stale workbooks are parsed concurrently.
+`--kac-only` refreshes that cache and stops, so it can run before the flight
+labels exist.
+
+With `--incremental` the features are upserted into a dataset partitioned by
+airport_code / year_month (`--dataset`) instead of the single parquet file;
+only new or changed (airport, date) keys and their lag dependents are
+recomputed. Only the trailing `--recheck-days` of the dataset and later
+dates are read from the flights file, so a daily run does not scan the
+whole history; older days are final until `--full`. Read it back with
+`table_io.read_feature_dataset`.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import logging
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 
 import numpy as np
 import pandas as pd
 
-AIRSIDE_MAP: Dict[str, str] = {
-    "인천": "ICN",
-    "김포": "GMP",
-    "김해": "PUS",
-    "제주": "CJU",
-    "대구": "TAE",
-    "광주": "KWJ",
-    "무안": "MWX",
-    "청주": "CJJ",
-    "양양": "YNY",
-    "여수": "RSU",
-    "울산": "USN",
-    "목포": "MPK",
-    "사천": "HIN",
-    "포항경주": "KPO",
-    "군산": "KUV",
-    "원주": "WJU",
-}
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from feature_engine import load_feature_engine  # noqa: E402
+from profiling import StageProfiler, profile_path_for  # noqa: E402
+from table_io import FEATURE_DAYS  # noqa: E402
+
+FEATURES = load_feature_engine()
 
 WEEKDAY_MAP = {
     "월요일": 0,
@@ -59,7 +65,24 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--kac-timeseries", type=Path, default=Path("data/raw/kac/kac_timeseries_stats_20050101_20251215.xlsx"))
     parser.add_argument("--output", type=Path, default=Path("data/interim/features_congestion.parquet"))
     parser.add_argument("--stats", type=Path, default=Path("data/interim/congestion_features_stats.json"))
+    parser.add_argument("--profile", type=Path, default=None, help="Profile report (default: next to --stats).")
     parser.add_argument("--cache-dir", type=Path, default=Path("data/interim"))
+    parser.add_argument("--kac-workers", type=int, default=4, help="Processes used to parse stale KAC workbooks.")
+    parser.add_argument("--no-kac-cache", action="store_true", help="Re-parse every KAC workbook.")
+    parser.add_argument(
+        "--kac-only",
+        action="store_true",
+        help="Only refresh the cached KAC reference tables; skip the flight features.",
+    )
+    parser.add_argument("--incremental", action="store_true", help="Upsert new/changed days into --dataset.")
+    parser.add_argument("--dataset", type=Path, default=Path("data/interim/features_congestion"))
+    parser.add_argument("--full", action="store_true", help="With --incremental, rebuild the dataset from scratch.")
+    parser.add_argument(
+        "--recheck-days",
+        type=int,
+        default=DEFAULT_RECHECK_DAYS,
+        help="With --incremental, days before the newest dataset day rescanned for changes; older ones need --full.",
+    )
     return parser.parse_args()
 
 
@@ -77,15 +100,6 @@ def _to_float(value: object) -> Optional[float]:
         return np.nan
 
 
-def _standardize_airport(name: object) -> Optional[str]:
-    if pd.isna(name):
-        return None
-    cleaned = str(name).strip()
-    if not cleaned:
-        return None
-    return AIRSIDE_MAP.get(cleaned, cleaned.upper())
-
-
 def _prepare_base(df: pd.DataFrame, rename_map: Dict[str, str], drop_rows: int) -> pd.DataFrame:
     df = df.copy()
     df = df.dropna(how="all")
@@ -114,7 +128,7 @@ def load_kac_airport(path: Path) -> pd.DataFrame:
     numeric_cols = [c for c in df.columns if c != "airport_name_ko"]
     for col in numeric_cols:
         df[col] = df[col].map(_to_float)
-    df["airport_code"] = df["airport_name_ko"].map(_standardize_airport)
+    df["airport_code"] = df["airport_name_ko"].map(FEATURES.standardize_airport)
     flights_sum = df["flights_total"].sum()
     df["airport_flight_share"] = df["flights_total"] / flights_sum
     return df
@@ -195,144 +209,586 @@ def load_kac_timeseries(path: Path) -> pd.DataFrame:
     df["month"] = df["month"].astype("Int64")
     df = df[df["month"].notna()]
     df["monthly_ratio"] = df["flights_total"] / df["flights_total"].mean()
-    df["airport_code"] = df["airport_name_ko"].map(_standardize_airport)
+    df["airport_code"] = df["airport_name_ko"].map(FEATURES.standardize_airport)
     return df[["airport_code", "year", "month", "monthly_ratio"]]
 
 
-def build_flight_features(flights_path: Path) -> pd.DataFrame:
-    flights = pd.read_parquet(flights_path)
+# name → (loader, cache file under --cache-dir)
+KAC_LOADERS: Dict[str, tuple[Callable[[Path], pd.DataFrame], str]] = {
+    "airport": (load_kac_airport, "kac_airport_stats.parquet"),
+    "hourly": (load_kac_hourly, "kac_hourly_ratios.parquet"),
+    "weekday": (load_kac_weekday, "kac_weekday_ratios.parquet"),
+    "timeseries": (load_kac_timeseries, "kac_monthly_ratios.parquet"),
+}
+
+
+KAC_CACHE_MANIFEST = "kac_cache_manifest.json"
+# Bump when a loader's output changes so existing caches are invalidated.
+KAC_CACHE_VERSION = 1
+
+
+# Partitioned `features_congestion` dataset written by `--incremental`.
+PARTITION_COLUMNS = ["airport_code", "year_month"]
+DATASET_STATE = "_state.json"
+DATASET_VERSION = 2
+# Days before the newest one in the dataset that an incremental run rescans
+# for late rows, times and labels.
+DEFAULT_RECHECK_DAYS = 3
+# Source columns a day's features and labels are computed from; a day whose
+# digest of them changes is recomputed even when its row count does not.
+DIGEST_COLUMNS = [
+    "airport_name",
+    "flight_number",
+    "scheduled_time",
+    "expected_time",
+    "actual_time",
+    "status",
+    "special_status",
+    "delay_minutes",
+    "delay_label",
+]
+SUMMARY_COLUMNS = ["feature_rows", "congestion_sum", "congestion_count", "delay_rate_sum"]
+
+FEATURE_COLUMNS = [
+    "airport_code",
+    "airport_name_ko",
+    "flight_date",
+    "hour",
+    "weekday",
+    "month",
+    "airport_hour_flights",
+    "daily_flights",
+    "airport_daily_avg_flights",
+    "hourly_congestion_ratio",
+    "previous_hour_delay_rate",
+    "prev_day_delay_rate",
+    "delay_rate",
+    "airport_flight_share",
+    "passengers_total",
+    "cargo_total",
+    "national_hour_ratio",
+    "national_weekday_ratio",
+    "national_monthly_ratio",
+]
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_manifest(path: Path) -> Dict[str, Dict[str, object]]:
+    if not path.exists():
+        return {}
+    try:
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError):
+        logging.warning("Ignoring unreadable KAC cache manifest %s", path)
+        return {}
+    if manifest.get("version") != KAC_CACHE_VERSION:
+        return {}
+    return manifest.get("tables", {})
+
+
+def load_kac_tables(
+    sources: Dict[str, Path],
+    cache_dir: Path,
+    max_workers: int = 4,
+    use_cache: bool = True,
+) -> Dict[str, pd.DataFrame]:
+    """Load the KAC reference tables, reusing cached parquet where possible.
+
+    `sources` maps a name from `KAC_LOADERS` to its workbook. A cached table is
+    reused when the manifest entry's hash matches the workbook; the remaining
+    workbooks are parsed in a process pool (`read_excel` holds the GIL) and the
+    cache and manifest are rewritten.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / KAC_CACHE_MANIFEST
+    entries = _read_manifest(manifest_path) if use_cache else {}
+
+    tables: Dict[str, pd.DataFrame] = {}
+    digests: Dict[str, str] = {}
+    stale: Dict[str, Path] = {}
+    for name, source in sources.items():
+        digests[name] = file_sha256(source)
+        cache_path = cache_dir / KAC_LOADERS[name][1]
+        entry = entries.get(name, {})
+        if entry.get("sha256") == digests[name] and cache_path.exists():
+            tables[name] = pd.read_parquet(cache_path)
+            logging.info("KAC %s unchanged; using cache %s", name, cache_path)
+        else:
+            stale[name] = source
+
+    if stale:
+        logging.info("Parsing %d KAC workbook(s): %s", len(stale), ", ".join(stale))
+        if max_workers > 1 and len(stale) > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(stale))) as pool:
+                futures = {name: pool.submit(KAC_LOADERS[name][0], path) for name, path in stale.items()}
+                parsed = {name: future.result() for name, future in futures.items()}
+        else:
+            parsed = {name: KAC_LOADERS[name][0](path) for name, path in stale.items()}
+        for name, df in parsed.items():
+            df.to_parquet(cache_dir / KAC_LOADERS[name][1], index=False)
+            tables[name] = df
+
+    for name, source in sources.items():
+        entries[name] = {"source": str(source), "sha256": digests[name], "cache": KAC_LOADERS[name][1]}
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps({"version": KAC_CACHE_VERSION, "tables": entries}, indent=2, ensure_ascii=False))
+    tmp_path.replace(manifest_path)
+    return tables
+
+
+def prepare_flights(flights: pd.DataFrame) -> pd.DataFrame:
     flights = flights[flights["special_status"].isna()].copy()
     flights["flight_date"] = pd.to_datetime(flights["flight_date"])
-    flights["hour"] = (flights["scheduled_time"] // 100).astype("Int64")
-    flights = flights[flights["hour"].notna()]
-    flights["airport_name_ko"] = flights["airport_name"].str.strip()
-    flights["airport_code"] = flights["airport_name_ko"].map(_standardize_airport)
-    flights["weekday"] = flights["flight_date"].dt.weekday
-    flights["year"] = flights["flight_date"].dt.year
-    flights["month"] = flights["flight_date"].dt.month
-
-    daily_counts = (
-        flights.groupby(["airport_code", "flight_date"])
-        .size()
-        .reset_index(name="daily_flights")
+    flights = FEATURES.apply_frame(flights, "congestion")
+    return flights[flights["hour"].notna()]
+
+
+def _shift_within(values: np.ndarray, group_ids: np.ndarray) -> np.ndarray:
+    """Lag `values` by one row, masking rows that start a new group.
+
+    Assumes the rows are sorted so that each group is contiguous.
+    """
+    shifted = np.empty(len(values), dtype="float64")
+    if len(values) == 0:
+        return shifted
+    shifted[0] = np.nan
+    shifted[1:] = values[:-1]
+    shifted[1:][group_ids[1:] != group_ids[:-1]] = np.nan
+    return shifted
+
+
+def aggregate_days(flights: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Aggregate prepared flights into hourly features and a per-day summary.
+
+    One sorted groupby with built-in reductions produces the hourly counts and
+    label sums; the daily totals and the previous-hour / previous-day lags are
+    derived from that frame with NumPy instead of further groupby/merge passes.
+    The daily frame has one row per (airport, date) with `daily_flights`,
+    `daily_delay_rate` and `prev_day_delay_rate`.
+    """
+    labels = flights["delay_label"].astype("float64")
+    keyed = pd.DataFrame(
+        {
+            "airport_code": flights["airport_code"],
+            "flight_date": flights["flight_date"],
+            "hour": flights["hour"],
+            "has_flight_number": flights["flight_number"].notna(),
+            "labeled": labels.notna(),
+            "delayed": labels.fillna(0.0),
+        }
     )
-    airport_daily_avg = (
-        daily_counts.groupby("airport_code")["daily_flights"].mean().reset_index(name="airport_daily_avg_flights")
-    )
-
     hourly_stats = (
-        flights.groupby(["airport_code", "flight_date", "hour"])
+        keyed.groupby(["airport_code", "flight_date", "hour"], sort=True)
         .agg(
-            airport_hour_flights=("flight_number", "count"),
-            delay_rate=("delay_label", lambda x: x.dropna().mean()),
+            airport_hour_flights=("has_flight_number", "sum"),
+            rows=("labeled", "size"),
+            labeled=("labeled", "sum"),
+            delayed=("delayed", "sum"),
         )
         .reset_index()
     )
-    hourly_stats["delay_rate"] = hourly_stats["delay_rate"].fillna(0.0)
 
-    hourly_stats = hourly_stats.merge(daily_counts, on=["airport_code", "flight_date"], how="left")
-    hourly_stats = hourly_stats.merge(airport_daily_avg, on="airport_code", how="left")
-
-    hourly_stats = hourly_stats.sort_values(["airport_code", "flight_date", "hour"])
-    hourly_stats["previous_hour_delay_rate"] = (
-        hourly_stats.groupby(["airport_code", "flight_date"])["delay_rate"].shift(1)
+    labeled = hourly_stats["labeled"].to_numpy(dtype="float64")
+    delayed = hourly_stats["delayed"].to_numpy(dtype="float64")
+    delay_rate = np.divide(delayed, labeled, out=np.zeros_like(delayed), where=labeled > 0)
+
+    # Rows are sorted by (airport, date, hour), so a change in either key marks
+    # the start of a new day; ngroup on the same keys yields day indices that
+    # line up with the sorted daily frame below.
+    day_ids = hourly_stats.groupby(["airport_code", "flight_date"], sort=True).ngroup().to_numpy()
+    daily = pd.DataFrame(
+        {
+            "airport_code": hourly_stats["airport_code"].to_numpy(),
+            "flight_date": hourly_stats["flight_date"].to_numpy(),
+            "rows": hourly_stats["rows"].to_numpy(),
+            "labeled": labeled,
+            "delayed": delayed,
+        }
+    ).groupby(day_ids, sort=True).agg(
+        airport_code=("airport_code", "first"),
+        flight_date=("flight_date", "first"),
+        daily_flights=("rows", "sum"),
+        labeled=("labeled", "sum"),
+        delayed=("delayed", "sum"),
     )
-
-    daily_delay = (
-        flights.groupby(["airport_code", "flight_date"])["delay_label"]
-        .mean()
-        .reset_index(name="daily_delay_rate")
+    daily_labeled = daily["labeled"].to_numpy()
+    daily["daily_delay_rate"] = np.divide(
+        daily["delayed"].to_numpy(),
+        daily_labeled,
+        out=np.full(len(daily), np.nan),
+        where=daily_labeled > 0,
     )
-    daily_delay["prev_day_delay_rate"] = (
-        daily_delay.sort_values(["airport_code", "flight_date"])
-        .groupby("airport_code")["daily_delay_rate"]
-        .shift(1)
-    )
-
-    hourly_stats = hourly_stats.merge(
-        daily_delay[["airport_code", "flight_date", "prev_day_delay_rate"]],
-        on=["airport_code", "flight_date"],
-        how="left",
-    )
-
-    hourly_stats["hourly_congestion_ratio"] = hourly_stats["airport_hour_flights"] / (
-        hourly_stats["daily_flights"] / 24.0
-    )
-    hourly_stats["hourly_congestion_ratio"] = hourly_stats["hourly_congestion_ratio"].replace([np.inf, -np.inf], np.nan)
+    airport_ids = pd.factorize(daily["airport_code"])[0]
+    daily_avg = daily.groupby(airport_ids, sort=False)["daily_flights"].transform("mean").to_numpy()
+    daily["prev_day_delay_rate"] = _shift_within(daily["daily_delay_rate"].to_numpy(), airport_ids)
+
+    daily_flights = daily["daily_flights"].to_numpy()[day_ids]
+    hourly_stats = hourly_stats.drop(columns=["rows", "labeled", "delayed"])
+    hourly_stats["airport_hour_flights"] = hourly_stats["airport_hour_flights"].astype("int64")
+    hourly_stats["delay_rate"] = delay_rate
+    hourly_stats["daily_flights"] = daily_flights
+    hourly_stats["airport_daily_avg_flights"] = daily_avg[day_ids]
+    hourly_stats["previous_hour_delay_rate"] = _shift_within(delay_rate, day_ids)
+    hourly_stats["prev_day_delay_rate"] = daily["prev_day_delay_rate"].to_numpy()[day_ids]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        congestion = hourly_stats["airport_hour_flights"].to_numpy() / (daily_flights / 24.0)
+    congestion[~np.isfinite(congestion)] = np.nan
+    hourly_stats["hourly_congestion_ratio"] = congestion
     hourly_stats["weekday"] = hourly_stats["flight_date"].dt.weekday
     hourly_stats["month"] = hourly_stats["flight_date"].dt.month
 
-    airport_names = flights[["airport_code", "airport_name_ko"]].drop_duplicates(subset="airport_code")
-    hourly_stats = hourly_stats.merge(airport_names, on="airport_code", how="left")
+    airport_names = flights.drop_duplicates(subset="airport_code").set_index("airport_code")["airport_name_ko"]
+    hourly_stats["airport_name_ko"] = hourly_stats["airport_code"].map(airport_names)
 
-    return hourly_stats
+    daily = daily[["airport_code", "flight_date", "daily_flights", "daily_delay_rate", "prev_day_delay_rate"]]
+    return hourly_stats, daily.reset_index(drop=True)
 
 
-def run_pipeline(args: argparse.Namespace) -> dict[str, float]:
-    kac_airport = load_kac_airport(args.kac_airport)
-    kac_hourly = load_kac_hourly(args.kac_hourly)
-    kac_weekday = load_kac_weekday(args.kac_weekday)
-    kac_timeseries = load_kac_timeseries(args.kac_timeseries)
+def aggregate_flight_features(flights: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate prepared flights into per (airport, date, hour) features."""
+    hourly_stats, _ = aggregate_days(flights)
+    return hourly_stats
 
-    args.cache_dir.mkdir(parents=True, exist_ok=True)
-    kac_airport.to_parquet(args.cache_dir / "kac_airport_stats.parquet", index=False)
-    kac_hourly.to_parquet(args.cache_dir / "kac_hourly_ratios.parquet", index=False)
-    kac_weekday.to_parquet(args.cache_dir / "kac_weekday_ratios.parquet", index=False)
-    kac_timeseries.to_parquet(args.cache_dir / "kac_monthly_ratios.parquet", index=False)
 
-    flight_features = build_flight_features(args.flights)
+def build_flight_features(flights_path: Path) -> pd.DataFrame:
+    return aggregate_flight_features(prepare_flights(pd.read_parquet(flights_path)))
+
 
+def attach_reference_features(flight_features: pd.DataFrame, kac: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     features = flight_features.merge(
-        kac_airport[["airport_code", "airport_flight_share", "passengers_total", "cargo_total"]],
+        kac["airport"][["airport_code", "airport_flight_share", "passengers_total", "cargo_total"]],
         on="airport_code",
         how="left",
     )
-    features = features.merge(kac_hourly.rename(columns={"hour_ratio": "national_hour_ratio"}), on="hour", how="left")
-    features = features.merge(kac_weekday.rename(columns={"weekday_ratio": "national_weekday_ratio"}), on="weekday", how="left")
+    features = features.merge(kac["hourly"].rename(columns={"hour_ratio": "national_hour_ratio"}), on="hour", how="left")
+    features = features.merge(kac["weekday"].rename(columns={"weekday_ratio": "national_weekday_ratio"}), on="weekday", how="left")
 
     monthly_ratio = (
-        kac_timeseries.groupby("month")["monthly_ratio"].mean().reset_index(name="monthly_ratio")
+        kac["timeseries"].groupby("month")["monthly_ratio"].mean().reset_index(name="monthly_ratio")
     )
     features = features.merge(monthly_ratio.rename(columns={"monthly_ratio": "national_monthly_ratio"}), on="month", how="left")
+    return features[FEATURE_COLUMNS]
+
+
+def scan_source_days(flights_path: Path, since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Row count and content digest per source (airport, date), from `since` on.
+
+    The digest is the wrapping sum of the row hashes of `DIGEST_COLUMNS`, so it
+    does not depend on row order. `since` is pushed down to the parquet
+    reader: row groups whose `flight_date` statistics end before it are not
+    read (01_label_delays keeps the master table's date order in row groups
+    of bounded size).
+    """
+    filters = [("flight_date", ">=", since)] if since is not None else None
+    source = pd.read_parquet(flights_path, columns=["flight_date", *DIGEST_COLUMNS], filters=filters)
+    keys = pd.DataFrame({"airport_name": source["airport_name"], "flight_date": pd.to_datetime(source["flight_date"])})
+    keys = FEATURES.apply_frame(keys, ["airport_code"])
+    keys["source_digest"] = pd.util.hash_pandas_object(source[DIGEST_COLUMNS], index=False).to_numpy().view("int64")
+    return (
+        keys.groupby(["airport_code", "flight_date"], sort=True)
+        .agg(source_rows=("source_digest", "size"), source_digest=("source_digest", "sum"))
+        .reset_index()
+    )
 
-    output_cols = [
-        "airport_code",
-        "airport_name_ko",
-        "flight_date",
-        "hour",
-        "weekday",
-        "month",
-        "airport_hour_flights",
-        "daily_flights",
-        "airport_daily_avg_flights",
-        "hourly_congestion_ratio",
-        "previous_hour_delay_rate",
-        "prev_day_delay_rate",
-        "delay_rate",
-        "airport_flight_share",
-        "passengers_total",
-        "cargo_total",
-        "national_hour_ratio",
-        "national_weekday_ratio",
-        "national_monthly_ratio",
-    ]
-    features = features[output_cols]
-
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    features.to_parquet(args.output, index=False)
-    logging.info("Saved congestion features → %s (%d rows)", args.output, len(features))
-
-    stats = {
-        "rows": int(len(features)),
-        "airports": int(features["airport_code"].nunique()),
-        "date_start": str(features["flight_date"].min()),
-        "date_end": str(features["flight_date"].max()),
-        "avg_hourly_congestion": float(features["hourly_congestion_ratio"].mean()),
-        "avg_delay_rate": float(features["delay_rate"].mean()),
+
+def load_source_days(flights_path: Path, days: pd.DataFrame) -> pd.DataFrame:
+    """Load only the flights belonging to the (airport, date) keys in `days`."""
+    dates = sorted(pd.Timestamp(value) for value in days["flight_date"].unique())
+    flights = pd.read_parquet(flights_path, filters=[("flight_date", "in", dates)])
+    flights = prepare_flights(flights)
+    wanted = pd.MultiIndex.from_frame(days[["airport_code", "flight_date"]])
+    keys = pd.MultiIndex.from_frame(flights[["airport_code", "flight_date"]])
+    return flights[keys.isin(wanted)]
+
+
+def _partition_dir(root: Path, airport_code: str, year_month: str) -> Path:
+    return root / f"airport_code={airport_code}" / f"year_month={year_month}"
+
+
+def _day_keys(df: pd.DataFrame) -> pd.MultiIndex:
+    return pd.MultiIndex.from_frame(df[["airport_code", "flight_date"]])
+
+
+def _empty_days() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "airport_code": pd.Series(dtype="object"),
+            "flight_date": pd.Series(dtype="datetime64[ns]"),
+            "source_rows": pd.Series(dtype="int64"),
+            "source_digest": pd.Series(dtype="int64"),
+            "daily_flights": pd.Series(dtype="int64"),
+            "daily_delay_rate": pd.Series(dtype="float64"),
+            "prev_day_delay_rate": pd.Series(dtype="float64"),
+            "feature_rows": pd.Series(dtype="int64"),
+            "congestion_sum": pd.Series(dtype="float64"),
+            "congestion_count": pd.Series(dtype="int64"),
+            "delay_rate_sum": pd.Series(dtype="float64"),
+        }
+    )
+
+
+def _read_dataset_state(root: Path) -> tuple[Dict[str, object], pd.DataFrame]:
+    state_path = root / DATASET_STATE
+    days_path = root / FEATURE_DAYS
+    if not state_path.exists() or not days_path.exists():
+        return {}, _empty_days()
+    return json.loads(state_path.read_text()), pd.read_parquet(days_path)
+
+
+def _upsert_partitions(root: Path, rows: pd.DataFrame, replaced: pd.DataFrame) -> int:
+    """Replace the `replaced` days in their partitions with `rows`.
+
+    Only the airport/month partitions touched by `replaced` are rewritten.
+    """
+    replaced = replaced.assign(year_month=replaced["flight_date"].dt.strftime("%Y-%m"))
+    rows = rows.assign(year_month=rows["flight_date"].dt.strftime("%Y-%m"))
+    partitions = replaced[["airport_code", "year_month"]].drop_duplicates()
+    for airport_code, year_month in partitions.itertuples(index=False):
+        part_dir = _partition_dir(root, airport_code, year_month)
+        part_path = part_dir / "part-0.parquet"
+        in_partition = (rows["airport_code"] == airport_code) & (rows["year_month"] == year_month)
+        frames = [rows[in_partition].drop(columns=PARTITION_COLUMNS)]
+        if part_path.exists():
+            existing = pd.read_parquet(part_path)
+            drop_dates = replaced.loc[
+                (replaced["airport_code"] == airport_code) & (replaced["year_month"] == year_month), "flight_date"
+            ]
+            frames.insert(0, existing[~existing["flight_date"].isin(drop_dates)])
+        merged = pd.concat(frames, ignore_index=True).sort_values(["flight_date", "hour"], ignore_index=True)
+        if merged.empty:
+            if part_path.exists():
+                part_path.unlink()
+            continue
+        part_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = part_dir / ".part-0.parquet.tmp"
+        merged.to_parquet(tmp_path, index=False)
+        tmp_path.replace(part_path)
+    return len(partitions)
+
+
+def _summarize_days(features: pd.DataFrame) -> pd.DataFrame:
+    """Per-day sums used to rebuild the dataset-wide stats without a full scan."""
+    congestion = features["hourly_congestion_ratio"]
+    return (
+        features.assign(
+            congestion_sum=congestion.fillna(0.0),
+            congestion_count=congestion.notna().astype("int64"),
+        )
+        .groupby(["airport_code", "flight_date"], sort=True)
+        .agg(
+            feature_rows=("hour", "size"),
+            congestion_sum=("congestion_sum", "sum"),
+            congestion_count=("congestion_count", "sum"),
+            delay_rate_sum=("delay_rate", "sum"),
+        )
+    )
+
+
+def _dataset_stats(days: pd.DataFrame) -> dict[str, object]:
+    present = days[days["feature_rows"] > 0]
+    rows = int(present["feature_rows"].sum())
+    congestion_count = int(present["congestion_count"].sum())
+    return {
+        "rows": rows,
+        "airports": int(present["airport_code"].nunique()),
+        "date_start": str(present["flight_date"].min()),
+        "date_end": str(present["flight_date"].max()),
+        "avg_hourly_congestion": float(present["congestion_sum"].sum() / congestion_count) if congestion_count else None,
+        "avg_delay_rate": float(present["delay_rate_sum"].sum() / rows) if rows else None,
     }
+
+
+def _previous_day_lag(days: pd.DataFrame) -> np.ndarray:
+    """`prev_day_delay_rate` per day, skipping days without usable flights."""
+    lag = np.full(len(days), np.nan)
+    with_flights = (days["daily_flights"] > 0).to_numpy()
+    active = days[with_flights]
+    lag[with_flights] = _shift_within(
+        active["daily_delay_rate"].to_numpy(dtype="float64"),
+        pd.factorize(active["airport_code"])[0],
+    )
+    return lag
+
+
+def update_feature_dataset(
+    flights_path: Path,
+    root: Path,
+    kac: Dict[str, pd.DataFrame],
+    kac_digests: Dict[str, str],
+    full: bool = False,
+    recheck_days: int = DEFAULT_RECHECK_DAYS,
+) -> dict[str, object]:
+    """Recompute features only for new or changed (airport, date) keys.
+
+    Only source days from `recheck_days` before the newest day in
+    `_days.parquet` on are scanned, so the cost follows the new data rather
+    than the history; a change to an older day needs `full`. A scanned day
+    is dirty when its source row count or content digest differs from the
+    recorded one, so a later poll that fills in times, statuses or labels
+    without adding rows is picked up. Hourly features and
+    `previous_hour_delay_rate` depend on the day alone; `prev_day_delay_rate`
+    is resolved from the per-day summary, and an untouched day is recomputed
+    only when its lag moves (e.g. the day after a late-filled date).
+    `airport_daily_avg_flights` spans the whole history, so it is kept out of
+    the partitions and attached by `table_io.read_feature_dataset`. A KAC
+    workbook change triggers a full rebuild.
+    """
+    state, previous = _read_dataset_state(root)
+    if full or state.get("version") != DATASET_VERSION or state.get("kac") != kac_digests:
+        if root.exists():
+            logging.info("Rebuilding feature dataset %s from scratch", root)
+            shutil.rmtree(root)
+        previous = _empty_days()
+    root.mkdir(parents=True, exist_ok=True)
+
+    since = None if previous.empty else previous["flight_date"].max() - pd.Timedelta(days=recheck_days)
+    source_days = scan_source_days(flights_path, since)
+    rechecked = previous if since is None else previous[previous["flight_date"] >= since]
+    compared = source_days.merge(
+        rechecked[["airport_code", "flight_date", "source_rows", "source_digest"]],
+        on=["airport_code", "flight_date"],
+        how="outer",
+        suffixes=("", "_previous"),
+        indicator=True,
+    )
+    removed = compared.loc[compared["_merge"] == "right_only", ["airport_code", "flight_date"]]
+    dirty = compared.loc[
+        (compared["_merge"] == "left_only")
+        | (
+            (compared["_merge"] == "both")
+            & (
+                (compared["source_rows"] != compared["source_rows_previous"])
+                | (compared["source_digest"] != compared["source_digest_previous"])
+            )
+        ),
+        ["airport_code", "flight_date", "source_rows", "source_digest"],
+    ]
+    dirty = dirty.astype({"source_rows": "int64", "source_digest": "int64"})
+    logging.info(
+        "Feature dataset: %d source days scanned (from %s), %d new/changed, %d removed",
+        len(source_days),
+        "the start" if since is None else since.date(),
+        len(dirty),
+        len(removed),
+    )
+
+    hourly = pd.DataFrame()
+    fresh = dirty.copy()
+    if not dirty.empty:
+        hourly, daily = aggregate_days(load_source_days(flights_path, dirty))
+        fresh = fresh.merge(
+            daily[["airport_code", "flight_date", "daily_flights", "daily_delay_rate"]],
+            on=["airport_code", "flight_date"],
+            how="left",
+        )
+    fresh = fresh.reindex(columns=_empty_days().columns)
+    fresh["daily_flights"] = fresh["daily_flights"].fillna(0).astype("int64")
+
+    stale = _day_keys(previous).isin(_day_keys(dirty)) | _day_keys(previous).isin(_day_keys(removed))
+    days = pd.concat([previous[~stale], fresh], ignore_index=True)
+    days = days.sort_values(["airport_code", "flight_date"], ignore_index=True)
+    old_lag = days["prev_day_delay_rate"].to_numpy(dtype="float64")
+    days["prev_day_delay_rate"] = _previous_day_lag(days)
+
+    lag_moved = ~np.isclose(old_lag, days["prev_day_delay_rate"].to_numpy(), equal_nan=True)
+    relagged = days.loc[lag_moved & ~_day_keys(days).isin(_day_keys(dirty)), ["airport_code", "flight_date"]]
+    if not relagged.empty:
+        logging.info("Recomputing %d day(s) whose previous-day lag changed", len(relagged))
+        extra, _ = aggregate_days(load_source_days(flights_path, relagged))
+        hourly = pd.concat([hourly, extra], ignore_index=True) if not hourly.empty else extra
+
+    touched = pd.concat([dirty[["airport_code", "flight_date"]], relagged, removed], ignore_index=True)
+    if touched.empty:
+        logging.info("Feature dataset %s is up to date", root)
+    else:
+        features = pd.DataFrame(columns=FEATURE_COLUMNS)
+        if not hourly.empty:
+            lag_by_day = days.set_index(["airport_code", "flight_date"])["prev_day_delay_rate"]
+            hourly["prev_day_delay_rate"] = lag_by_day.reindex(_day_keys(hourly)).to_numpy()
+            features = attach_reference_features(hourly, kac)
+
+        # Refresh the stats sums of every recomputed day (zero when it has no rows).
+        summary = _summarize_days(features).reindex(_day_keys(days))
+        recomputed = _day_keys(days).isin(_day_keys(touched))
+        for col in SUMMARY_COLUMNS:
+            values = summary[col].astype("float64").fillna(0.0).to_numpy()
+            days[col] = np.where(recomputed, values, days[col].to_numpy(dtype="float64"))
+        days = days.astype({"feature_rows": "int64", "congestion_count": "int64"})
+
+        partitions = _upsert_partitions(root, features.drop(columns=["airport_daily_avg_flights"]), touched)
+        logging.info("Rewrote %d partition(s) under %s", partitions, root)
+
+    days.to_parquet(root / FEATURE_DAYS, index=False)
+    (root / DATASET_STATE).write_text(
+        json.dumps({"version": DATASET_VERSION, "kac": kac_digests}, indent=2, ensure_ascii=False)
+    )
+    return _dataset_stats(days)
+
+
+def run_pipeline(args: argparse.Namespace) -> dict[str, float]:
+    profiler = StageProfiler("02_feature_build")
+    with profiler.step("kac_tables") as step:
+        kac = load_kac_tables(
+            {
+                "airport": args.kac_airport,
+                "hourly": args.kac_hourly,
+                "weekday": args.kac_weekday,
+                "timeseries": args.kac_timeseries,
+            },
+            args.cache_dir,
+            max_workers=args.kac_workers,
+            use_cache=not args.no_kac_cache,
+        )
+        step.rows_out = sum(len(df) for df in kac.values())
+    if args.kac_only:
+        logging.info("Refreshed %d KAC reference tables in %s", len(kac), args.cache_dir)
+        profiler.write(args.profile or args.cache_dir / "kac_tables_profile.json")
+        return {name: float(len(df)) for name, df in kac.items()}
+
+    if args.incremental:
+        manifest = _read_manifest(args.cache_dir / KAC_CACHE_MANIFEST)
+        kac_digests = {name: str(entry.get("sha256")) for name, entry in sorted(manifest.items())}
+        with profiler.step("update_dataset") as step:
+            stats = update_feature_dataset(
+                args.flights, args.dataset, kac, kac_digests, full=args.full, recheck_days=args.recheck_days
+            )
+            step.rows_out = int(stats.get("rows", 0))
+    else:
+        with profiler.step("read_flights") as step:
+            flights = prepare_flights(pd.read_parquet(args.flights))
+            step.rows_out = len(flights)
+        with profiler.step("aggregate", rows_in=len(flights)) as step:
+            flight_features = aggregate_flight_features(flights)
+            step.rows_out = len(flight_features)
+        with profiler.step("attach_reference", rows_in=len(flight_features)) as step:
+            features = attach_reference_features(flight_features, kac)
+            step.rows_out = len(features)
+
+        with profiler.step("write", rows_in=len(features)):
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            features.to_parquet(args.output, index=False)
+        logging.info("Saved congestion features → %s (%d rows)", args.output, len(features))
+
+        stats = {
+            "rows": int(len(features)),
+            "airports": int(features["airport_code"].nunique()),
+            "date_start": str(features["flight_date"].min()),
+            "date_end": str(features["flight_date"].max()),
+            "avg_hourly_congestion": float(features["hourly_congestion_ratio"].mean()),
+            "avg_delay_rate": float(features["delay_rate"].mean()),
+        }
     args.stats.parent.mkdir(parents=True, exist_ok=True)
     args.stats.write_text(json.dumps(stats, indent=2, ensure_ascii=False))
     logging.info("Stats: %s", stats)
+    profiler.write(args.profile or profile_path_for(args.stats))
     return stats
 
 
@@ -7,53 +7,57 @@ python ml/pipelines/03_build_train_table.py \
   --flights data/interim/flights_labeled.parquet \
   --congestion data/interim/features_congestion.parquet \
   --output data/processed/train_table.parquet
+
+Add `--streaming` to join the flights row group by row group; the congestion
+table is small and stays fully in memory.
+
+Add `--partitioned` to write a hive-partitioned dataset (airport_code /
+year_month) to `--dataset` instead of the single `--output` file; consumers
+read either through `ml/table_io.read_table`.
+
+The join packs (airport_code, flight_date, hour) into one int64 key and looks
+flights up in the sorted congestion keys; `--join merge` keeps the generic
+pandas merge on the object columns for comparison.
 """
 
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
 import logging
+import sys
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-AIRSIDE_MAP: Dict[str, str] = {
-    "인천": "ICN",
-    "김포": "GMP",
-    "김해": "PUS",
-    "제주": "CJU",
-    "대구": "TAE",
-    "광주": "KWJ",
-    "무안": "MWX",
-    "청주": "CJJ",
-    "양양": "YNY",
-    "여수": "RSU",
-    "울산": "USN",
-    "목포": "MPK",
-    "사천": "HIN",
-    "포항경주": "KPO",
-    "군산": "KUV",
-    "원주": "WJU",
-}
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from feature_engine import load_feature_engine  # noqa: E402
+from profiling import StageProfiler, profile_path_for  # noqa: E402
+from table_io import read_feature_dataset, write_partitioned_table  # noqa: E402
 
-NUMERIC_FEATURES = [
-    "airport_hour_flights",
-    "daily_flights",
-    "airport_daily_avg_flights",
-    "hourly_congestion_ratio",
-    "previous_hour_delay_rate",
-    "prev_day_delay_rate",
-    "delay_rate",
-    "airport_flight_share",
-    "passengers_total",
-    "cargo_total",
-    "national_hour_ratio",
-    "national_weekday_ratio",
-    "national_monthly_ratio",
-]
+FEATURES = load_feature_engine()
+NUMERIC_FEATURES = FEATURES.numeric_features
+
+DEFAULT_BATCH_SIZE = 65_536
+JOIN_KEYS = ["airport_code", "flight_date", "hour"]
+JOIN_METHODS = ["packed", "merge"]
+HOURS_PER_DAY = 24
+
+# Arrow types for columns derived while loading flights, pinned so an all-null
+# batch cannot fix the writer schema to the `null` type.
+DERIVED_COLUMN_TYPES: Dict[str, pa.DataType] = {
+    "hour": pa.int64(),
+    "weekday": pa.int32(),
+    "month": pa.int32(),
+    "is_weekend": pa.int64(),
+    "scheduled_minutes": pa.int64(),
+    "airport_code": pa.string(),
+}
 
 
 def parse_args() -> argparse.Namespace:
@@ -61,84 +65,311 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--flights", type=Path, default=Path("data/interim/flights_labeled.parquet"))
     parser.add_argument("--congestion", type=Path, default=Path("data/interim/features_congestion.parquet"))
     parser.add_argument("--output", type=Path, default=Path("data/processed/train_table.parquet"))
+    parser.add_argument("--dataset", type=Path, default=Path("data/processed/train_table"))
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="Write a dataset partitioned by airport_code/year_month to --dataset instead of --output.",
+    )
     parser.add_argument("--stats", type=Path, default=Path("data/processed/train_table_stats.json"))
+    parser.add_argument("--profile", type=Path, default=None, help="Profile report (default: next to --stats).")
+    parser.add_argument("--streaming", action="store_true", help="Process the flights in row-group batches.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch in streaming mode.")
+    parser.add_argument("--join", choices=JOIN_METHODS, default="packed", help="Join implementation.")
     return parser.parse_args()
 
 
-def _standardize_airport(name: object) -> Optional[str]:
-    if pd.isna(name):
-        return None
-    cleaned = str(name).strip()
-    if not cleaned:
-        return None
-    return AIRSIDE_MAP.get(cleaned, cleaned.upper())
-
-
-def load_flights(path: Path) -> pd.DataFrame:
-    df = pd.read_parquet(path)
+def prepare_flights(df: pd.DataFrame) -> pd.DataFrame:
     df = df[df["special_status"].isna()].copy()
     df = df[df["delay_label"].notna()]
     df["flight_date"] = pd.to_datetime(df["flight_date"])
-    df["hour"] = (df["scheduled_time"] // 100).astype("Int64")
-    df = df[df["hour"].notna()]
-    df["weekday"] = df["flight_date"].dt.weekday
-    df["month"] = df["flight_date"].dt.month
-    df["is_weekend"] = df["weekday"].isin([5, 6]).astype("Int64")
-    df["scheduled_minutes"] = ((df["hour"] * 60) + (df["scheduled_time"] % 100)).astype("Int64")
-    df["airport_code"] = df["airport_name"].map(_standardize_airport)
-    return df
+    df = FEATURES.apply_frame(df, "train_table")
+    return df[df["hour"].notna()]
+
+
+def load_flights(path: Path) -> pd.DataFrame:
+    return prepare_flights(pd.read_parquet(path))
+
+
+def iter_flights(path: Path, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    source = pq.ParquetFile(path)
+    for batch in source.iter_batches(batch_size=batch_size):
+        yield prepare_flights(batch.to_pandas())
 
 
 def load_congestion(path: Path) -> pd.DataFrame:
-    df = pd.read_parquet(path)
+    df = read_feature_dataset(path) if path.is_dir() else pd.read_parquet(path)
     df["flight_date"] = pd.to_datetime(df["flight_date"])
     return df
 
 
-def impute_numeric(df: pd.DataFrame, ref: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def compute_fill_values(ref: pd.DataFrame) -> Dict[str, float]:
     medians = ref[NUMERIC_FEATURES].median()
+    fill_values: Dict[str, float] = {}
     for col in NUMERIC_FEATURES:
         fill_value = medians.get(col)
         if pd.isna(fill_value):
             fill_value = 0.0
-        df[col] = df[col].fillna(fill_value)
+        fill_values[col] = fill_value
+    return fill_values
+
+
+def impute_numeric(
+    df: pd.DataFrame,
+    ref: pd.DataFrame,
+    fill_values: Optional[Dict[str, float]] = None,
+    inplace: bool = False,
+) -> pd.DataFrame:
+    if not inplace:
+        df = df.copy()
+    if fill_values is None:
+        fill_values = compute_fill_values(ref)
+    for col in NUMERIC_FEATURES:
+        dtype = df[col].dtype
+        if inplace and isinstance(dtype, np.dtype) and dtype.kind == "f":
+            # Plain numpy float column: fill the existing buffer, no new column.
+            values = df[col].to_numpy(copy=False)
+            np.copyto(values, fill_values[col], where=np.isnan(values))
+        else:
+            df[col] = df[col].fillna(fill_values[col])
     return df
 
 
-def build_train_table(flights: pd.DataFrame, congestion: pd.DataFrame) -> pd.DataFrame:
-    merged = flights.merge(
-        congestion,
-        on=["airport_code", "flight_date", "hour"],
-        how="left",
-        suffixes=("", "_agg"),
-    )
-    merged = impute_numeric(merged, congestion)
-    return merged
+class CongestionIndex:
+    """Sorted packed-key lookup over the congestion table.
+
+    (airport_code, flight_date, hour) is packed into a single int64 as
+    `(airport * n_days + day) * 24 + hour`, with airports numbered by their
+    position in the sorted congestion codes and days counted from the first
+    congestion date. Flights whose airport, date or hour falls outside the
+    table get key -1 and no match, like the rows a left merge leaves empty.
+    """
+
+    def __init__(self, congestion: pd.DataFrame) -> None:
+        self.airports = pd.Index(np.sort(congestion["airport_code"].dropna().unique()))
+        dates = congestion["flight_date"].to_numpy(dtype="datetime64[D]")
+        self.first_day = dates.min() if len(dates) else np.datetime64(0, "D")
+        self.n_days = int((dates.max() - self.first_day).astype(np.int64)) + 1 if len(dates) else 0
+
+        keys = self.pack(congestion)
+        if (keys < 0).any() or len(np.unique(keys)) != len(keys):
+            raise ValueError("Congestion table keys must be unique and non-null.")
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        self.columns = _column_runs(congestion[[col for col in congestion.columns if col not in JOIN_KEYS]])
+
+    def pack(self, df: pd.DataFrame) -> np.ndarray:
+        airport = self.airports.get_indexer(df["airport_code"])
+        day = (df["flight_date"].to_numpy(dtype="datetime64[D]") - self.first_day).astype(np.int64)
+        hour = df["hour"].to_numpy(dtype="float64", na_value=np.nan)
+        valid = (airport >= 0) & (day >= 0) & (day < self.n_days) & (hour >= 0) & (hour < HOURS_PER_DAY)
+        keys = np.full(len(df), -1, dtype=np.int64)
+        keys[valid] = (airport[valid] * self.n_days + day[valid]) * HOURS_PER_DAY + hour[valid].astype(np.int64)
+        return keys
+
+    def lookup(self, df: pd.DataFrame) -> np.ndarray:
+        """Congestion row position for each row of `df`, -1 when unmatched."""
+        keys = self.pack(df)
+        if not len(self.sorted_keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.searchsorted(self.sorted_keys, keys)
+        pos = np.minimum(pos, len(self.sorted_keys) - 1)
+        found = (self.sorted_keys[pos] == keys) & (keys >= 0)
+        return np.where(found, self.order[pos], -1)
+
+    def join(self, flights: pd.DataFrame) -> pd.DataFrame:
+        """Left-join the congestion columns onto `flights` (suffix `_agg` on clashes)."""
+        rows = self.lookup(flights)
+        # Relabel without copying the flight columns; merge also returns a RangeIndex.
+        parts = [flights.set_axis(pd.RangeIndex(len(flights)), axis=0, copy=False)]
+        for names, values in self.columns:
+            names = [f"{col}_agg" if col in flights.columns else col for col in names]
+            # allow_fill upcasts (int → float, bool → object) only when a row is
+            # unmatched, which is what `merge(how="left")` does.
+            if isinstance(values, np.ndarray):
+                taken = pd.api.extensions.take(values, rows, axis=1, allow_fill=True)
+                parts.append(pd.DataFrame(taken.T, columns=names, copy=False))
+            else:
+                taken = pd.api.extensions.take(values, rows, allow_fill=True)
+                parts.append(pd.DataFrame({names[0]: taken}, copy=False))
+        return pd.concat(parts, axis=1, copy=False)
+
+
+def _column_runs(df: pd.DataFrame) -> List[Tuple[List[str], object]]:
+    """Split `df` into runs of adjacent same-dtype columns.
+
+    numpy runs are stored as one (columns × rows) array so a join takes each
+    run in a single call and hands pandas a ready-made block; extension
+    columns stay one array each.
+    """
+    runs: List[Tuple[List[str], object]] = []
+    for col, dtype in df.dtypes.items():
+        if runs and isinstance(dtype, np.dtype) and dtype == runs[-1][1]:
+            runs[-1][0].append(col)
+        else:
+            runs.append(([col], dtype))
+    return [
+        (names, np.ascontiguousarray(df[names].to_numpy().T) if isinstance(dtype, np.dtype) else df[names[0]].array)
+        for names, dtype in runs
+    ]
+
+
+def merge_congestion(flights: pd.DataFrame, congestion: pd.DataFrame) -> pd.DataFrame:
+    return flights.merge(congestion, on=JOIN_KEYS, how="left", suffixes=("", "_agg"))
+
+
+def build_train_table(
+    flights: pd.DataFrame,
+    congestion: pd.DataFrame,
+    fill_values: Optional[Dict[str, float]] = None,
+    index: Optional[CongestionIndex] = None,
+) -> pd.DataFrame:
+    """Join congestion features onto flights and impute missing numerics.
+
+    With an `index` the join is a packed-key lookup and the joined frame is
+    imputed in place; without one it falls back to a pandas merge.
+    """
+    if index is None:
+        merged = merge_congestion(flights, congestion)
+        return impute_numeric(merged, congestion, fill_values)
+    merged = index.join(flights)
+    return impute_numeric(merged, congestion, fill_values, inplace=True)
+
+
+def congestion_index(congestion: pd.DataFrame, join: str) -> Optional[CongestionIndex]:
+    return CongestionIndex(congestion) if join == "packed" else None
+
+
+class TrainStatsAccumulator:
+    """Running version of the train-table stats, fed one batch at a time."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.airports: set[str] = set()
+        self.delayed = 0.0
+        self.labeled = 0
+        self.date_start: Optional[pd.Timestamp] = None
+        self.date_end: Optional[pd.Timestamp] = None
+        self.missing = {col: 0 for col in NUMERIC_FEATURES}
+
+    def update(self, train: pd.DataFrame) -> None:
+        if train.empty:
+            return
+        self.rows += int(len(train))
+        self.airports.update(train["airport_code"].dropna().unique())
+        labels = train["delay_label"].dropna()
+        self.delayed += float(labels.sum())
+        self.labeled += int(labels.count())
+        batch_start = train["flight_date"].min()
+        batch_end = train["flight_date"].max()
+        self.date_start = batch_start if self.date_start is None else min(self.date_start, batch_start)
+        self.date_end = batch_end if self.date_end is None else max(self.date_end, batch_end)
+        for col in NUMERIC_FEATURES:
+            self.missing[col] += int(train[col].isna().sum())
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "rows": self.rows,
+            "airports": len(self.airports),
+            "delay_rate": self.delayed / self.labeled if self.labeled else float("nan"),
+            "date_start": str(self.date_start),
+            "date_end": str(self.date_end),
+            "missing_after_impute": dict(self.missing),
+        }
+
+
+def _writer_schema(flights_schema: pa.Schema, congestion_schema: pa.Schema, chunk: pa.Table) -> pa.Schema:
+    known = {field.name: field.type for field in congestion_schema}
+    known.update({f"{field.name}_agg": field.type for field in congestion_schema})
+    known.update({field.name: field.type for field in flights_schema})
+    known.update(DERIVED_COLUMN_TYPES)
+    fields = [pa.field(field.name, known.get(field.name, field.type)) for field in chunk.schema]
+    return pa.schema(fields, metadata=chunk.schema.metadata)
+
+
+def build_train_table_batches(
+    flights_path: Path,
+    congestion: pd.DataFrame,
+    output: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    join: str = "packed",
+    partitioned: bool = False,
+) -> dict[str, object]:
+    """Join and impute flights batch by batch, appending each batch to `output`.
+
+    With `partitioned`, `output` is the dataset root and the batches are
+    routed to their airport_code/year_month partitions.
+    """
+    fill_values = compute_fill_values(congestion)
+    index = congestion_index(congestion, join)
+    flights_schema = pq.ParquetFile(flights_path).schema_arrow
+    congestion_schema = pa.Schema.from_pandas(congestion, preserve_index=False)
+    accumulator = TrainStatsAccumulator()
+
+    def train_batches() -> Iterator[pd.DataFrame]:
+        for flights in iter_flights(flights_path, batch_size):
+            train = build_train_table(flights, congestion, fill_values, index)
+            accumulator.update(train)
+            yield train
+
+    batches = train_batches()
+    first = next(batches, None)
+    if first is None:
+        # Empty input: a zero-row table with the pinned schema, as the in-memory path writes.
+        first = build_train_table(prepare_flights(flights_schema.empty_table().to_pandas()), congestion, fill_values, index)
+    schema = _writer_schema(flights_schema, congestion_schema, pa.Table.from_pandas(first, preserve_index=False))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if partitioned:
+        write_partitioned_table(itertools.chain([first], batches), output, schema=schema)
+        return accumulator.to_dict()
+    with pq.ParquetWriter(output, schema) as writer:
+        for train in itertools.chain([first], batches):
+            writer.write_table(pa.Table.from_pandas(train, preserve_index=False).cast(schema))
+    return accumulator.to_dict()
 
 
 def run_pipeline(args: argparse.Namespace) -> dict[str, object]:
-    flights = load_flights(args.flights)
-    congestion = load_congestion(args.congestion)
-    train = build_train_table(flights, congestion)
-
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    train.to_parquet(args.output, index=False)
-    logging.info("Saved train table → %s (%d rows)", args.output, len(train))
-
-    stats = {
-        "rows": int(len(train)),
-        "airports": int(train["airport_code"].nunique()),
-        "delay_rate": float(train["delay_label"].mean()),
-        "date_start": str(train["flight_date"].min()),
-        "date_end": str(train["flight_date"].max()),
-        "missing_after_impute": {
-            col: int(train[col].isna().sum()) for col in NUMERIC_FEATURES
-        },
-    }
+    profiler = StageProfiler("03_build_train_table")
+    with profiler.step("read_congestion") as step:
+        congestion = load_congestion(args.congestion)
+        step.rows_out = len(congestion)
+    target = args.dataset if args.partitioned else args.output
+    if args.streaming:
+        with profiler.step("join_batches") as step:
+            stats = build_train_table_batches(
+                args.flights, congestion, target, args.batch_size, args.join, args.partitioned
+            )
+            step.rows_out = int(stats["rows"])
+        logging.info("Saved train table (streaming) → %s (%d rows)", target, stats["rows"])
+    else:
+        with profiler.step("read_flights") as step:
+            flights = load_flights(args.flights)
+            step.rows_out = len(flights)
+        with profiler.step("join", rows_in=len(flights)) as step:
+            train = build_train_table(flights, congestion, index=congestion_index(congestion, args.join))
+            step.rows_out = len(train)
+
+        with profiler.step("write", rows_in=len(train)):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if args.partitioned:
+                write_partitioned_table(train, target)
+            else:
+                # Pinned types, as in streaming mode (an empty table has no object values to infer from).
+                table = pa.Table.from_pandas(train, preserve_index=False)
+                congestion_schema = pa.Schema.from_pandas(congestion, preserve_index=False)
+                pq.write_table(table.cast(_writer_schema(pq.read_schema(args.flights), congestion_schema, table)), target)
+        logging.info("Saved train table → %s (%d rows)", target, len(train))
+
+        with profiler.step("stats", rows_in=len(train)):
+            accumulator = TrainStatsAccumulator()
+            accumulator.update(train)
+            stats = accumulator.to_dict()
+
     args.stats.parent.mkdir(parents=True, exist_ok=True)
     args.stats.write_text(json.dumps(stats, indent=2, ensure_ascii=False))
     logging.info("Stats: %s", stats)
+    profiler.write(args.profile or profile_path_for(args.stats))
     return stats
 
 
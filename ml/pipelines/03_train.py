@@ -2,26 +2,63 @@
 Phase 8 training pipeline.
 
 Trains baseline models (Logistic Regression, RandomForest) and gradient boosting
-models (XGBoost, CatBoost, LightGBM) on `data/processed/train_table.parquet`.
+models (XGBoost, CatBoost, LightGBM) on `data/processed/train_table.parquet`
+(or the partitioned `data/processed/train_table/` dataset; `--airports` and
+`--start-date/--end-date` are pushed down to the parquet reader).
 Outputs:
   - Trained models under `ml/artifacts/models/*.joblib`
   - Metrics/thresholds under `ml/artifacts/reports/metrics.json`
   - Feature importance under `ml/artifacts/reports/feature_importance.json`
+  - Per-model fit time, plus the size, load time and latency of its serving
+    bundle (measured one model at a time after training) under
+    `metrics.json` → `<model>.benchmark`; the production pick
+    (`--latency-budget-ms`, `--min-auc`) in `ml/artifacts/reports/model_selection.json`
+  - `--tune`: successive-halving search over `TUNING_SPACE` with time-ordered
+    CV folds and early stopping; the winners are trained and recorded under
+    `metrics.json` → `<model>.tuning`
+  - `--warm-start`: LightGBM/XGBoost get `--warm-trees` more trees fitted on
+    flights after their saved cutoff; val AUC lost on the new rows since the
+    last full fit beyond `--drift-tolerance` falls back to a full retrain
+    (`metrics.json` → `<model>.warm_start`). Their threshold and metrics come
+    from the val/test rows after the cutoff, which no fit of the booster saw;
+    the other rows of the random split may have been in an earlier train
+    split, so warm-started models are left out of `select_model`
+  - `--out-of-core`: LightGBM only, streamed from the partitioned dataset into
+    a binned `lightgbm.Dataset` (see `ml/out_of_core.py`); the last
+    `--ooc-holdout-months` are val/test. Its scores are not comparable with
+    the random split, so the model goes to `lightgbm_out_of_core.joblib` and
+    its metrics and memory vs. dataset size to `reports/out_of_core.json`;
+    `metrics.json` and `model_selection.json` are left untouched
+  - Split + encoded inputs cached under `ml/artifacts/cache/train_inputs/<key>/`,
+    reused while the table, filters, split seed and preprocessor are unchanged
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
+import sklearn
 from catboost import CatBoostClassifier
+from scipy import sparse
 from lightgbm import LGBMClassifier
+from lightgbm import early_stopping as lgb_early_stopping
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
@@ -37,11 +74,99 @@ from sklearn.metrics import (
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from threadpoolctl import threadpool_limits
 from xgboost import XGBClassifier
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from feature_engine import FeatureEncoder, check_encoder_parity  # noqa: E402
+from out_of_core import (  # noqa: E402
+    BoosterClassifier,
+    booster_params,
+    coded_encoder,
+    predict_sequences,
+    sample_records,
+    scan_dataset,
+    train_booster,
+)
+from profiling import StageProfiler, StepProfile  # noqa: E402
+from serving_bundle import SlotLookup, load_serving_bundle, write_serving_bundle  # noqa: E402
+from table_io import read_table, table_digest, table_schema  # noqa: E402
+
 ARTIFACT_DIR = Path("ml/artifacts")
 MODEL_DIR = ARTIFACT_DIR / "models"
 REPORT_DIR = ARTIFACT_DIR / "reports"
+# Split + encoded matrices per (table hash, filters, split seed, preprocessor);
+# a hit skips load, split and preprocessing. Bump the version when the layout
+# written by `write_shared_inputs` changes.
+INPUT_CACHE_DIR = ARTIFACT_DIR / "cache" / "train_inputs"
+INPUT_CACHE_VERSION = 3
+INPUT_CACHE_META = "meta.json"
+INPUT_CACHE_KEEP = 3
+
+# Validation rows re-encoded with the serving encoder to check parity.
+PARITY_SAMPLE_ROWS = 1000
+
+# Serving benchmark of each saved bundle: raw test rows encoded the way the
+# API does (`FeatureEncoder.transform_records`) and scored with predict_proba.
+BENCH_RECORDS = "bench_records.parquet"
+BENCH_BATCH_ROWS = 1000
+BENCH_SINGLE_CALLS = 200
+BENCH_BATCH_REPEATS = 5
+# Production model rule (`select_model`): best test AUC among models at or
+# above the AUC floor whose single-row p95 latency fits the budget. Only
+# models scored on the full test split are ranked (not warm starts).
+SELECTION_PATH = REPORT_DIR / "model_selection.json"
+DEFAULT_LATENCY_BUDGET_MS = 20.0
+DEFAULT_MIN_AUC = 0.75
+# `--out-of-core` output, kept apart from the models ranked by `select_model`.
+OUT_OF_CORE_MODEL = "lightgbm_out_of_core"
+OUT_OF_CORE_REPORT = REPORT_DIR / "out_of_core.json"
+
+MODEL_NAMES = ["log_reg", "random_forest", "xgboost", "lightgbm", "catboost"]
+# Submission order for the worker pool: longest-running first, so the total
+# wall time approaches that of the slowest model.
+SLOWEST_FIRST = ["catboost", "random_forest", "xgboost", "lightgbm", "log_reg"]
+SPLITS = ["train", "val", "test"]
+CSR_PARTS = ["data", "indices", "indptr"]
+
+# Models trained on `FeatureEncoder.transform_native_frame` (imputed numerics
+# plus string categoricals) instead of the one-hot matrix. Their bundles carry
+# `"input_format": "native"` so the API encodes requests the same way.
+NATIVE_INPUT_MODELS = {"catboost"}
+
+# `--tune` search space per GBM; candidate 0 is always the defaults in
+# `build_model`. Boosting rounds are not searched: each rung caps them and
+# early stopping picks the count.
+TUNING_SPACE: Dict[str, Dict[str, List[Any]]] = {
+    "xgboost": {
+        "learning_rate": [0.03, 0.05, 0.1],
+        "max_depth": [4, 6, 8],
+        "min_child_weight": [1, 5, 10],
+        "subsample": [0.7, 0.8, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+    },
+    "lightgbm": {
+        "learning_rate": [0.03, 0.05, 0.1],
+        "num_leaves": [15, 31, 63],
+        "min_child_samples": [10, 20, 50],
+        "subsample": [0.7, 0.8, 1.0],
+        "subsample_freq": [0, 1],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+    },
+    "catboost": {
+        "learning_rate": [0.03, 0.05, 0.1],
+        "depth": [4, 6, 8],
+        "l2_leaf_reg": [1, 3, 10],
+    },
+}
+# `--warm-start` continues these boosters on flights after their cutoff
+# (LightGBM `init_model`, XGBoost `xgb_model`) instead of refitting; the
+# others are always retrained from scratch.
+WARM_START_MODELS = ["xgboost", "lightgbm"]
+DEFAULT_WARM_TREES = 50
+DEFAULT_DRIFT_TOLERANCE = 0.02
+ROUNDS_PARAM = {"xgboost": "n_estimators", "lightgbm": "n_estimators", "catboost": "iterations"}
+EARLY_STOPPING_ROUNDS = 30
 
 TARGET = "delay_label"
 DROP_COLUMNS = [
@@ -56,14 +181,38 @@ DROP_COLUMNS = [
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Train ML models for delay prediction.")
     parser.add_argument("--input", type=Path, default=Path("data/processed/train_table.parquet"))
+    parser.add_argument("--airports", nargs="+", default=None, help="Only train on these airport codes.")
+    parser.add_argument("--start-date", default=None, help="First flight date to train on (YYYY-MM-DD).")
+    parser.add_argument("--end-date", default=None, help="Last flight date to train on (YYYY-MM-DD).")
     parser.add_argument("--test-size", type=float, default=0.3)
     parser.add_argument("--random-state", type=int, default=42)
     parser.add_argument("--n_estimators", type=int, default=300)
+    parser.add_argument("--cache-dir", type=Path, default=INPUT_CACHE_DIR, help="Where encoded inputs are cached.")
+    parser.add_argument("--no-cache", action="store_true", help="Re-encode into a temporary directory and cache nothing.")
+    parser.add_argument("--jobs", type=int, default=min(len(MODEL_NAMES), os.cpu_count() or 1), help="Models trained concurrently in worker processes.")
+    parser.add_argument("--threads", type=int, default=None, help="Total threads shared by the workers (default: all CPUs).")
+    parser.add_argument("--latency-budget-ms", type=float, default=DEFAULT_LATENCY_BUDGET_MS, help="Single-row p95 latency allowed for the production model.")
+    parser.add_argument("--min-auc", type=float, default=DEFAULT_MIN_AUC, help="Test AUC floor for the production model.")
+    parser.add_argument("--tune", action="store_true", help="Search GBM hyperparameters with time-ordered CV before training.")
+    parser.add_argument("--tune-folds", type=int, default=3)
+    parser.add_argument("--tune-candidates", type=int, default=9, help="Configurations sampled per GBM.")
+    parser.add_argument("--tune-eta", type=int, default=3, help="Successive-halving reduction factor.")
+    parser.add_argument("--warm-start", action="store_true", help="Add trees to the saved LightGBM/XGBoost boosters instead of refitting them.")
+    parser.add_argument("--warm-trees", type=int, default=DEFAULT_WARM_TREES, help="Trees added per warm start.")
+    parser.add_argument("--drift-tolerance", type=float, default=DEFAULT_DRIFT_TOLERANCE, help="Val AUC lost over warm starts since the last full fit (on rows after each cutoff) that forces a full retrain.")
+    parser.add_argument("--out-of-core", action="store_true", help="Stream the partitioned --input dataset into LightGBM instead of loading it.")
+    parser.add_argument("--ooc-holdout-months", type=int, default=1, help="Trailing year_month partitions held out for val/test with --out-of-core.")
+    parser.add_argument("--profile", type=Path, default=REPORT_DIR / "train_profile.json")
     return parser.parse_args()
 
 
-def load_dataset(path: Path) -> pd.DataFrame:
-    df = pd.read_parquet(path)
+def load_dataset(
+    path: Path,
+    airports: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> pd.DataFrame:
+    df = read_table(path, airports=airports, start_date=start_date, end_date=end_date)
     df = df[df[TARGET].notna()].copy()
     logging.info("Loaded dataset %s (%d rows)", path, len(df))
     return df
@@ -175,28 +324,26 @@ def extract_importance(model_name: str, model, feature_names: List[str]) -> List
     return [(name, float(value)) for name, value in importance[:50]]
 
 
-def train_models(preprocessor: ColumnTransformer, train_df: pd.DataFrame, val_df: pd.DataFrame, test_df: pd.DataFrame, random_state: int, n_estimators: int) -> Tuple[Dict[str, Dict[str, float]], Dict[str, List[Tuple[str, float]]]]:
-    features = preprocessor.feature_list_  # type: ignore[attr-defined]
-    X_train = train_df[features]
-    y_train = train_df[TARGET].astype(int)
-    X_val = val_df[features]
-    y_val = val_df[TARGET].astype(int)
-    X_test = test_df[features]
-    y_test = test_df[TARGET].astype(int)
-
-    preprocessor.fit(X_train)
-    feature_names = extract_feature_names(preprocessor)
-    X_train_enc = preprocessor.transform(X_train)
-    X_val_enc = preprocessor.transform(X_val)
-    X_test_enc = preprocessor.transform(X_test)
+def build_model(
+    name: str,
+    random_state: int,
+    n_estimators: int,
+    scale_pos_weight: float,
+    threads: int,
+    params: Optional[Dict[str, Any]] = None,
+):
+    """Estimator for `name` with the default hyperparameters, overridden by `params`."""
+    model = _default_model(name, random_state, n_estimators, scale_pos_weight, threads)
+    return model.set_params(**params) if params else model
 
-    neg, pos = np.bincount(y_train)
-    scale_pos_weight = neg / max(pos, 1)
 
-    configs = [
-        ("log_reg", LogisticRegression(max_iter=1000, class_weight="balanced")),
-        ("random_forest", RandomForestClassifier(n_estimators=n_estimators, class_weight="balanced", random_state=random_state, n_jobs=-1, max_depth=8)),
-        ("xgboost", XGBClassifier(
+def _default_model(name: str, random_state: int, n_estimators: int, scale_pos_weight: float, threads: int):
+    if name == "log_reg":
+        return LogisticRegression(max_iter=1000, class_weight="balanced")
+    if name == "random_forest":
+        return RandomForestClassifier(n_estimators=n_estimators, class_weight="balanced", random_state=random_state, n_jobs=threads, max_depth=8)
+    if name == "xgboost":
+        return XGBClassifier(
             n_estimators=n_estimators,
             learning_rate=0.05,
             subsample=0.8,
@@ -205,10 +352,11 @@ def train_models(preprocessor: ColumnTransformer, train_df: pd.DataFrame, val_df
             reg_lambda=1.0,
             scale_pos_weight=scale_pos_weight,
             eval_metric="auc",
-            n_jobs=-1,
+            n_jobs=threads,
             random_state=random_state,
-        )),
-        ("lightgbm", LGBMClassifier(
+        )
+    if name == "lightgbm":
+        return LGBMClassifier(
             n_estimators=n_estimators,
             subsample=0.8,
             colsample_bytree=0.8,
@@ -216,8 +364,10 @@ def train_models(preprocessor: ColumnTransformer, train_df: pd.DataFrame, val_df
             class_weight=None,
             scale_pos_weight=scale_pos_weight,
             random_state=random_state,
-        )),
-        ("catboost", CatBoostClassifier(
+            n_jobs=threads,
+        )
+    if name == "catboost":
+        return CatBoostClassifier(
             iterations=n_estimators,
             learning_rate=0.05,
             depth=6,
@@ -225,41 +375,773 @@ def train_models(preprocessor: ColumnTransformer, train_df: pd.DataFrame, val_df
             verbose=False,
             scale_pos_weight=scale_pos_weight,
             random_seed=random_state,
-        )),
+            thread_count=threads,
+        )
+    raise ValueError(f"Unknown model {name}")
+
+
+def share_matrix(directory: Path, matrix: Any) -> None:
+    """Write an encoded matrix as raw `.npy` arrays that workers memory-map."""
+    directory.mkdir(parents=True, exist_ok=True)
+    if sparse.issparse(matrix):
+        matrix = sparse.csr_matrix(matrix)
+        for part in CSR_PARTS:
+            np.save(directory / f"{part}.npy", getattr(matrix, part))
+        np.save(directory / "shape.npy", np.asarray(matrix.shape, dtype="int64"))
+    else:
+        np.save(directory / "dense.npy", np.ascontiguousarray(matrix))
+
+
+def open_matrix(directory: Path) -> Any:
+    if (directory / "dense.npy").exists():
+        return np.load(directory / "dense.npy", mmap_mode="r")
+    data, indices, indptr = (np.load(directory / f"{part}.npy", mmap_mode="r") for part in CSR_PARTS)
+    shape = tuple(int(n) for n in np.load(directory / "shape.npy"))
+    return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def write_shared_inputs(
+    shared_dir: Path,
+    preprocessor: ColumnTransformer,
+    encoder: FeatureEncoder,
+    splits: Dict[str, pd.DataFrame],
+) -> int:
+    """Encode each split once into `shared_dir`; returns the number of rows written.
+
+    `index_<split>.npy` keeps the split's row labels in the loaded table and
+    `dates_<split>.npy` their flight dates.
+    """
+    features = preprocessor.feature_list_  # type: ignore[attr-defined]
+    rows = 0
+    for split, df in splits.items():
+        encoded = preprocessor.transform(df[features])
+        share_matrix(shared_dir / f"X_{split}", encoded)
+        rows += encoded.shape[0]
+        del encoded
+        # Object columns cannot be memory-mapped; the native frames go through parquet.
+        encoder.transform_native_frame(df).to_parquet(shared_dir / f"native_{split}.parquet", index=False)
+        np.save(shared_dir / f"y_{split}.npy", df[TARGET].astype(int).to_numpy())
+        np.save(shared_dir / f"index_{split}.npy", df.index.to_numpy())
+        np.save(shared_dir / f"dates_{split}.npy", df["flight_date"].to_numpy(dtype="datetime64[D]"))
+    joblib.dump(preprocessor, shared_dir / "preprocessor.joblib")
+    return rows
+
+
+def benchmark_bundle(model_path: Path, records: List[Dict[str, Any]], threshold: float = 0.5) -> Dict[str, Any]:
+    """Size, load time and `predict_proba` latency of what the API would serve for `model_path`.
+
+    That is the compact serving bundle (`ml/serving_bundle.py`), exported to a
+    temporary directory, or the joblib file for a model without a native format.
+    """
+    name = model_path.stem
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        directory = Path(tmp) / name
+        try:
+            write_serving_bundle(directory, name, joblib.load(model_path), threshold, SlotLookup({}, {}, records[0]))
+        except ValueError as exc:
+            logging.info("Benchmarking %s as joblib: %s", name, exc)
+            directory = None
+        start = time.perf_counter()
+        if directory is not None:
+            serving = load_serving_bundle(directory)
+            load_s = time.perf_counter() - start
+            model, transform = serving.model, serving.encoder.records_transform(serving.input_format)
+            size = sum(path.stat().st_size for path in directory.iterdir())
+        else:
+            bundle = joblib.load(model_path)
+            load_s = time.perf_counter() - start
+            model = bundle["model"]
+            transform = FeatureEncoder.from_bundle(bundle).records_transform(bundle.get("input_format", "encoded"))
+            size = model_path.stat().st_size
+
+    def elapsed_ms(batch: List[Dict[str, Any]]) -> float:
+        start = time.perf_counter()
+        model.predict_proba(transform(batch))
+        return (time.perf_counter() - start) * 1000
+
+    elapsed_ms(records[:1])  # warm-up
+    single = [elapsed_ms([record]) for record in records[:BENCH_SINGLE_CALLS]]
+    batch = [elapsed_ms(records) for _ in range(BENCH_BATCH_REPEATS)]
+    return {
+        "bundle": "joblib" if directory is None else "serving",
+        "size_mb": round(size / (1024 * 1024), 3),
+        "load_s": round(load_s, 4),
+        "single_p50_ms": round(float(np.percentile(single, 50)), 3),
+        "single_p95_ms": round(float(np.percentile(single, 95)), 3),
+        "batch_rows": len(records),
+        "batch_ms": round(float(np.median(batch)), 3),
+    }
+
+
+def benchmark_models(
+    metrics: Dict[str, Dict[str, Any]],
+    records: List[Dict[str, Any]],
+    profiler: StageProfiler,
+    threads: Optional[int] = None,
+) -> None:
+    """Benchmark every saved model one after another, into `metrics[name]["benchmark"]`.
+
+    Runs in the parent once training is over, so no model's latency is
+    measured while others are still fitting on the same cores.
+    """
+    for name, result in metrics.items():
+        with threadpool_limits(limits=threads or os.cpu_count() or 1), profiler.step(f"bench:{name}", rows_in=len(records)):
+            result["benchmark"] = {
+                **result.get("benchmark", {}),
+                **benchmark_bundle(MODEL_DIR / f"{name}.joblib", records, float(result.get("threshold", 0.5))),
+            }
+        logging.info("%s benchmark: %s", name, result["benchmark"])
+
+
+@dataclass
+class TrainJob:
+    name: str
+    shared_dir: Path
+    threads: int
+    random_state: int
+    n_estimators: int
+    scale_pos_weight: float
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def train_model(job: TrainJob) -> Tuple[str, Dict[str, Any], List[Tuple[str, float]], List[StepProfile]]:
+    """Train, evaluate and save one model from the inputs in `job.shared_dir`.
+
+    Runs in a pool worker; only the small `TrainJob` is pickled.
+    """
+    shared_dir = job.shared_dir
+    preprocessor = joblib.load(shared_dir / "preprocessor.joblib")
+    y = {split: np.load(shared_dir / f"y_{split}.npy") for split in SPLITS}
+    model = build_model(job.name, job.random_state, job.n_estimators, job.scale_pos_weight, job.threads, job.params)
+    profiler = StageProfiler("03_train")
+
+    logging.info("Training %s (%d threads)", job.name, job.threads)
+    with threadpool_limits(limits=job.threads), profiler.step(f"train:{job.name}", rows_in=len(y["train"])):
+        if job.name in NATIVE_INPUT_MODELS:
+            # Native categoricals: no dense copy of the one-hot matrix.
+            encoder = FeatureEncoder.from_preprocessor(preprocessor)
+            X = {split: pd.read_parquet(shared_dir / f"native_{split}.parquet") for split in SPLITS}
+            fit_start = time.perf_counter()
+            model.fit(X["train"], y["train"], cat_features=encoder.native_categorical_indices)
+            input_format, feature_names = "native", encoder.native_columns
+        else:
+            X = {split: open_matrix(shared_dir / f"X_{split}") for split in SPLITS}
+            fit_start = time.perf_counter()
+            model.fit(X["train"], y["train"])
+            input_format, feature_names = "encoded", extract_feature_names(preprocessor)
+        fit_s = time.perf_counter() - fit_start
+        val_prob = model.predict_proba(X["val"])[:, 1]
+        test_prob = model.predict_proba(X["test"])[:, 1]
+
+        best_threshold, best_f1 = find_best_threshold(y["val"], val_prob)
+        logging.info("%s best threshold=%.3f (val F1=%.3f)", job.name, best_threshold, best_f1)
+
+        metrics = evaluate_predictions(y["test"], test_prob, best_threshold)
+        metrics["val_best_f1"] = best_f1
+        importances = extract_importance(job.name, model, feature_names)
+
+        val_auc = float(roc_auc_score(y["val"], val_prob))
+        trained_through = str(np.load(shared_dir / "dates_train.npy").max())
+        model_path = MODEL_DIR / f"{job.name}.joblib"
+        MODEL_DIR.mkdir(parents=True, exist_ok=True)
+        joblib.dump(
+            {
+                "model": model,
+                "preprocessor": preprocessor,
+                "input_format": input_format,
+                # Read by `--warm-start`: the last flight date trained on and
+                # the full fit's time; a full fit starts with no drift.
+                "trained_through": trained_through,
+                "val_auc": val_auc,
+                "full_fit_s": fit_s,
+            },
+            model_path,
+        )
+        logging.info("Saved %s model to %s", job.name, model_path)
+    # Serving latency is measured by `benchmark_models` once every fit is done.
+    metrics["benchmark"] = {"fit_s": round(fit_s, 3)}
+
+    return job.name, metrics, importances, profiler.steps
+
+
+def _init_worker() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+
+def encode_inputs(
+    preprocessor: ColumnTransformer,
+    train_df: pd.DataFrame,
+    val_df: pd.DataFrame,
+    test_df: pd.DataFrame,
+    inputs_dir: Path,
+    profiler: StageProfiler,
+) -> None:
+    """Fit the preprocessor on the train split and write every split's model inputs."""
+    splits = {"train": train_df, "val": val_df, "test": test_df}
+    features = preprocessor.feature_list_  # type: ignore[attr-defined]
+    with profiler.step("encode", rows_in=sum(len(df) for df in splits.values())) as step:
+        preprocessor.fit(train_df[features])
+        encoder = FeatureEncoder.from_preprocessor(preprocessor)
+        check_encoder_parity(preprocessor, encoder, val_df[features].head(PARITY_SAMPLE_ROWS))
+        step.rows_out = write_shared_inputs(inputs_dir, preprocessor, encoder, splits)
+        test_df[features].head(BENCH_BATCH_ROWS).to_parquet(inputs_dir / BENCH_RECORDS, index=False)
+
+
+def train_models(
+    inputs_dir: Path,
+    random_state: int,
+    n_estimators: int,
+    profiler: Optional[StageProfiler] = None,
+    jobs: int = 1,
+    threads: Optional[int] = None,
+    params: Optional[Dict[str, Dict[str, Any]]] = None,
+    models: Optional[List[str]] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[Tuple[str, float]]]]:
+    """Train `models` (default: `MODEL_NAMES`) on the inputs written by `encode_inputs`.
+
+    Each model memory-maps the encoded splits, so `jobs` > 1 trains models in
+    parallel worker processes without pickling the matrices. The `threads`
+    budget (default: all CPUs) is split evenly across the workers. `params`
+    overrides hyperparameters per model (e.g. the `--tune` results).
+    """
+    profiler = profiler or StageProfiler("03_train")
+    models = [name for name in MODEL_NAMES if models is None or name in models]
+    if not models:
+        return {}, {}
+    y_train = np.load(inputs_dir / "y_train.npy", mmap_mode="r")
+    neg, pos = np.bincount(y_train)
+    scale_pos_weight = neg / max(pos, 1)
+    workers = max(1, min(jobs, len(models)))
+    threads_per_model = max(1, (threads or os.cpu_count() or 1) // workers)
+    tasks = [
+        TrainJob(name, inputs_dir, threads_per_model, random_state, n_estimators, scale_pos_weight, (params or {}).get(name, {}))
+        for name in sorted(models, key=SLOWEST_FIRST.index)
     ]
 
-    metrics: Dict[str, Dict[str, float]] = {}
+    if workers == 1:
+        results = [train_model(task) for task in tasks]
+    else:
+        # Spawned (not forked) workers: the GBM libraries' OpenMP runtimes
+        # are not fork-safe.
+        context = multiprocessing.get_context("spawn")
+        with profiler.step("train:pool", rows_in=len(y_train)):
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+                results = list(pool.map(train_model, tasks))
+
+    by_name = {name: (model_metrics, importance, steps) for name, model_metrics, importance, steps in results}
+    metrics: Dict[str, Dict[str, Any]] = {}
     importances: Dict[str, List[Tuple[str, float]]] = {}
+    for name in models:
+        metrics[name], importances[name], steps = by_name[name]
+        profiler.steps.extend(steps)
+    return metrics, importances
+
 
-    for name, model in configs:
-        logging.info("Training %s", name)
-        if name == "catboost":
-            model.fit(X_train_enc.toarray(), y_train)
-            val_prob = model.predict_proba(X_val_enc.toarray())[:, 1]
-            test_prob = model.predict_proba(X_test_enc.toarray())[:, 1]
+def warm_start_model(
+    name: str,
+    splits: Dict[str, pd.DataFrame],
+    n_trees: int,
+    drift_tolerance: float,
+    threads: int,
+) -> Tuple[Optional[Dict[str, Any]], List[Tuple[str, float]], Dict[str, Any]]:
+    """Continue the saved `name` booster with `n_trees` trees fitted on flights after its cutoff.
+
+    The previous bundle's preprocessor is reused as-is (transform only). Only
+    val/test rows after the cutoff are scored: the rest of the current random
+    split may have been in the train split of an earlier fit. The drift guard
+    scores the previous and the continued model on those val rows and adds
+    the AUC lost to the drift carried since the last full fit; the threshold
+    and metrics come from them too. Returns (metrics, importances, report);
+    metrics is None when a full retrain is needed, with the reason in the
+    report.
+    """
+    model_path = MODEL_DIR / f"{name}.joblib"
+    if not model_path.exists():
+        return None, [], {"fallback": "no previous model"}
+    bundle = joblib.load(model_path)
+    if "trained_through" not in bundle:
+        return None, [], {"fallback": "previous model has no training cutoff"}
+    if "preprocessor" not in bundle:
+        return None, [], {"fallback": "previous model was trained out-of-core"}
+    cutoff = pd.Timestamp(bundle["trained_through"])
+    new = {split: df[df["flight_date"] > cutoff] for split, df in splits.items()}
+    if new["train"].empty:
+        return None, [], {"fallback": f"no flights after {cutoff.date()}"}
+    if new["val"][TARGET].nunique() < 2 or new["test"][TARGET].nunique() < 2:
+        return None, [], {"fallback": "too few new rows to validate and test"}
+
+    preprocessor = bundle["preprocessor"]
+    features = preprocessor.feature_list_
+    X_new = {split: preprocessor.transform(df[features]) for split, df in new.items()}
+    y_new = {split: df[TARGET].astype(int).to_numpy() for split, df in new.items()}
+    previous = bundle["model"]
+    model = clone(previous).set_params(n_estimators=n_trees, n_jobs=threads)
+    start = time.perf_counter()
+    with threadpool_limits(limits=threads):
+        if name == "lightgbm":
+            model.fit(X_new["train"], y_new["train"], init_model=previous.booster_)
         else:
-            model.fit(X_train_enc, y_train)
-            val_prob = model.predict_proba(X_val_enc)[:, 1]
-            test_prob = model.predict_proba(X_test_enc)[:, 1]
+            model.fit(X_new["train"], y_new["train"], xgb_model=previous.get_booster())
+    fit_s = time.perf_counter() - start
+
+    val_prob = model.predict_proba(X_new["val"])[:, 1]
+    new_val_auc = float(roc_auc_score(y_new["val"], val_prob))
+    previous_val_auc = float(roc_auc_score(y_new["val"], previous.predict_proba(X_new["val"])[:, 1]))
+    drift = float(bundle.get("warm_drift", 0.0)) + previous_val_auc - new_val_auc
+    report: Dict[str, Any] = {
+        "trained_from": cutoff.date().isoformat(),
+        "trained_through": str(new["train"]["flight_date"].max().date()),
+        "new_rows": len(new["train"]),
+        "new_val_rows": len(new["val"]),
+        "new_test_rows": len(new["test"]),
+        "added_trees": n_trees,
+        "new_val_auc": round(new_val_auc, 6),
+        "previous_val_auc": round(previous_val_auc, 6),
+        "drift": round(drift, 6),
+        "fit_s": round(fit_s, 3),
+    }
+    if drift > drift_tolerance:
+        report["fallback"] = f"val AUC lost since the last full fit {drift:.4f} > {drift_tolerance}"
+        return None, [], report
+
+    threshold, best_f1 = find_best_threshold(y_new["val"], val_prob)
+    metrics: Dict[str, Any] = evaluate_predictions(y_new["test"], model.predict_proba(X_new["test"])[:, 1], threshold)
+    metrics["val_best_f1"] = best_f1
+    importances = extract_importance(name, model, extract_feature_names(preprocessor))
+    full_fit_s = bundle.get("full_fit_s")
+    if full_fit_s is not None:
+        report["last_full_fit_s"] = round(float(full_fit_s), 3)
+        report["saved_s"] = round(float(full_fit_s) - fit_s, 3)
+    joblib.dump(
+        {
+            **bundle,
+            "model": model,
+            "trained_through": report["trained_through"],
+            "val_auc": new_val_auc,
+            "warm_drift": drift,
+            "warm_starts": int(bundle.get("warm_starts", 0)) + 1,
+        },
+        model_path,
+    )
+    logging.info("Saved warm-started %s model to %s", name, model_path)
+    metrics["benchmark"] = {"fit_s": round(fit_s, 3)}
+    return metrics, importances, report
 
-        best_threshold, best_f1 = find_best_threshold(y_val, val_prob)
-        logging.info("%s best threshold=%.3f (val F1=%.3f)", name, best_threshold, best_f1)
 
-        metrics[name] = evaluate_predictions(y_test, test_prob, best_threshold)
-        metrics[name]["val_best_f1"] = best_f1
+def warm_start_models(
+    df: pd.DataFrame,
+    inputs_dir: Path,
+    n_trees: int,
+    drift_tolerance: float,
+    profiler: StageProfiler,
+    threads: Optional[int] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[Tuple[str, float]]], Dict[str, Dict[str, Any]]]:
+    """Warm-start every model in `WARM_START_MODELS`; returns metrics and importances of
+    the ones that passed the drift guard, plus a report for each (with `fallback` set
+    for the ones that need a full retrain)."""
+    splits = {split: df.loc[np.load(inputs_dir / f"index_{split}.npy")] for split in SPLITS}
+    metrics: Dict[str, Dict[str, Any]] = {}
+    importances: Dict[str, List[Tuple[str, float]]] = {}
+    reports: Dict[str, Dict[str, Any]] = {}
+    for name in WARM_START_MODELS:
+        with profiler.step(f"warm:{name}") as step:
+            result, importance, reports[name] = warm_start_model(
+                name, splits, n_trees, drift_tolerance, threads or os.cpu_count() or 1
+            )
+            step.rows_in = reports[name].get("new_rows")
+        if result is None:
+            logging.warning("Warm start of %s skipped (%s); retraining from scratch", name, reports[name]["fallback"])
+            continue
+        metrics[name], importances[name] = result, importance
+        logging.info(
+            "Warm-started %s: +%d trees on %d rows in %.2fs (new-row val AUC %.4f vs previous %.4f, drift %.4f)",
+            name,
+            n_trees,
+            reports[name]["new_rows"],
+            reports[name]["fit_s"],
+            reports[name]["new_val_auc"],
+            reports[name]["previous_val_auc"],
+            reports[name]["drift"],
+        )
+    return metrics, importances, reports
 
-        importances[name] = extract_importance(name, model, feature_names)
 
-        model_path = MODEL_DIR / f"{name}.joblib"
-        MODEL_DIR.mkdir(parents=True, exist_ok=True)
-        joblib.dump({"model": model, "preprocessor": preprocessor}, model_path)
-        logging.info("Saved %s model to %s", name, model_path)
+def time_folds(dates: pd.Series, n_folds: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Expanding-window folds over whole days.
+
+    The sorted days are cut into `n_folds + 1` contiguous blocks; fold k
+    trains on blocks 0..k and validates on block k + 1, so validation rows
+    are always later than the rows a model was fitted on.
+    """
+    days = dates.to_numpy(dtype="datetime64[D]")
+    blocks = np.array_split(np.unique(days), n_folds + 1)
+    folds = []
+    for k in range(n_folds):
+        val_days = blocks[k + 1]
+        train_idx = np.flatnonzero(days < val_days[0])
+        val_idx = np.flatnonzero((days >= val_days[0]) & (days <= val_days[-1]))
+        folds.append((train_idx, val_idx))
+    return folds
+
+
+def write_fold_inputs(df: pd.DataFrame, folds_dir: Path, n_folds: int) -> None:
+    """Encode each time fold with a preprocessor fitted on that fold's train rows."""
+    for k, (train_idx, val_idx) in enumerate(time_folds(df["flight_date"], n_folds)):
+        preprocessor, features = build_preprocessor(df)
+        train_df, val_df = df.iloc[train_idx], df.iloc[val_idx]
+        preprocessor.fit(train_df[features])
+        encoder = FeatureEncoder.from_preprocessor(preprocessor)
+        write_shared_inputs(folds_dir / f"fold_{k}", preprocessor, encoder, {"train": train_df, "val": val_df})
+        logging.info("Fold %d: train=%d rows, val=%d rows", k, len(train_idx), len(val_idx))
+
+
+def sample_candidates(name: str, n_candidates: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    """The default hyperparameters plus up to `n_candidates - 1` distinct draws from `TUNING_SPACE`."""
+    space = TUNING_SPACE[name]
+    candidates: List[Dict[str, Any]] = [{}]
+    seen = set()
+    for _ in range(n_candidates * 20):
+        if len(candidates) >= n_candidates:
+            break
+        params = {key: values[rng.integers(len(values))] for key, values in space.items()}
+        params = {key: value.item() if isinstance(value, np.generic) else value for key, value in params.items()}
+        signature = tuple(sorted(params.items()))
+        if signature not in seen:
+            seen.add(signature)
+            candidates.append(params)
+    return candidates
+
+
+def fit_early_stopping(name: str, model: Any, X_train: Any, y_train: np.ndarray, X_val: Any, y_val: np.ndarray) -> int:
+    """Fit `model`, stopping once validation AUC stalls; returns the boosting rounds kept."""
+    if name == "xgboost":
+        model.set_params(early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        return int(model.best_iteration) + 1
+    if name == "lightgbm":
+        model.set_params(metric="auc")
+        model.fit(
+            X_train,
+            y_train,
+            eval_set=[(X_val, y_val)],
+            callbacks=[lgb_early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)],
+        )
+        return int(model.best_iteration_ or model.n_estimators)
+    if name == "catboost":
+        model.set_params(eval_metric="AUC")
+        model.fit(
+            X_train,
+            y_train,
+            cat_features=list(X_train.select_dtypes(include="object").columns),
+            eval_set=(X_val, y_val),
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            use_best_model=True,
+        )
+        return int(model.get_best_iteration()) + 1
+    raise ValueError(f"No early stopping for {name}")
+
+
+@dataclass
+class TuneTrial:
+    name: str
+    candidate: int
+    params: Dict[str, Any]
+    rounds: int
+    folds_dir: Path
+    n_folds: int
+    threads: int
+    random_state: int
+
+
+def run_trial(trial: TuneTrial) -> Dict[str, Any]:
+    """Cross-validate one candidate over the time folds with at most `trial.rounds` rounds."""
+    start = time.perf_counter()
+    aucs: List[float] = []
+    rounds: List[int] = []
+    with threadpool_limits(limits=trial.threads):
+        for k in range(trial.n_folds):
+            fold_dir = trial.folds_dir / f"fold_{k}"
+            y_train = np.load(fold_dir / "y_train.npy")
+            y_val = np.load(fold_dir / "y_val.npy")
+            neg, pos = np.bincount(y_train)
+            model = build_model(trial.name, trial.random_state, trial.rounds, neg / max(pos, 1), trial.threads, trial.params)
+            if trial.name in NATIVE_INPUT_MODELS:
+                X_train = pd.read_parquet(fold_dir / "native_train.parquet")
+                X_val = pd.read_parquet(fold_dir / "native_val.parquet")
+            else:
+                X_train = open_matrix(fold_dir / "X_train")
+                X_val = open_matrix(fold_dir / "X_val")
+            rounds.append(fit_early_stopping(trial.name, model, X_train, y_train, X_val, y_val))
+            aucs.append(float(roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])))
+    return {
+        "name": trial.name,
+        "candidate": trial.candidate,
+        "cv_auc": float(np.mean(aucs)),
+        "fold_auc": aucs,
+        "best_rounds": rounds,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def tune_models(
+    df: pd.DataFrame,
+    n_estimators: int,
+    random_state: int,
+    profiler: StageProfiler,
+    n_folds: int = 3,
+    n_candidates: int = 9,
+    eta: int = 3,
+    jobs: int = 1,
+    threads: Optional[int] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Successive-halving search over `TUNING_SPACE` with time-ordered CV.
+
+    Every rung cross-validates the surviving candidates of each model with a
+    round budget that grows by `eta` per rung (reaching `n_estimators` on the
+    last one) and early stopping on each validation fold; the best
+    `1 / eta` of each model's candidates move on. Returns, per model, the
+    winning params (with the boosting rounds early stopping settled on) and
+    a record of the search.
+    """
+    rng = np.random.default_rng(random_state)
+    candidates = {name: sample_candidates(name, n_candidates, rng) for name in TUNING_SPACE}
+    n_rungs = 1 + int(np.floor(np.log(max(len(c) for c in candidates.values())) / np.log(eta) + 1e-9))
+    workers = max(1, jobs)
+    threads_per_trial = max(1, (threads or os.cpu_count() or 1) // workers)
+    alive = {name: list(range(len(values))) for name, values in candidates.items()}
+    history: Dict[str, List[Dict[str, Any]]] = {name: [] for name in candidates}
+    seconds = {name: 0.0 for name in candidates}
+    last: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="03_train_folds_") as tmp:
+        folds_dir = Path(tmp)
+        with profiler.step("tune:folds", rows_in=len(df)):
+            write_fold_inputs(df, folds_dir, n_folds)
+
+        # One pool for all rungs so workers are spawned once. Their CPU time
+        # shows up in the profile only when the pool shuts down.
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) if workers > 1 else None
+        try:
+            for rung in range(n_rungs):
+                rounds = max(1, int(round(n_estimators / eta ** (n_rungs - 1 - rung))))
+                trials = [
+                    TuneTrial(name, idx, candidates[name][idx], rounds, folds_dir, n_folds, threads_per_trial, random_state)
+                    for name in sorted(alive, key=SLOWEST_FIRST.index)
+                    for idx in alive[name]
+                ]
+                with profiler.step(f"tune:rung{rung}") as step:
+                    results = list(pool.map(run_trial, trials)) if pool else [run_trial(trial) for trial in trials]
+                    step.rows_out = len(trials)
+                for name in alive:
+                    scored = sorted(
+                        (result for result in results if result["name"] == name),
+                        key=lambda result: result["cv_auc"],
+                        reverse=True,
+                    )
+                    for result in scored:
+                        last[(name, result["candidate"])] = result
+                        seconds[name] += result["seconds"]
+                    history[name].append({
+                        "n_estimators": rounds,
+                        "candidates": len(scored),
+                        "best_cv_auc": round(scored[0]["cv_auc"], 6),
+                    })
+                    alive[name] = [result["candidate"] for result in scored[: max(1, int(np.ceil(len(scored) / eta)))]]
+                logging.info(
+                    "Tuning rung %d (%d rounds): %s",
+                    rung,
+                    rounds,
+                    ", ".join(f"{name}={history[name][-1]['best_cv_auc']:.4f}" for name in alive),
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+
+    tuned: Dict[str, Dict[str, Any]] = {}
+    for name, survivors in alive.items():
+        best = last[(name, survivors[0])]
+        best_rounds = max(1, int(round(float(np.mean(best["best_rounds"])))))
+        params = dict(candidates[name][survivors[0]])
+        params[ROUNDS_PARAM[name]] = best_rounds
+        tuned[name] = {
+            "params": params,
+            "cv_auc": round(best["cv_auc"], 6),
+            "fold_auc": [round(auc, 6) for auc in best["fold_auc"]],
+            "folds": n_folds,
+            "candidates": len(candidates[name]),
+            "trials": sum(rung["candidates"] for rung in history[name]),
+            "rungs": history[name],
+            "seconds": round(seconds[name], 3),
+        }
+        logging.info("Tuned %s: cv_auc=%.4f params=%s", name, best["cv_auc"], params)
+    return tuned
+
+
+def input_cache_key(
+    path: Path,
+    airports: Optional[List[str]],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    test_size: float,
+    random_state: int,
+) -> str:
+    """Key of the encoded inputs: table content, row filters, split and preprocessor definition.
 
+    The preprocessor is built from the table schema alone (its column roles
+    only depend on dtypes), so a cache hit never reads the table.
+    """
+    preprocessor, features = build_preprocessor(table_schema(path).empty_table().to_pandas())
+    payload = {
+        "version": INPUT_CACHE_VERSION,
+        "table": table_digest(path),
+        "filters": {
+            "airports": sorted(code.upper() for code in airports) if airports else None,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        "split": {"test_size": test_size, "random_state": random_state},
+        "features": features,
+        "preprocessor": preprocessor.get_params(deep=True),
+        "sklearn": sklearn.__version__,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def prune_input_cache(cache_dir: Path, keep: int = INPUT_CACHE_KEEP) -> None:
+    entries = sorted(
+        (entry for entry in cache_dir.iterdir() if (entry / INPUT_CACHE_META).exists()),
+        key=lambda entry: (entry / INPUT_CACHE_META).stat().st_mtime,
+        reverse=True,
+    )
+    for entry in entries[keep:]:
+        shutil.rmtree(entry)
+        logging.info("Evicted cached inputs %s", entry)
+
+
+def prepare_inputs(args: argparse.Namespace, inputs_dir: Path, profiler: StageProfiler) -> pd.DataFrame:
+    """Load, split and encode the train table into `inputs_dir`; returns the loaded table."""
+    with profiler.step("load") as step:
+        df = load_dataset(args.input, args.airports, args.start_date, args.end_date)
+        step.rows_out = len(df)
+    with profiler.step("split", rows_in=len(df)):
+        train_df, val_df, test_df = split_dataset(df, args.test_size, args.random_state)
+        preprocessor, features = build_preprocessor(df)
+        preprocessor.feature_names_in_ = features  # type: ignore[attr-defined]
+    encode_inputs(preprocessor, train_df, val_df, test_df, inputs_dir, profiler)
+    return df
+
+
+def train_out_of_core(args: argparse.Namespace, profiler: StageProfiler) -> Tuple[Dict[str, Any], List[Tuple[str, float]]]:
+    """Train, evaluate, save and benchmark LightGBM without materializing the table.
+
+    The bundle stores a coded `FeatureEncoder` (no preprocessor), so the API
+    and `benchmark_bundle` encode requests exactly like training did.
+    """
+    if not args.input.is_dir():
+        raise ValueError(f"--out-of-core needs a partitioned dataset directory, got {args.input}")
+    # Column roles only depend on dtypes, so the schema is enough.
+    roles, features = build_preprocessor(table_schema(args.input).empty_table().to_pandas())
+    categorical_cols = roles.categorical_cols_  # type: ignore[attr-defined]
+
+    with profiler.step("ooc:scan") as step:
+        scan = scan_dataset(args.input, TARGET, categorical_cols, args.ooc_holdout_months)
+        step.rows_out = scan.rows
+    encoder = coded_encoder(features, roles.numeric_cols_, categorical_cols, scan.categories)  # type: ignore[attr-defined]
+    y_train = scan.labels["train"]
+    scale_pos_weight = float(np.nansum(1 - y_train) / max(np.nansum(y_train), 1))
+    threads = args.threads or os.cpu_count() or 1
+    model = build_model("lightgbm", args.random_state, args.n_estimators, scale_pos_weight, threads)
+
+    with profiler.step("ooc:train", rows_in=len(y_train)):
+        fit_start = time.perf_counter()
+        booster, sequences = train_booster(scan, encoder, booster_params(model), args.n_estimators, EARLY_STOPPING_ROUNDS)
+        fit_s = time.perf_counter() - fit_start
+    logging.info("Trained lightgbm out-of-core: %d trees (best %d) in %.2fs", booster.current_iteration(), booster.best_iteration, fit_s)
+
+    with profiler.step("ooc:predict", rows_in=len(scan.labels["val"]) + len(scan.labels["test"])):
+        y, prob = {}, {}
+        for split in ("val", "test"):
+            known = ~np.isnan(scan.labels[split])
+            y[split] = scan.labels[split][known].astype(int)
+            prob[split] = predict_sequences(booster, sequences[split])[known]
+    best_threshold, best_f1 = find_best_threshold(y["val"], prob["val"])
+    metrics: Dict[str, Any] = evaluate_predictions(y["test"], prob["test"], best_threshold)
+    metrics["val_best_f1"] = best_f1
+    classifier = BoosterClassifier(booster)
+    importances = extract_importance("lightgbm", classifier, encoder.native_columns)
+
+    model_path = MODEL_DIR / f"{OUT_OF_CORE_MODEL}.joblib"
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    val_auc = float(roc_auc_score(y["val"], prob["val"]))
+    joblib.dump(
+        {
+            "model": classifier,
+            "encoder": encoder,
+            "input_format": "coded",
+            "trained_through": scan.trained_through,
+            "val_auc": val_auc,
+            "full_fit_s": fit_s,
+        },
+        model_path,
+    )
+    logging.info("Saved out-of-core lightgbm model to %s", model_path)
+
+    records = sample_records(args.input, encoder.feature_list, BENCH_BATCH_ROWS)
+    with profiler.step("bench:lightgbm", rows_in=len(records)):
+        metrics["benchmark"] = {"fit_s": round(fit_s, 3), **benchmark_bundle(model_path, records)}
+    ooc_steps = [step for step in profiler.steps if step.name.startswith("ooc:")]
+    metrics["out_of_core"] = {
+        "rows": scan.rows,
+        "train_rows": len(y_train),
+        "holdout_months": scan.holdout_months,
+        "dataset_mb": round(scan.dataset_bytes / (1024 * 1024), 1),
+        # What the coded features alone would take if loaded in memory.
+        "coded_matrix_mb": round(scan.rows * len(encoder.native_columns) * 4 / (1024 * 1024), 1),
+        "peak_rss_mb": max(step.peak_rss_mb for step in ooc_steps),
+        "best_iteration": booster.best_iteration,
+    }
+    logging.info("lightgbm out-of-core: %s", metrics["out_of_core"])
     return metrics, importances
 
 
-def save_reports(metrics: Dict[str, Dict[str, float]], importances: Dict[str, List[Tuple[str, float]]]) -> None:
+def select_model(metrics: Dict[str, Dict[str, Any]], latency_budget_ms: float, min_auc: float) -> Dict[str, Any]:
+    """Pick the production model: best test AUC among those within the latency budget and AUC floor.
+
+    Warm-started models are skipped: their metrics come from the rows after
+    their cutoff, not the test split the others are scored on.
+    """
+    warm_started = [name for name, result in metrics.items() if "warm_start" in result and "fallback" not in result["warm_start"]]
+    eligible = [
+        name
+        for name, result in metrics.items()
+        if name not in warm_started
+        and result["roc_auc"] >= min_auc
+        and result.get("benchmark", {}).get("single_p95_ms", float("inf")) <= latency_budget_ms
+    ]
+    selected = max(eligible, key=lambda name: metrics[name]["roc_auc"], default=None)
+    if selected is None:
+        logging.warning("No model meets AUC >= %.3f within %.1f ms; keeping the serving default", min_auc, latency_budget_ms)
+    else:
+        logging.info("Selected %s (AUC=%.4f, p95=%.2f ms)", selected, metrics[selected]["roc_auc"], metrics[selected]["benchmark"]["single_p95_ms"])
+    return {
+        "selected": selected,
+        "rule": {"metric": "roc_auc", "min_auc": min_auc, "latency": "single_p95_ms", "latency_budget_ms": latency_budget_ms},
+        "eligible": eligible,
+        "warm_started": warm_started,
+    }
+
+
+def save_reports(
+    metrics: Dict[str, Dict[str, Any]],
+    importances: Dict[str, List[Tuple[str, float]]],
+    selection: Optional[Dict[str, Any]] = None,
+) -> None:
     REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    if selection is not None:
+        SELECTION_PATH.write_text(json.dumps(selection, indent=2))
+        logging.info("Model selection written to %s", SELECTION_PATH)
     metrics_path = REPORT_DIR / "metrics.json"
     feature_path = REPORT_DIR / "feature_importance.json"
     metrics_path.write_text(json.dumps(metrics, indent=2))
@@ -272,13 +1154,92 @@ def main() -> None:
     args = parse_args()
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
-    df = load_dataset(args.input)
-    train_df, val_df, test_df = split_dataset(df, args.test_size, args.random_state)
-    preprocessor, features = build_preprocessor(df)
-    preprocessor.feature_names_in_ = features  # type: ignore[attr-defined]
+    profiler = StageProfiler("03_train")
+    if args.out_of_core:
+        # Scored on a month holdout, not the random split the other models are
+        # ranked on, so it neither joins metrics.json nor the production pick.
+        metrics, importances = train_out_of_core(args, profiler)
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        OUT_OF_CORE_REPORT.write_text(json.dumps({"metrics": metrics, "feature_importance": importances}, indent=2))
+        logging.info("Out-of-core report written to %s", OUT_OF_CORE_REPORT)
+        profiler.write(args.profile)
+        return
+
+    df: Optional[pd.DataFrame] = None
+    with tempfile.TemporaryDirectory(prefix="03_train_") as tmp:
+        if args.no_cache:
+            inputs_dir = Path(tmp)
+            df = prepare_inputs(args, inputs_dir, profiler)
+        else:
+            with profiler.step("cache_key"):
+                key = input_cache_key(
+                    args.input, args.airports, args.start_date, args.end_date, args.test_size, args.random_state
+                )
+            inputs_dir = args.cache_dir / key
+            if (inputs_dir / INPUT_CACHE_META).exists():
+                logging.info("Reusing encoded inputs from %s", inputs_dir)
+                (inputs_dir / INPUT_CACHE_META).touch()
+            else:
+                staging = args.cache_dir / f".{key}.tmp"
+                if staging.exists():
+                    shutil.rmtree(staging)
+                staging.mkdir(parents=True)
+                df = prepare_inputs(args, staging, profiler)
+                meta = {"key": key, "input": str(args.input), "created_at": profiler.started_at}
+                (staging / INPUT_CACHE_META).write_text(json.dumps(meta, indent=2))
+                staging.rename(inputs_dir)
+                logging.info("Cached encoded inputs → %s", inputs_dir)
+                prune_input_cache(args.cache_dir)
+
+        tuned: Dict[str, Dict[str, Any]] = {}
+        if (args.tune or args.warm_start) and df is None:
+            with profiler.step("load") as step:
+                df = load_dataset(args.input, args.airports, args.start_date, args.end_date)
+                step.rows_out = len(df)
+        if args.tune:
+            # Tune on the train split only so the test split stays unseen.
+            tuned = tune_models(
+                df.loc[np.load(inputs_dir / "index_train.npy")],
+                args.n_estimators,
+                args.random_state,
+                profiler,
+                n_folds=args.tune_folds,
+                n_candidates=args.tune_candidates,
+                eta=args.tune_eta,
+                jobs=args.jobs,
+                threads=args.threads,
+            )
+
+        warm_metrics: Dict[str, Dict[str, Any]] = {}
+        warm_importances: Dict[str, List[Tuple[str, float]]] = {}
+        warm_reports: Dict[str, Dict[str, Any]] = {}
+        if args.warm_start:
+            warm_metrics, warm_importances, warm_reports = warm_start_models(
+                df, inputs_dir, args.warm_trees, args.drift_tolerance, profiler, threads=args.threads
+            )
+        df = None
 
-    metrics, importances = train_models(preprocessor, train_df, val_df, test_df, args.random_state, args.n_estimators)
-    save_reports(metrics, importances)
+        metrics, importances = train_models(
+            inputs_dir,
+            args.random_state,
+            args.n_estimators,
+            profiler,
+            jobs=args.jobs,
+            threads=args.threads,
+            params={name: result["params"] for name, result in tuned.items()},
+            models=[name for name in MODEL_NAMES if name not in warm_metrics],
+        )
+        metrics.update(warm_metrics)
+        importances.update(warm_importances)
+        metrics = {name: metrics[name] for name in MODEL_NAMES}
+        importances = {name: importances[name] for name in MODEL_NAMES}
+        for name, result in tuned.items():
+            metrics[name]["tuning"] = result
+        for name, report in warm_reports.items():
+            metrics[name]["warm_start"] = report
+        benchmark_models(metrics, pd.read_parquet(inputs_dir / BENCH_RECORDS).to_dict("records"), profiler, args.threads)
+    save_reports(metrics, importances, select_model(metrics, args.latency_budget_ms, args.min_auc))
+    profiler.write(args.profile)
 
 
 if __name__ == "__main__":
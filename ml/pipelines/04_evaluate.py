@@ -0,0 +1,338 @@
+"""
+Sliced evaluation of the trained models.
+
+Scores every saved bundle under `ml/artifacts/models/` once on the test split
+of `03_train.py` (same table, filters, `--test-size` and `--random-state`),
+then reports per airport, hour, weekday and month slice:
+  - ROC-AUC, F1, precision, recall at the model's `metrics.json` threshold
+  - calibration (Brier score, 10-bin expected calibration error, mean
+    predicted vs. observed delay rate) and confusion counts
+  - bootstrap confidence intervals for every metric
+Output: `ml/artifacts/evaluation/evaluation.json`.
+
+All slices of a dimension are computed together: rows are sorted once by
+(slice, score) and every metric is a segment sum (`np.add.reduceat`) over that
+order, AUC included (Mann-Whitney over tie runs). The bootstrap uses Poisson(1)
+row weights, so B replicates are a (B, rows) weight matrix pushed through the
+same reductions instead of B resampled copies of the test set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import sys
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from feature_engine import FeatureEncoder  # noqa: E402
+from profiling import StageProfiler  # noqa: E402
+
+TRAIN_SCRIPT = Path(__file__).with_name("03_train.py")
+EVAL_DIR = Path("ml/artifacts/evaluation")
+SLICE_COLUMNS = ["airport_code", "hour", "weekday", "month"]
+CALIBRATION_BINS = 10
+DEFAULT_BOOTSTRAP = 200
+DEFAULT_CONFIDENCE = 0.95
+# Replicates x rows per bootstrap chunk (about 40 MB per float64 matrix).
+BOOTSTRAP_CHUNK_CELLS = 5_000_000
+METRICS = ["roc_auc", "f1", "precision", "recall", "brier", "ece", "mean_prob", "observed_rate"]
+COUNTS = ["n", "positives", "tp", "fp", "fn", "tn"]
+
+
+def load_train_module() -> ModuleType:
+    """`03_train.py` as a module, for its split and artifact paths."""
+    spec = importlib.util.spec_from_file_location("train", TRAIN_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate the saved models per airport/hour/weekday/month slice.")
+    parser.add_argument("--input", type=Path, default=Path("data/processed/train_table.parquet"))
+    parser.add_argument("--airports", nargs="+", default=None, help="Same filters as the 03_train.py run.")
+    parser.add_argument("--start-date", default=None)
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--test-size", type=float, default=0.3)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--models", nargs="+", default=None, help="Models to evaluate (default: every saved bundle).")
+    parser.add_argument("--slices", nargs="+", default=SLICE_COLUMNS)
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP, help="Bootstrap replicates (0 disables CIs).")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=EVAL_DIR / "evaluation.json")
+    parser.add_argument("--profile", type=Path, default=EVAL_DIR / "evaluate_profile.json")
+    return parser.parse_args()
+
+
+@dataclass
+class SortedGroups:
+    """Rows ordered by (group, score) and the segment starts the metrics reduce over."""
+
+    order: np.ndarray
+    group_starts: np.ndarray
+    # Runs of equal (group, score): the tie blocks of the rank statistic.
+    run_starts: np.ndarray
+    run_group: np.ndarray
+    run_group_starts: np.ndarray
+    # Runs of equal (group, calibration bin).
+    bin_starts: np.ndarray
+    bin_group_starts: np.ndarray
+
+
+def _segment_starts(*keys: np.ndarray) -> np.ndarray:
+    change = np.zeros(len(keys[0]), dtype=bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+def _first_of_group(starts: np.ndarray, group_starts: np.ndarray) -> np.ndarray:
+    """Positions in `starts` where a new group begins."""
+    return np.searchsorted(starts, group_starts)
+
+
+def sort_groups(groups: np.ndarray, scores: np.ndarray) -> SortedGroups:
+    order = np.lexsort((scores, groups))
+    groups, scores = groups[order], scores[order]
+    bins = np.minimum((scores * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    group_starts = _segment_starts(groups)
+    run_starts = _segment_starts(groups, scores)
+    bin_starts = _segment_starts(groups, bins)
+    return SortedGroups(
+        order=order,
+        group_starts=group_starts,
+        run_starts=run_starts,
+        run_group=np.searchsorted(group_starts, run_starts, side="right") - 1,
+        run_group_starts=_first_of_group(run_starts, group_starts),
+        bin_starts=bin_starts,
+        bin_group_starts=_first_of_group(bin_starts, group_starts),
+    )
+
+
+def grouped_metrics(sg: SortedGroups, y: np.ndarray, prob: np.ndarray, threshold: float, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """Every metric of every group for each row-weight vector.
+
+    `y` and `prob` are in `sg.order`; `weights` is (replicates, rows), all ones
+    for the point estimate. Returns (replicates, groups) arrays; undefined
+    values (e.g. AUC of a single-class slice) are NaN.
+    """
+
+    def per_group(values: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(values, sg.group_starts, axis=1)
+
+    w_pos = weights * y
+    w_neg = weights - w_pos
+    predicted = prob >= threshold
+    n = per_group(weights)
+    pos = per_group(w_pos)
+    tp = per_group(w_pos * predicted)
+    fp = per_group(w_neg * predicted)
+    fn = pos - tp
+    tn = n - pos - fp
+
+    # Mann-Whitney AUC: each positive counts the negatives ranked below it in
+    # its own group, plus half of the negatives tied with it.
+    run_pos = np.add.reduceat(w_pos, sg.run_starts, axis=1)
+    run_neg = np.add.reduceat(w_neg, sg.run_starts, axis=1)
+    neg_before = np.cumsum(run_neg, axis=1) - run_neg
+    neg_below = neg_before - neg_before[:, sg.run_group_starts][:, sg.run_group]
+    concordant = np.add.reduceat(run_pos * (neg_below + 0.5 * run_neg), sg.run_group_starts, axis=1)
+
+    # Calibration bins are contiguous within a group in score order.
+    bin_gap = np.abs(np.add.reduceat(weights * prob, sg.bin_starts, axis=1) - np.add.reduceat(w_pos, sg.bin_starts, axis=1))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "roc_auc": concordant / (pos * (n - pos)),
+            "f1": 2 * tp / (2 * tp + fp + fn),
+            "precision": tp / (tp + fp),
+            "recall": tp / pos,
+            "brier": per_group(weights * (prob - y) ** 2) / n,
+            "ece": np.add.reduceat(bin_gap, sg.bin_group_starts, axis=1) / n,
+            "mean_prob": per_group(weights * prob) / n,
+            "observed_rate": pos / n,
+            "n": n,
+            "positives": pos,
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "tn": tn,
+        }
+
+
+def bootstrap_intervals(
+    sg: SortedGroups,
+    y: np.ndarray,
+    prob: np.ndarray,
+    threshold: float,
+    replicates: int,
+    confidence: float,
+    rng: np.random.Generator,
+) -> Dict[str, np.ndarray]:
+    """(2, groups) lower/upper percentile bounds per metric from Poisson-weighted replicates."""
+    chunk = max(1, BOOTSTRAP_CHUNK_CELLS // max(len(y), 1))
+    samples: Dict[str, List[np.ndarray]] = {name: [] for name in METRICS}
+    for start in range(0, replicates, chunk):
+        weights = rng.poisson(1.0, size=(min(chunk, replicates - start), len(y))).astype("float64")
+        for name, values in grouped_metrics(sg, y, prob, threshold, weights).items():
+            if name in samples:
+                samples[name].append(values)
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # All-NaN slices (e.g. no positives in any replicate) stay NaN.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {
+            name: np.nanquantile(np.concatenate(values), [alpha, 1 - alpha], axis=0)
+            for name, values in samples.items()
+        }
+
+
+def _json_number(value: float) -> Optional[float]:
+    return None if math.isnan(value) else round(float(value), 6)
+
+
+def slice_report(
+    labels: np.ndarray,
+    y: np.ndarray,
+    prob: np.ndarray,
+    threshold: float,
+    replicates: int,
+    confidence: float,
+    rng: np.random.Generator,
+) -> List[Dict[str, Any]]:
+    """Metrics (and CIs) for each distinct value of `labels`."""
+    codes, values = pd.factorize(labels, sort=True, use_na_sentinel=False)
+    sg = sort_groups(codes, prob)
+    y_sorted, prob_sorted = y[sg.order], prob[sg.order]
+    point = grouped_metrics(sg, y_sorted, prob_sorted, threshold, np.ones((1, len(y))))
+    ci = bootstrap_intervals(sg, y_sorted, prob_sorted, threshold, replicates, confidence, rng) if replicates else None
+
+    rows = []
+    for group, value in enumerate(values):
+        row: Dict[str, Any] = {"value": value.item() if hasattr(value, "item") else value}
+        row.update({name: int(point[name][0, group]) for name in COUNTS})
+        row.update({name: _json_number(point[name][0, group]) for name in METRICS})
+        if ci is not None:
+            row["ci"] = {name: [_json_number(bounds[0, group]), _json_number(bounds[1, group])] for name, bounds in ci.items()}
+        rows.append(row)
+    return rows
+
+
+def calibration_curve(y: np.ndarray, prob: np.ndarray) -> List[Dict[str, Any]]:
+    bins = np.minimum((prob * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    count = np.bincount(bins, minlength=CALIBRATION_BINS)
+    prob_sum = np.bincount(bins, weights=prob, minlength=CALIBRATION_BINS)
+    pos_sum = np.bincount(bins, weights=y, minlength=CALIBRATION_BINS)
+    return [
+        {
+            "bin": [i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS],
+            "n": int(count[i]),
+            "mean_prob": _json_number(prob_sum[i] / count[i]) if count[i] else None,
+            "observed_rate": _json_number(pos_sum[i] / count[i]) if count[i] else None,
+        }
+        for i in range(CALIBRATION_BINS)
+    ]
+
+
+def score_bundle(bundle: Dict[str, Any], test_df: pd.DataFrame) -> np.ndarray:
+    """Positive-class probability from a saved bundle, encoded as the API would."""
+    encoder = FeatureEncoder.from_bundle(bundle)
+    transform = encoder.frame_transform(bundle.get("input_format", "encoded"))
+    return bundle["model"].predict_proba(transform(test_df))[:, 1]
+
+
+def evaluate_model(
+    prob: np.ndarray,
+    y: np.ndarray,
+    test_df: pd.DataFrame,
+    threshold: float,
+    slices: List[str],
+    replicates: int,
+    confidence: float,
+    rng: np.random.Generator,
+) -> Dict[str, Any]:
+    overall = slice_report(np.zeros(len(y), dtype="int8"), y, prob, threshold, replicates, confidence, rng)[0]
+    overall.pop("value")
+    overall["calibration"] = calibration_curve(y, prob)
+    return {
+        "threshold": threshold,
+        "overall": overall,
+        "slices": {col: slice_report(test_df[col].to_numpy(), y, prob, threshold, replicates, confidence, rng) for col in slices},
+    }
+
+
+def main() -> None:
+    train = load_train_module()
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    profiler = StageProfiler("04_evaluate")
+
+    with profiler.step("load") as step:
+        df = train.load_dataset(args.input, args.airports, args.start_date, args.end_date)
+        _, _, test_df = train.split_dataset(df, args.test_size, args.random_state)
+        del df
+        step.rows_out = len(test_df)
+    y = test_df[train.TARGET].astype(int).to_numpy().astype("float64")
+
+    metrics_path = train.REPORT_DIR / "metrics.json"
+    train_metrics = json.loads(metrics_path.read_text()) if metrics_path.exists() else {}
+    names = args.models or [name for name in train.MODEL_NAMES if (train.MODEL_DIR / f"{name}.joblib").exists()]
+    rng = np.random.default_rng(args.seed)
+    report: Dict[str, Any] = {
+        "input": str(args.input),
+        "test_rows": len(test_df),
+        "split": {"test_size": args.test_size, "random_state": args.random_state},
+        "bootstrap": {"replicates": args.bootstrap, "confidence": args.confidence, "weights": "poisson", "seed": args.seed},
+        "models": {},
+    }
+    for name in names:
+        with profiler.step(f"score:{name}", rows_in=len(test_df)):
+            bundle = joblib.load(train.MODEL_DIR / f"{name}.joblib")
+            prob = score_bundle(bundle, test_df)
+        if bundle.get("input_format") == "coded":
+            # Out-of-core bundles hold out the last months, not this random split.
+            logging.warning("%s was trained out-of-core; this test split overlaps its training rows", name)
+        elif bundle.get("warm_starts"):
+            # The booster it continued was fitted on an earlier split of a smaller table;
+            # 03_train scores it on the rows after its cutoff instead.
+            logging.warning("%s was warm-started; this test split overlaps its base model's training rows", name)
+        threshold = float(train_metrics.get(name, {}).get("threshold", 0.5))
+        with profiler.step(f"slices:{name}", rows_in=len(test_df)):
+            result = evaluate_model(prob, y, test_df, threshold, args.slices, args.bootstrap, args.confidence, rng)
+        result["input_format"] = bundle.get("input_format", "encoded")
+        report["models"][name] = result
+        overall = result["overall"]
+        logging.info(
+            "%s: AUC=%.4f %s, F1=%.4f, ECE=%.4f over %d slices",
+            name,
+            overall["roc_auc"],
+            overall.get("ci", {}).get("roc_auc"),
+            overall["f1"],
+            overall["ece"],
+            sum(len(rows) for rows in result["slices"].values()),
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    logging.info("Evaluation written to %s", args.output)
+    profiler.write(args.profile)
+
+
+if __name__ == "__main__":
+    main()
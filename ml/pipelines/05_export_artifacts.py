@@ -0,0 +1,138 @@
+"""
+Exports trained models as compact serving bundles (`ml/serving_bundle.py`).
+
+    python ml/pipelines/05_export_artifacts.py                  # the selected model
+    python ml/pipelines/05_export_artifacts.py --models lightgbm xgboost
+
+For each model, the joblib bundle under `ml/artifacts/models/` becomes
+`ml/artifacts/serving/<model>/`. That directory holds the model in its
+library's native format, the encoder as arrays, the `metrics.json` threshold,
+and the per-slot base rows of the train table. Each bundle is written to a
+staging directory next to it (`.<model>.staged/`) and its predictions are
+checked there against the joblib model on the latest train-table rows; only
+a bundle that passes is moved over the served `<model>/`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from feature_engine import FeatureEncoder  # noqa: E402
+from profiling import StageProfiler  # noqa: E402
+from serving_bundle import SlotLookup, load_serving_bundle, publish_serving_bundle, write_serving_bundle  # noqa: E402
+from table_io import read_table  # noqa: E402
+
+MODEL_DIR = Path("ml/artifacts/models")
+REPORT_DIR = Path("ml/artifacts/reports")
+SERVING_DIR = Path("ml/artifacts/serving")
+MODEL_NAMES = ["log_reg", "random_forest", "xgboost", "lightgbm", "catboost"]
+CHECK_ROWS = 256
+# Largest probability difference allowed between the joblib and exported model.
+CHECK_TOLERANCE = 1e-6
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export trained models as serving bundles.")
+    parser.add_argument("--models", nargs="+", default=None, help="Models to export (default: the one in model_selection.json).")
+    parser.add_argument("--all", action="store_true", help="Export every trained model that has a native format.")
+    parser.add_argument("--table", type=Path, default=Path("data/processed/train_table.parquet"), help="Source of the lookup rows.")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--metrics", type=Path, default=REPORT_DIR / "metrics.json")
+    parser.add_argument("--selection", type=Path, default=REPORT_DIR / "model_selection.json")
+    parser.add_argument("--output-dir", type=Path, default=SERVING_DIR)
+    parser.add_argument("--profile", type=Path, default=SERVING_DIR / "export_profile.json")
+    return parser.parse_args()
+
+
+def models_to_export(args: argparse.Namespace) -> List[str]:
+    if args.models:
+        return args.models
+    trained = [name for name in MODEL_NAMES if (args.model_dir / f"{name}.joblib").exists()]
+    if args.all:
+        return trained
+    selected: Optional[str] = None
+    if args.selection.exists():
+        selected = json.loads(args.selection.read_text()).get("selected")
+    if not selected:
+        raise SystemExit(f"No selected model in {args.selection}; pass --models or --all")
+    return [selected]
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    profiler = StageProfiler("05_export_artifacts")
+
+    with profiler.step("lookups") as step:
+        df = read_table(args.table)
+        df["airport_code"] = df["airport_code"].str.upper()
+        lookup = SlotLookup.from_table(df)
+        check_records = df.sort_values("flight_date", kind="mergesort").tail(CHECK_ROWS).to_dict("records")
+        del df
+        step.rows_out = len(lookup.by_slot)
+    metrics = json.loads(args.metrics.read_text()) if args.metrics.exists() else {}
+
+    names = models_to_export(args)
+    all_requested = not args.models and args.all
+    for name in names:
+        with profiler.step(f"export:{name}"):
+            model_path = args.model_dir / f"{name}.joblib"
+            start = time.perf_counter()
+            bundle = joblib.load(model_path)
+            joblib_load_s = time.perf_counter() - start
+            threshold = float(metrics.get(name, {}).get("threshold", 0.5))
+            encoder = FeatureEncoder.from_bundle(bundle)
+            expected = bundle["model"].predict_proba(encoder.records_transform(bundle.get("input_format", "encoded"))(check_records))[:, 1]
+            staged = args.output_dir / f".{name}.staged"
+            try:
+                manifest = write_serving_bundle(
+                    staged,
+                    name,
+                    bundle,
+                    threshold,
+                    lookup,
+                    extra={"source": {"model": str(model_path), "joblib_mb": round(model_path.stat().st_size / (1024 * 1024), 3)}},
+                )
+            except ValueError as exc:
+                if all_requested:
+                    logging.warning("Skipping %s: %s", name, exc)
+                    continue
+                raise
+
+            start = time.perf_counter()
+            serving = load_serving_bundle(staged)
+            load_s = time.perf_counter() - start
+            actual = serving.model.predict_proba(serving.encoder.records_transform(serving.input_format)(check_records))[:, 1]
+            max_diff = float(np.max(np.abs(actual - expected)))
+            if max_diff > CHECK_TOLERANCE:
+                # The served bundle is left as it was.
+                shutil.rmtree(staged)
+                raise ValueError(f"Exported {name} diverges from its joblib model (max |Δp| = {max_diff:.2e})")
+            size_mb = sum(p.stat().st_size for p in staged.iterdir()) / (1024 * 1024)
+            publish_serving_bundle(staged, args.output_dir / name)
+            logging.info(
+                "Exported %s v%s → %s (%.2f MB, load %.1f ms vs joblib %.1f ms, max |Δp| %.1e)",
+                name,
+                manifest["version"],
+                args.output_dir / name,
+                size_mb,
+                load_s * 1000,
+                joblib_load_s * 1000,
+                max_diff,
+            )
+    profiler.write(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Lightweight per-step profiling for the ML pipeline stages.
+
+    profiler = StageProfiler("01_label_delays")
+    with profiler.step("read") as step:
+        df = pd.read_parquet(path)
+        step.rows_out = len(df)
+    ...
+    profiler.write(profile_path_for(stats_path))
+
+Each step records wall time, CPU time (this process plus reaped child
+processes, e.g. a ProcessPoolExecutor) and peak RSS. On Linux the peak is reset
+at the start of every step through `/proc/self/clear_refs`, so it is the step's
+own high-water mark; elsewhere it falls back to the process-wide `ru_maxrss`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+PROC_STATUS = Path("/proc/self/status")
+PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+@dataclass
+class StepProfile:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+
+
+def _cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        PROC_CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        for line in PROC_STATUS.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _max_rss_mb()
+
+
+@dataclass
+class StageProfiler:
+    stage: str
+    steps: List[StepProfile] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._wall_start = time.perf_counter()
+        self._cpu_start = _cpu_seconds()
+        self.peak_rss_scope = "step"
+
+    @contextmanager
+    def step(self, name: str, rows_in: Optional[int] = None) -> Iterator[StepProfile]:
+        """Profile the enclosed block; set `rows_out` (and `rows_in`) on the yielded record."""
+        record = StepProfile(name=name, rows_in=rows_in)
+        if not _reset_peak_rss():
+            self.peak_rss_scope = "process"
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        try:
+            yield record
+        finally:
+            record.wall_s = round(time.perf_counter() - wall_start, 3)
+            record.cpu_s = round(_cpu_seconds() - cpu_start, 3)
+            record.peak_rss_mb = round(_peak_rss_mb(), 1)
+            self.steps.append(record)
+            logging.info(
+                "[profile] %s: %.2fs wall, %.2fs cpu, %.0f MB peak",
+                name,
+                record.wall_s,
+                record.cpu_s,
+                record.peak_rss_mb,
+            )
+
+    def report(self) -> dict[str, object]:
+        return {
+            "stage": self.stage,
+            "started_at": self.started_at,
+            "wall_s": round(time.perf_counter() - self._wall_start, 3),
+            "cpu_s": round(_cpu_seconds() - self._cpu_start, 3),
+            "peak_rss_mb": round(max([_max_rss_mb()] + [s.peak_rss_mb for s in self.steps]), 1),
+            "peak_rss_scope": self.peak_rss_scope,
+            "steps": [asdict(step) for step in self.steps],
+        }
+
+    def write(self, path: Path) -> dict[str, object]:
+        report = self.report()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        logging.info("Saved profile → %s", path)
+        return report
+
+
+def profile_path_for(stats_path: Path) -> Path:
+    """`foo_stats.json` → `foo_profile.json` in the same directory."""
+    stem = stats_path.stem
+    stem = stem[: -len("_stats")] if stem.endswith("_stats") else stem
+    return stats_path.with_name(f"{stem}_profile.json")
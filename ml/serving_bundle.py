@@ -0,0 +1,339 @@
+"""
+Versioned serving bundle: what the API needs to predict, without sklearn or pickles.
+
+    <serving_dir>/<model>/
+        manifest.json   format version, bundle version, feature list, column
+                        roles, input format, threshold, model file and kind
+        encoder.npz     FeatureEncoder parameters as plain arrays
+        model.*         the model in its library's own format (LightGBM text,
+                        XGBoost UBJSON, CatBoost .cbm) or, for linear models,
+                        coefficients in an .npz
+        lookups.parquet latest train-table row per (airport, hour, weekday),
+                        per airport and overall: the base rows of a request
+
+Written by `ml/pipelines/05_export_artifacts.py` from a trained joblib bundle
+and read by the API's `Predictor`. Nothing in it is unpickled, so loading
+takes milliseconds and does not depend on the library versions that trained
+the model.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from feature_engine import FeatureEncoder
+
+SERVING_FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ENCODER_FILE = "encoder.npz"
+LOOKUPS_FILE = "lookups.parquet"
+MODEL_FILES = {
+    "lightgbm": "model.txt",
+    "xgboost": "model.ubj",
+    "catboost": "model.cbm",
+    "linear": "model.npz",
+}
+SLOT_KEYS = ["airport_code", "hour", "weekday"]
+LOOKUP_LEVEL = "lookup_level"
+
+
+class SlotLookup:
+    """Most recent train-table row per (airport, hour, weekday), per airport and overall.
+
+    Serving reads these instead of filtering the table on every request.
+    """
+
+    def __init__(self, by_slot: Dict[Tuple[str, int, int], Dict[str, Any]], by_airport: Dict[str, Dict[str, Any]], any_row: Dict[str, Any]) -> None:
+        self.by_slot = by_slot
+        self.by_airport = by_airport
+        self.any_row = any_row
+
+    @classmethod
+    def from_table(cls, df: pd.DataFrame) -> "SlotLookup":
+        ordered = df.sort_values("flight_date", kind="mergesort")
+        slots = ordered.drop_duplicates(SLOT_KEYS, keep="last")
+        by_slot = {
+            (airport, int(hour), int(weekday)): record
+            for airport, hour, weekday, record in zip(
+                slots["airport_code"], slots["hour"], slots["weekday"], slots.to_dict("records")
+            )
+            if not pd.isna(hour) and not pd.isna(weekday)
+        }
+        airports = ordered.drop_duplicates("airport_code", keep="last")
+        by_airport = dict(zip(airports["airport_code"], airports.to_dict("records")))
+        return cls(by_slot, by_airport, ordered.iloc[-1].to_dict() if not ordered.empty else {})
+
+    def record(self, airport_code: str, hour: int, weekday: int) -> Dict[str, Any]:
+        airport_code = airport_code.upper()
+        return dict(self.by_slot.get((airport_code, hour, weekday)) or self.by_airport.get(airport_code) or self.any_row)
+
+    def to_frame(self) -> pd.DataFrame:
+        levels = [("slot", list(self.by_slot.values())), ("airport", list(self.by_airport.values())), ("any", [self.any_row] if self.any_row else [])]
+        return pd.DataFrame([{**record, LOOKUP_LEVEL: level} for level, records in levels for record in records])
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "SlotLookup":
+        level = frame.pop(LOOKUP_LEVEL)
+        records = frame.to_dict("records")
+        by_slot: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+        by_airport: Dict[str, Dict[str, Any]] = {}
+        any_row: Dict[str, Any] = {}
+        for kind, record in zip(level, records):
+            if kind == "slot":
+                by_slot[(record["airport_code"], int(record["hour"]), int(record["weekday"]))] = record
+            elif kind == "airport":
+                by_airport[record["airport_code"]] = record
+            else:
+                any_row = record
+        return cls(by_slot, by_airport, any_row)
+
+
+class LightGBMModel:
+    kind = "lightgbm"
+
+    def __init__(self, booster: Any) -> None:
+        self.booster = booster
+
+    @classmethod
+    def from_model(cls, model: Any) -> "LightGBMModel":
+        # LGBMClassifier, or out_of_core.BoosterClassifier.
+        return cls(model.booster_ if hasattr(model, "booster_") else model.booster)
+
+    def save(self, path: Path) -> None:
+        # Trees up to the best iteration when early stopping recorded one.
+        self.booster.save_model(str(path))
+
+    @classmethod
+    def load(cls, path: Path) -> "LightGBMModel":
+        import lightgbm as lgb
+
+        return cls(lgb.Booster(model_file=str(path)))
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        positive = self.booster.predict(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+class XGBoostModel:
+    kind = "xgboost"
+
+    def __init__(self, booster: Any) -> None:
+        self.booster = booster
+
+    @classmethod
+    def from_model(cls, model: Any) -> "XGBoostModel":
+        booster = model.get_booster()
+        best = getattr(booster, "best_iteration", None)
+        # Keep only the trees the sklearn wrapper would use.
+        return cls(booster[: best + 1] if best is not None else booster)
+
+    def save(self, path: Path) -> None:
+        self.booster.save_model(str(path))
+
+    @classmethod
+    def load(cls, path: Path) -> "XGBoostModel":
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(str(path))
+        return cls(booster)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        positive = self.booster.inplace_predict(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+class CatBoostModel:
+    kind = "catboost"
+
+    def __init__(self, model: Any) -> None:
+        self.model = model
+
+    @classmethod
+    def from_model(cls, model: Any) -> "CatBoostModel":
+        return cls(model)
+
+    def save(self, path: Path) -> None:
+        self.model.save_model(str(path))
+
+    @classmethod
+    def load(cls, path: Path) -> "CatBoostModel":
+        from catboost import CatBoostClassifier
+
+        return cls(CatBoostClassifier().load_model(str(path)))
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self.model.predict_proba(X)
+
+
+class LinearModel:
+    """Binary logistic regression as coefficients: sigmoid(X @ coef + intercept)."""
+
+    kind = "linear"
+
+    def __init__(self, coef: np.ndarray, intercept: float) -> None:
+        self.coef = coef
+        self.intercept = intercept
+
+    @classmethod
+    def from_model(cls, model: Any) -> "LinearModel":
+        return cls(np.asarray(model.coef_, dtype="float64").ravel(), float(np.ravel(model.intercept_)[0]))
+
+    def save(self, path: Path) -> None:
+        np.savez(path, coef=self.coef, intercept=np.array([self.intercept]))
+
+    @classmethod
+    def load(cls, path: Path) -> "LinearModel":
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays["coef"], float(arrays["intercept"][0]))
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        positive = 1.0 / (1.0 + np.exp(-(np.asarray(X @ self.coef).ravel() + self.intercept)))
+        return np.column_stack([1.0 - positive, positive])
+
+
+MODEL_KINDS = {cls.kind: cls for cls in (LightGBMModel, XGBoostModel, CatBoostModel, LinearModel)}
+
+
+def native_model(model: Any) -> Optional[Any]:
+    """The compact wrapper for a trained model, or None when it has no native format."""
+    if hasattr(model, "booster_") or type(model).__name__ == "BoosterClassifier":
+        return LightGBMModel.from_model(model)
+    if hasattr(model, "get_booster"):
+        return XGBoostModel.from_model(model)
+    if type(model).__name__ == "CatBoostClassifier":
+        return CatBoostModel.from_model(model)
+    if hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        return LinearModel.from_model(model)
+    return None
+
+
+def _encoder_arrays(encoder: FeatureEncoder) -> Dict[str, np.ndarray]:
+    arrays = {"numeric_fill": encoder.numeric_fill, "numeric_scale": encoder.numeric_scale}
+    for position, values in enumerate(encoder.categories):
+        # The one-hot encoder keeps None (not imputed) as a category of its own.
+        if not all(value is None or isinstance(value, str) for value in values):
+            raise ValueError(f"Categories of {encoder.categorical_cols[position]} are not all strings")
+        arrays[f"categories_{position}"] = np.asarray(["" if value is None else value for value in values], dtype=str)
+        arrays[f"categories_{position}_none"] = np.array([value is None for value in values])
+    return arrays
+
+
+def _categories(arrays: Mapping[str, np.ndarray], position: int) -> List[Optional[str]]:
+    values = arrays[f"categories_{position}"].tolist()
+    return [None if is_none else value for value, is_none in zip(values, arrays[f"categories_{position}_none"])]
+
+
+def _load_encoder(manifest: Mapping[str, Any], path: Path) -> FeatureEncoder:
+    with np.load(path, allow_pickle=False) as arrays:
+        return FeatureEncoder(
+            feature_list=manifest["feature_list"],
+            numeric_cols=manifest["numeric_cols"],
+            numeric_fill=arrays["numeric_fill"],
+            numeric_scale=arrays["numeric_scale"],
+            categorical_cols=manifest["categorical_cols"],
+            categories=[_categories(arrays, i) for i in range(len(manifest["categorical_cols"]))],
+            sparse_output=manifest["sparse_output"],
+        )
+
+
+def _digest(directory: Path, names: List[str]) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        digest.update(name.encode() + b"\0" + (directory / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def write_serving_bundle(
+    directory: Path,
+    model_name: str,
+    bundle: Mapping[str, Any],
+    threshold: float,
+    lookup: SlotLookup,
+    extra: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Write the serving form of a joblib training bundle to `directory` (replaced atomically)."""
+    model = native_model(bundle["model"])
+    if model is None:
+        raise ValueError(f"{model_name} ({type(bundle['model']).__name__}) has no compact native format")
+    encoder = FeatureEncoder.from_bundle(bundle)
+
+    tmp = directory.with_name(f".{directory.name}.tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    model_file = MODEL_FILES[model.kind]
+    model.save(tmp / model_file)
+    np.savez(tmp / ENCODER_FILE, **_encoder_arrays(encoder))
+    lookup.to_frame().to_parquet(tmp / LOOKUPS_FILE, index=False)
+    files = [model_file, ENCODER_FILE, LOOKUPS_FILE]
+    manifest = {
+        "format_version": SERVING_FORMAT_VERSION,
+        # Content hash: changes whenever the model, encoder or lookups do.
+        "version": _digest(tmp, files),
+        "model_name": model_name,
+        "model_kind": model.kind,
+        "model_file": model_file,
+        "input_format": bundle.get("input_format", "encoded"),
+        "feature_list": encoder.feature_list,
+        "numeric_cols": encoder.numeric_cols,
+        "categorical_cols": encoder.categorical_cols,
+        "sparse_output": encoder.sparse_output,
+        "threshold": threshold,
+        "trained_through": bundle.get("trained_through"),
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": files,
+        **(extra or {}),
+    }
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2, ensure_ascii=False))
+    publish_serving_bundle(tmp, directory)
+    return manifest
+
+
+def publish_serving_bundle(staged: Path, directory: Path) -> None:
+    """Move the bundle written to `staged` over `directory` by renames, without an rmtree in between."""
+    old = directory.with_name(f".{directory.name}.old")
+    if old.exists():
+        shutil.rmtree(old)
+    if directory.exists():
+        directory.rename(old)
+    staged.rename(directory)
+    if old.exists():
+        shutil.rmtree(old)
+
+
+@dataclass
+class ServingBundle:
+    manifest: Dict[str, Any]
+    encoder: FeatureEncoder
+    model: Any
+    lookup: SlotLookup
+
+    @property
+    def threshold(self) -> float:
+        return float(self.manifest["threshold"])
+
+    @property
+    def input_format(self) -> str:
+        return self.manifest["input_format"]
+
+
+def load_serving_bundle(directory: Path) -> ServingBundle:
+    manifest = json.loads((directory / MANIFEST).read_text())
+    if manifest.get("format_version") != SERVING_FORMAT_VERSION:
+        raise ValueError(f"{directory} has serving format {manifest.get('format_version')}, expected {SERVING_FORMAT_VERSION}")
+    return ServingBundle(
+        manifest=manifest,
+        encoder=_load_encoder(manifest, directory / ENCODER_FILE),
+        model=MODEL_KINDS[manifest["model_kind"]].load(directory / manifest["model_file"]),
+        lookup=SlotLookup.from_frame(pd.read_parquet(directory / LOOKUPS_FILE)),
+    )
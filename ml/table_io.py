@@ -0,0 +1,227 @@
+"""
+Hive-partitioned parquet storage for the train table.
+
+`03_build_train_table.py --partitioned` writes
+
+    <root>/airport_code=ICN/year_month=2025-10/part-0.parquet
+    <root>/_common_metadata
+
+Rows are sorted by (flight_date, hour) inside each partition and written in
+bounded row groups with column statistics, so a date filter skips row groups
+as well as partitions. `_common_metadata` keeps the full table schema, which
+restores the original column order and pandas dtypes on read.
+
+`read_table` accepts either that directory or a single parquet file and pushes
+airport/date/column filters down to pyarrow. `read_feature_dataset` reads the
+partitioned `features_congestion` dataset of `02_feature_build.py --incremental`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITION_COLUMNS = ["airport_code", "year_month"]
+PARTITIONING = ds.partitioning(
+    pa.schema([("airport_code", pa.string()), ("year_month", pa.string())]),
+    flavor="hive",
+)
+COMMON_METADATA = "_common_metadata"
+# Rows per row group: large enough for efficient scans, small enough that a
+# date filter can skip most of a busy airport-month.
+ROW_GROUP_SIZE = 128 * 1024
+MIN_ROW_GROUP_SIZE = 16 * 1024
+SORT_COLUMNS = ["flight_date", "hour"]
+# Per-day summary kept next to the partitions of the features_congestion dataset.
+FEATURE_DAYS = "_days.parquet"
+
+DateLike = Union[str, date, pd.Timestamp]
+
+
+def year_month(flight_date: pd.Series) -> np.ndarray:
+    """`YYYY-MM` partition value for each date."""
+    return flight_date.to_numpy(dtype="datetime64[M]").astype(str)
+
+
+def _with_partition_column(df: pd.DataFrame) -> pa.Table:
+    df = df.assign(year_month=year_month(df["flight_date"]))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_partitioned_table(
+    frames: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    root: Path,
+    schema: Optional[pa.Schema] = None,
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> None:
+    """Write flights (one frame or a stream of frames) as a hive-partitioned dataset.
+
+    The dataset is built in a sibling directory and swapped in with two
+    renames, so stale partitions disappear and a reader sees the old table,
+    the new one or, between the renames, no table, but never a half-written
+    one. `schema` pins the arrow types of a stream (the year_month column is
+    added here). A single frame is sorted by `SORT_COLUMNS` first; a stream
+    is written in arrival order and each partition file is sorted afterwards,
+    which holds one airport-month in memory at a time.
+    """
+    streamed = not isinstance(frames, pd.DataFrame)
+    if not streamed:
+        frames = [frames.sort_values(SORT_COLUMNS, kind="stable", ignore_index=True)]
+    tables = (_with_partition_column(df) for df in frames if not df.empty)
+    first = next(tables, None)
+    if first is None:
+        raise ValueError(f"No rows to write to {root}")
+    if schema is None:
+        schema = first.schema.remove(first.schema.get_field_index("year_month"))
+    full_schema = schema.append(pa.field("year_month", pa.string()))
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        for table in itertools.chain([first], tables):
+            yield from table.select(full_schema.names).cast(full_schema).to_batches()
+
+    tmp = root.with_name(f".{root.name}.tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    file_format = ds.ParquetFileFormat()
+    ds.write_dataset(
+        batches(),
+        tmp,
+        schema=full_schema,
+        format=file_format,
+        file_options=file_format.make_write_options(write_statistics=True),
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=min(MIN_ROW_GROUP_SIZE, row_group_size),
+        max_partitions=4096,
+        # Single-threaded so rows keep their sorted order within a partition.
+        use_threads=False,
+    )
+    if streamed:
+        for path in sorted(tmp.rglob("*.parquet")):
+            _sort_file(path, row_group_size)
+    pq.write_metadata(schema, tmp / COMMON_METADATA)
+    old = root.with_name(f".{root.name}.old")
+    if old.exists():
+        shutil.rmtree(old) if old.is_dir() else old.unlink()
+    if root.exists():
+        root.rename(old)
+    tmp.rename(root)
+    if old.exists():
+        shutil.rmtree(old) if old.is_dir() else old.unlink()
+
+
+def _sort_file(path: Path, row_group_size: int) -> None:
+    """Rewrite a partition file sorted by `SORT_COLUMNS` unless it already is."""
+    # ParquetFile, not read_table: the latter would add the hive columns of the path.
+    parquet = pq.ParquetFile(path)
+    keys = parquet.read(columns=SORT_COLUMNS).to_pandas()
+    if keys.set_index(SORT_COLUMNS).index.is_monotonic_increasing:
+        return
+    table = parquet.read()
+    table = table.take(pc.sort_indices(table, sort_keys=[(col, "ascending") for col in SORT_COLUMNS]))
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, write_statistics=True)
+    tmp_path.replace(path)
+
+
+def table_schema(path: Path) -> pa.Schema:
+    """Schema of a train table file or partitioned dataset (without `year_month`)."""
+    if path.is_dir():
+        return pq.read_schema(path / COMMON_METADATA)
+    return pq.read_schema(path)
+
+
+def table_digest(path: Path) -> str:
+    """SHA-256 of a train table file, or of every file in a partitioned dataset."""
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    digest = hashlib.sha256()
+    for file in files:
+        if path.is_dir():
+            digest.update(f"{file.relative_to(path)}\0".encode())
+        with file.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _to_timestamp(value: DateLike) -> pd.Timestamp:
+    return pd.Timestamp(value).normalize()
+
+
+def read_table(
+    path: Path,
+    columns: Optional[Sequence[str]] = None,
+    airports: Optional[Sequence[str]] = None,
+    start_date: Optional[DateLike] = None,
+    end_date: Optional[DateLike] = None,
+) -> pd.DataFrame:
+    """Read the train table, letting pyarrow skip what the filters rule out.
+
+    `start_date`/`end_date` are inclusive days. On a partitioned dataset the
+    airport and month filters prune whole directories and the date filter
+    prunes row groups through their statistics; on a single file only the row
+    group pruning applies.
+    """
+    path = Path(path)
+    schema = table_schema(path)
+    if path.is_dir():
+        dataset = ds.dataset(
+            path,
+            format="parquet",
+            partitioning=PARTITIONING,
+            schema=schema.append(pa.field("year_month", pa.string())),
+        )
+    else:
+        dataset = ds.dataset(path, format="parquet", schema=schema)
+
+    filters: List[ds.Expression] = []
+    if airports:
+        filters.append(ds.field("airport_code").isin([code.upper() for code in airports]))
+    date_type = schema.field("flight_date").type
+    if start_date is not None:
+        start = _to_timestamp(start_date)
+        filters.append(ds.field("flight_date") >= pa.scalar(start, type=date_type))
+        if path.is_dir():
+            filters.append(ds.field("year_month") >= start.strftime("%Y-%m"))
+    if end_date is not None:
+        end = _to_timestamp(end_date)
+        filters.append(ds.field("flight_date") < pa.scalar(end + pd.Timedelta(days=1), type=date_type))
+        if path.is_dir():
+            filters.append(ds.field("year_month") <= end.strftime("%Y-%m"))
+
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+    table = dataset.to_table(columns=list(columns) if columns else schema.names, filter=expression)
+    return table.replace_schema_metadata(schema.metadata).to_pandas()
+
+
+def read_feature_dataset(root: Path) -> pd.DataFrame:
+    """Read a partitioned `features_congestion` dataset as one frame.
+
+    `airport_daily_avg_flights` spans the whole history, so it is not stored in
+    the partitions; it is derived here from `FEATURE_DAYS` and placed after
+    `daily_flights`, in the column order of the single-file output.
+    """
+    df = pd.read_parquet(root)
+    df["airport_code"] = df["airport_code"].astype(str)
+    df = df.drop(columns=["year_month"])
+    days = pd.read_parquet(Path(root) / FEATURE_DAYS)
+    days = days[days["daily_flights"] > 0]
+    daily_avg = days.groupby("airport_code")["daily_flights"].mean()
+    df.insert(df.columns.get_loc("daily_flights") + 1, "airport_daily_avg_flights", df["airport_code"].map(daily_avg))
+    df.insert(0, "airport_code", df.pop("airport_code"))
+    return df.sort_values(["airport_code", "flight_date", "hour"], ignore_index=True)
@@ -0,0 +1,154 @@
+"""
+Benchmarks the partitioned clean store (`ml/api_store.py`) against the previous
+layout of one parquet file per fetch.
+
+Polling is simulated for one source: `--polls-per-day` fetches per day over
+`--days` days, each returning that day's `--records` flights, with a
+`--change-rate` share changing status since the previous poll. Every fetch is
+written both ways. A one-day query then runs against the flat files (list,
+read every file, filter, keep each key's latest fetch), against the store as
+appended, and against the store after `compact`. All three answers must match.
+
+Example:
+    python scripts/bench_api_store.py --days 14 --polls-per-day 48
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml"))
+from api_store import (  # noqa: E402
+    EVENT_COLUMN,
+    KEY_COLUMN,
+    append_records,
+    compact,
+    latest_records,
+    prepare_records,
+    read_records,
+)
+
+SOURCE = "molit_domestic"
+PRIMARY_KEY = ["vihicleId", "depPlandTime"]
+EVENT_TIME = {"fields": ["depPlandTime"], "format": "%Y%m%d%H%M"}
+STATUSES = ["SCHEDULED", "BOARDING", "DEPARTED", "DELAYED", "CANCELLED"]
+
+
+def poll_records(day: pd.Timestamp, statuses: np.ndarray) -> List[Dict[str, str]]:
+    minutes = np.arange(len(statuses)) * (24 * 60) // len(statuses)
+    return [
+        {
+            "vihicleId": f"KE{i:05d}",
+            "depPlandTime": f"{day:%Y%m%d}{m // 60:02d}{m % 60:02d}",
+            "airlineNm": "대한항공",
+            "depAirportNm": "김포",
+            "arrAirportNm": "제주",
+            "status": STATUSES[s],
+        }
+        for i, (m, s) in enumerate(zip(minutes, statuses))
+    ]
+
+
+def dir_stats(root: Path) -> Dict[str, float]:
+    files = [p for p in root.rglob("*.parquet")]
+    return {"files": len(files), "mb": round(sum(p.stat().st_size for p in files) / (1024 * 1024), 2)}
+
+
+def read_flat(flat_dir: Path, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    frames = [pd.read_parquet(path) for path in sorted(flat_dir.glob("*.parquet"))]
+    df = pd.concat(frames, ignore_index=True)
+    df = df[(df[EVENT_COLUMN] >= start) & (df[EVENT_COLUMN] < end)]
+    return latest_records(df)
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, round(best, 4)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark flat per-fetch files vs the partitioned clean store.")
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--polls-per-day", type=int, default=48)
+    parser.add_argument("--records", type=int, default=500, help="Flights per day.")
+    parser.add_argument("--change-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    first_day = pd.Timestamp("2025-12-01")
+    results: Dict[str, object] = {"days": args.days, "polls": args.days * args.polls_per_day, "records_per_day": args.records}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flat_dir, store = Path(tmp) / "flat", Path(tmp) / "store"
+        flat_dir.mkdir()
+        flat_s = store_s = 0.0
+        for d in range(args.days):
+            day = first_day + pd.Timedelta(days=d)
+            statuses = np.zeros(args.records, dtype=int)
+            for poll in range(args.polls_per_day):
+                changed = rng.random(args.records) < args.change_rate
+                statuses[changed] = rng.integers(0, len(STATUSES), changed.sum())
+                # The poll happens during `day`; fetched_at is UTC, 9 hours behind.
+                fetched = day + pd.Timedelta(minutes=poll * 24 * 60 // args.polls_per_day) - pd.Timedelta(hours=9)
+                fetched_at = f"{fetched:%Y%m%dT%H%M%SZ}"
+                frame = prepare_records(poll_records(day, statuses), fetched_at, PRIMARY_KEY, EVENT_TIME)
+
+                start = time.perf_counter()
+                frame.to_parquet(flat_dir / f"{fetched_at}.parquet", index=False)
+                flat_s += time.perf_counter() - start
+                start = time.perf_counter()
+                append_records(store, SOURCE, frame)
+                store_s += time.perf_counter() - start
+
+        results["write_s"] = {"flat": round(flat_s, 2), "store_append": round(store_s, 2)}
+        query_day = first_day + pd.Timedelta(days=args.days // 2)
+        start, end = query_day + pd.Timedelta(hours=6), query_day + pd.Timedelta(hours=18)
+
+        expected, flat_query_s = timed(lambda: read_flat(flat_dir, start, end), repeat=1)
+        appended, appended_query_s = timed(lambda: read_records(store, SOURCE, start, end))
+        results["flat"] = {**dir_stats(flat_dir), "query_s": flat_query_s}
+        results["store_appended"] = {**dir_stats(store), "query_s": appended_query_s}
+
+        compact_start = time.perf_counter()
+        compacted = compact(store, [SOURCE], min_files=2)
+        results["compact_s"] = round(time.perf_counter() - compact_start, 2)
+        after, compacted_query_s = timed(lambda: read_records(store, SOURCE, start, end))
+        results["store_compacted"] = {
+            **dir_stats(store),
+            "query_s": compacted_query_s,
+            "rows": int(sum(row["rows_out"] for row in compacted)),
+            "rows_before": int(sum(row["rows_in"] for row in compacted)),
+        }
+
+        columns = list(expected.columns)
+        for name, got in (("appended", appended), ("compacted", after)):
+            if not got[columns].sort_values(KEY_COLUMN, ignore_index=True).equals(expected.sort_values(KEY_COLUMN, ignore_index=True)):
+                raise SystemExit(f"store ({name}) answer differs from the flat files")
+        results["query_rows"] = len(expected)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmarks `build_flight_features` aggregation in `ml/pipelines/02_feature_build.py`
+against the previous groupby/merge implementation on synthetic flights.
+
+Example:
+    python scripts/bench_feature_build.py --groups 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FEATURE_BUILD_PATH = ROOT_DIR / "ml" / "pipelines" / "02_feature_build.py"
+AIRPORTS = ["인천", "김포", "김해", "제주", "대구", "광주", "청주", "무안"]
+
+
+def load_feature_build() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("feature_build", FEATURE_BUILD_PATH)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_flights(groups: int, flights_per_group: int, seed: int) -> pd.DataFrame:
+    """Flights spread over `groups` (airport, date, hour) keys."""
+    rng = np.random.default_rng(seed)
+    airports = AIRPORTS[: max(1, min(len(AIRPORTS), groups // 24))]
+    days = max(1, groups // (24 * len(airports)))
+    n = groups * flights_per_group
+    group_idx = rng.integers(0, len(airports) * days * 24, size=n)
+    airport = np.array(airports, dtype=object)[group_idx // (days * 24)]
+    day = (group_idx // 24) % days
+    hour = group_idx % 24
+    labels = pd.array(rng.integers(0, 2, size=n), dtype="Int64")
+    labels[rng.random(n) < 0.05] = pd.NA
+    return pd.DataFrame(
+        {
+            "airport_name": airport,
+            "flight_number": [f"KE{i % 9000:04d}" for i in range(n)],
+            "flight_date": pd.Timestamp("2020-01-01") + pd.to_timedelta(day, unit="D"),
+            "scheduled_time": pd.array(hour * 100 + rng.integers(0, 60, size=n), dtype="Int64"),
+            "special_status": None,
+            "delay_label": labels,
+        }
+    )
+
+
+def legacy_aggregate(flights: pd.DataFrame) -> pd.DataFrame:
+    """The groupby/merge implementation replaced by `aggregate_flight_features`."""
+    daily_counts = flights.groupby(["airport_code", "flight_date"]).size().reset_index(name="daily_flights")
+    airport_daily_avg = (
+        daily_counts.groupby("airport_code")["daily_flights"].mean().reset_index(name="airport_daily_avg_flights")
+    )
+    hourly_stats = (
+        flights.groupby(["airport_code", "flight_date", "hour"])
+        .agg(
+            airport_hour_flights=("flight_number", "count"),
+            delay_rate=("delay_label", lambda x: x.dropna().mean()),
+        )
+        .reset_index()
+    )
+    hourly_stats["delay_rate"] = hourly_stats["delay_rate"].fillna(0.0)
+    hourly_stats = hourly_stats.merge(daily_counts, on=["airport_code", "flight_date"], how="left")
+    hourly_stats = hourly_stats.merge(airport_daily_avg, on="airport_code", how="left")
+    hourly_stats = hourly_stats.sort_values(["airport_code", "flight_date", "hour"])
+    hourly_stats["previous_hour_delay_rate"] = (
+        hourly_stats.groupby(["airport_code", "flight_date"])["delay_rate"].shift(1)
+    )
+    daily_delay = (
+        flights.groupby(["airport_code", "flight_date"])["delay_label"].mean().reset_index(name="daily_delay_rate")
+    )
+    daily_delay["prev_day_delay_rate"] = (
+        daily_delay.sort_values(["airport_code", "flight_date"]).groupby("airport_code")["daily_delay_rate"].shift(1)
+    )
+    hourly_stats = hourly_stats.merge(
+        daily_delay[["airport_code", "flight_date", "prev_day_delay_rate"]],
+        on=["airport_code", "flight_date"],
+        how="left",
+    )
+    hourly_stats["hourly_congestion_ratio"] = hourly_stats["airport_hour_flights"] / (
+        hourly_stats["daily_flights"] / 24.0
+    )
+    airport_names = flights[["airport_code", "airport_name_ko"]].drop_duplicates(subset="airport_code")
+    return hourly_stats.merge(airport_names, on="airport_code", how="left")
+
+
+def best_of(fn: Callable[[], pd.DataFrame], repeats: int) -> tuple[float, pd.DataFrame]:
+    best = float("inf")
+    result = pd.DataFrame()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark flight feature aggregation.")
+    parser.add_argument("--groups", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--flights-per-group", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the current implementation.")
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    feature_build = load_feature_build()
+    results: List[Dict[str, object]] = []
+    for groups in args.groups:
+        flights = feature_build.prepare_flights(synthetic_flights(groups, args.flights_per_group, args.seed))
+        current_s, current = best_of(lambda: feature_build.aggregate_flight_features(flights), args.repeats)
+        row: Dict[str, object] = {
+            "groups": int(len(current)),
+            "flights": int(len(flights)),
+            "current_s": round(current_s, 4),
+        }
+        if not args.skip_legacy:
+            legacy_s, legacy = best_of(lambda: legacy_aggregate(flights), args.repeats)
+            cols = ["delay_rate", "previous_hour_delay_rate", "prev_day_delay_rate", "hourly_congestion_ratio"]
+            np.testing.assert_allclose(
+                current[cols].to_numpy(dtype="float64"),
+                legacy[cols].to_numpy(dtype="float64"),
+                equal_nan=True,
+            )
+            row["legacy_s"] = round(legacy_s, 4)
+            row["speedup"] = round(legacy_s / current_s, 1) if current_s else None
+        results.append(row)
+        print(json.dumps(row))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Benchmarks `run_ingestion.py` against a local stand-in for the public APIs.
+
+A threaded HTTP/1.1 server on 127.0.0.1 answers every source after
+`--latency-ms` with `--total-count` records in the `response/body/items/item`
+shape. It pages by `pageNo`/`numOfRows`, reports `totalCount`, speaks XML or
+JSON (`--format`), and fails a `--fail-rate` share of requests with 503. Each
+source is routed to one of two fake hosts, mirroring the real split
+(openapi.airport.co.kr vs apis.data.go.kr).
+
+Ingestion runs once sequentially (one source and one page at a time) and once
+concurrently. Each run checks that every source's clean store holds exactly
+the expected records, without duplicates. It also reports the
+connections the server accepted and the request rate each host saw.
+
+`--polls` more concurrent runs then re-fetch the unchanged data. The
+content-addressed raw store is compared against the previous layout, one
+pretty-printed JSON file per response, in bytes on disk and in time to read
+every recorded poll back.
+
+Example:
+    python scripts/bench_ingestion.py --latency-ms 200 --total-count 1000 --fail-rate 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import xmltodict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml"))
+import run_ingestion  # noqa: E402
+from api_store import read_records  # noqa: E402
+
+# Source → fake host; "localhost" and "127.0.0.1" get separate connection pools.
+SOURCE_HOSTS = {
+    "kac_status": "localhost",
+    "molit_domestic": "127.0.0.1",
+    "icn_passenger": "127.0.0.1",
+    "icn_arrivals": "127.0.0.1",
+}
+# Page size the stand-in uses when the request has no numOfRows.
+DEFAULT_ROWS = 100
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_s = 0.0
+    total_count = 0
+    fail_rate = 0.0
+    fmt = "xml"
+    # Bumped to change every tenth record's status, e.g. by a daemon bench's fake clock.
+    revision = 0
+    # (path, query params) of every request.
+    queries: List[Tuple[str, Dict[str, str]]] = []
+    connections = 0
+    # Host → request arrival times.
+    arrivals: Dict[str, List[float]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def setup(self) -> None:
+        super().setup()
+        with self.lock:
+            type(self).connections += 1
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        with self.lock:
+            self.arrivals[self.headers.get("Host", "").split(":")[0]].append(time.monotonic())
+        time.sleep(self.latency_s)
+        if random.random() < self.fail_rate:
+            self.reply(503, b"busy", "text/plain")
+            return
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        with self.lock:
+            self.queries.append((url.path.strip("/"), {k: v[0] for k, v in params.items()}))
+        rows = int(params.get("numOfRows", [DEFAULT_ROWS])[0])
+        page = int(params.get("pageNo", ["1"])[0])
+        seqs = range((page - 1) * rows, min(self.total_count, page * rows))
+        today = time.strftime("%Y%m%d")
+        # Carries every source's primary key and event time fields.
+        items = [
+            {
+                "airFln": f"KE{seq:05d}",
+                "std": f"{seq // 60 % 24:02d}{seq % 60:02d}",
+                "vihicleId": f"KE{seq:05d}",
+                "depPlandTime": f"{today}{seq // 60 % 24:02d}{seq % 60:02d}",
+                "flightId": f"KE{seq:05d}",
+                "scheduleDateTime": f"{today}{seq // 60 % 24:02d}{seq % 60:02d}",
+                "adate": today,
+                "atime": str(seq),
+                "seq": seq,
+                "status": f"R{self.revision if seq % 10 == 0 else 0}",
+            }
+            for seq in seqs
+        ]
+        doc = {"response": {"body": {"items": {"item": items}, "numOfRows": rows, "pageNo": page, "totalCount": self.total_count}}}
+        if self.fmt == "json":
+            self.reply(200, json.dumps(doc).encode("utf-8"), "application/json")
+        else:
+            self.reply(200, xmltodict.unparse(doc).encode("utf-8"), "application/xml")
+
+    def reply(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def expected_seqs(spec: Dict[str, Any], total: int, max_records: Optional[int]) -> List[int]:
+    """Records a source should end up with: every page when it pages, else the first."""
+    wanted = total if "pageNo" in spec["params"] else min(total, DEFAULT_ROWS)
+    return list(range(min(wanted, max_records) if max_records else wanted))
+
+
+def check_clean_tables(summary: List[Dict[str, Any]], specs: Dict[str, Dict[str, Any]], args: argparse.Namespace) -> None:
+    for row in summary:
+        source = row["source"]
+        if row["status"] != "ok":
+            raise SystemExit(f"{source}: {row}")
+        # Every poll re-fetches the same records, so the upserted store holds one copy.
+        seqs = sorted(read_records(run_ingestion.CLEAN_DIR, source, columns=["seq"])["seq"].astype(int))
+        if seqs != expected_seqs(specs[source], args.total_count, args.max_records):
+            raise SystemExit(f"{source}: clean store holds {len(seqs)} records, not the expected ones")
+
+
+def peak_rate(times: List[float]) -> int:
+    """Most requests that arrived within any one-second window."""
+    times = sorted(times)
+    return max(sum(1 for other in times[i:] if other < t + 1) for i, t in enumerate(times))
+
+
+def raw_storage_report(sources: List[str], tmp: Path) -> Dict[str, object]:
+    """Content-addressed raw store vs one pretty-printed file per recorded response."""
+    stored_bytes = sum(path.stat().st_size for path in run_ingestion.RAW_DIR.rglob("*") if path.is_file())
+    start = time.perf_counter()
+    payloads = [payload for source in sources for _, payload in run_ingestion.iter_raw(source)]
+    read_s = time.perf_counter() - start
+
+    legacy_dir = tmp / "legacy_raw"
+    legacy_dir.mkdir()
+    for i, payload in enumerate(payloads):
+        with (legacy_dir / f"{i:06d}.json").open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    legacy_bytes = sum(path.stat().st_size for path in legacy_dir.iterdir())
+    start = time.perf_counter()
+    for path in sorted(legacy_dir.iterdir()):
+        with path.open(encoding="utf-8") as f:
+            json.load(f)
+    legacy_read_s = time.perf_counter() - start
+    return {
+        "responses": len(payloads),
+        "objects": sum(1 for _ in run_ingestion.RAW_DIR.glob(f"*/{run_ingestion.RAW_OBJECTS}/*/*.json.gz")),
+        "stored_mb": round(stored_bytes / (1024 * 1024), 3),
+        "legacy_mb": round(legacy_bytes / (1024 * 1024), 3),
+        "read_s": round(read_s, 3),
+        "legacy_read_s": round(legacy_read_s, 3),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent paged API ingestion.")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Stand-in server delay per request.")
+    parser.add_argument("--total-count", type=int, default=1000, help="Records each source reports.")
+    parser.add_argument("--format", choices=["xml", "json"], default="xml")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="Share of requests answered with 503.")
+    parser.add_argument("--max-records", type=int, default=None)
+    parser.add_argument("--rate-limit", type=float, default=20.0, help="Requests per second per host (0 = unlimited).")
+    parser.add_argument("--retries", type=int, default=6)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    parser.add_argument("--polls", type=int, default=8, help="Extra polls of unchanged data for the raw storage comparison.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    random.seed(args.seed)
+    StandInHandler.latency_s = args.latency_ms / 1000
+    StandInHandler.total_count = args.total_count
+    StandInHandler.fail_rate = args.fail_rate
+    StandInHandler.fmt = args.format
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    specs = run_ingestion.build_specs("bench", time.strftime("%Y%m%d"))
+    for source, spec in specs.items():
+        spec["url"] = f"http://{SOURCE_HOSTS[source]}:{port}/{source}"
+        spec["format"] = args.format
+    sources = list(specs)
+
+    results: List[Dict[str, object]] = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # run_ingestion writes under data/external relative to the working directory.
+        os.chdir(tmp)
+        try:
+            for mode, workers, page_workers in (("sequential", 1, 1), ("concurrent", len(sources), run_ingestion.PAGE_WORKERS)):
+                StandInHandler.connections = 0
+                StandInHandler.arrivals.clear()
+                start = time.perf_counter()
+                summary = run_ingestion.ingest(
+                    specs,
+                    sources,
+                    args.max_records,
+                    False,
+                    workers=workers,
+                    page_workers=page_workers,
+                    rate_limit=args.rate_limit or None,
+                    retries=args.retries,
+                    backoff_s=args.backoff,
+                )
+                wall_s = time.perf_counter() - start
+                check_clean_tables(summary, specs, args)
+                row = {
+                    "mode": mode,
+                    "workers": workers,
+                    "page_workers": page_workers,
+                    "wall_s": round(wall_s, 3),
+                    "records": sum(item["records"] for item in summary),
+                    "pages": sum(item["pages"] for item in summary),
+                    "retries": sum(item["retries"] for item in summary),
+                    "connections": StandInHandler.connections,
+                    "peak_requests_per_s": {host: peak_rate(times) for host, times in StandInHandler.arrivals.items()},
+                }
+                results.append(row)
+                print(json.dumps(row))
+
+            for _ in range(args.polls):
+                run_ingestion.ingest(specs, sources, args.max_records, False, rate_limit=args.rate_limit or None, retries=args.retries, backoff_s=args.backoff)
+            row = {"mode": "raw_storage", "polls": args.polls + 2, **raw_storage_report(sources, Path(tmp))}
+            results.append(row)
+            print(json.dumps(row))
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
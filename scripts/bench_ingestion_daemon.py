@@ -0,0 +1,227 @@
+"""
+Runs the ingestion daemon (`scripts/ingestion_daemon.py`) against the local
+stand-in API of `bench_ingestion.py`.
+
+Fake clock run: `--hours` of simulated time starting at `--start` (Korea
+time, so a run can cross midnight). Every `--change-every` simulated seconds
+the stand-in changes every tenth record's status. Each source polls on its
+spec interval. The run reports records fetched vs records written through the
+cursors and checks:
+
+- the clean store holds every record's final status;
+- date parameters follow the fake clock;
+- `from_time` windows resume from the previous poll;
+- the status file's lag and overdue figures are consistent.
+
+Shutdown run: the real daemon CLI runs in a subprocess pointed at the
+stand-in, gets SIGTERM, and must exit cleanly with its status file marked
+stopped and its cursors saved.
+
+Example:
+    python scripts/bench_ingestion_daemon.py --hours 6 --start "2025-12-15 21:00"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml"))
+import run_ingestion  # noqa: E402
+from api_store import EVENT_TZ, FETCHED_COLUMN, read_records  # noqa: E402
+from bench_ingestion import SOURCE_HOSTS, StandInHandler, expected_seqs  # noqa: E402
+from ingestion_daemon import Clock, IngestionDaemon  # noqa: E402
+
+
+class FakeClock(Clock):
+    """Simulated time: sleeping advances it instantly and lets the stand-in data move on."""
+
+    def __init__(self, start: float, change_every_s: float) -> None:
+        self.start = self.t = start
+        self.change_every_s = change_every_s
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, seconds: float, stop: threading.Event) -> None:
+        self.t += max(seconds, 0.0)
+        StandInHandler.revision = int((self.t - self.start) // self.change_every_s)
+
+
+class CountingDaemon(IngestionDaemon):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.totals: Counter = Counter()
+        self.poll_times: Dict[str, List[float]] = {s: [] for s in self.sources}
+        # Stand-in data revision each source saw at its latest poll.
+        self.revisions: Dict[str, int] = {}
+
+    def poll(self, source: str) -> Dict[str, Any]:
+        self.poll_times[source].append(self.clock.now())
+        self.revisions[source] = StandInHandler.revision
+        result = super().poll(source)
+        self.totals["fetched"] += result.get("records", 0)
+        self.totals["written"] += result.get("records_new", 0)
+        return result
+
+
+def start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stand_in_specs(port: int) -> Dict[str, Dict[str, Any]]:
+    specs = run_ingestion.build_specs("bench", "19700101")
+    for source, spec in specs.items():
+        spec["url"] = f"http://{SOURCE_HOSTS[source]}:{port}/{source}"
+    return specs
+
+
+def check_fake_run(daemon: CountingDaemon, clock: FakeClock, args: argparse.Namespace) -> Dict[str, Any]:
+    # Every source is keyed by its fields, so a changed record replaces its previous version.
+    for source in SOURCE_HOSTS:
+        final = f"R{daemon.revisions[source]}"
+        rows = read_records(run_ingestion.CLEAN_DIR, source, columns=["seq", "status"])
+        latest = rows.sort_values(FETCHED_COLUMN, kind="stable").drop_duplicates("seq", keep="last")
+        expected = latest["seq"].astype(int).map(lambda seq: final if seq % 10 == 0 else "R0")
+        seqs = sorted(latest["seq"].astype(int))
+        if seqs != expected_seqs(daemon.specs[source], args.total_count, None) or not (latest["status"] == expected).all():
+            raise SystemExit(f"{source}: clean store does not hold the final status of every record")
+
+    # Date params follow the clock: the last poll asked for the fake day's date.
+    today = pd.Timestamp(clock.now(), unit="s", tz="UTC").tz_convert(EVENT_TZ)
+    last_params = {path: params for path, params in StandInHandler.queries}
+    for source, param in (("kac_status", "schDate"), ("molit_domestic", "depPlandTime")):
+        if last_params[source][param] != f"{today:%Y%m%d}":
+            raise SystemExit(f"{source}: queried {param}={last_params[source][param]}, expected {today:%Y%m%d}")
+    windows = sorted({params["from_time"] for path, params in StandInHandler.queries if path == "icn_arrivals"})
+    if len(windows) < 2:
+        raise SystemExit("icn_arrivals: from_time never moved")
+
+    status = json.loads(daemon.status_path.read_text())
+    for source, row in status["sources"].items():
+        if row["lag_s"] is None or row["lag_s"] > row["interval_s"]:
+            raise SystemExit(f"{source}: lag {row['lag_s']} exceeds its interval")
+    return {
+        "simulated_h": args.hours,
+        "polls": {s: len(times) for s, times in daemon.poll_times.items()},
+        "records_fetched": daemon.totals["fetched"],
+        "records_written": daemon.totals["written"],
+        "written_share": round(daemon.totals["written"] / max(daemon.totals["fetched"], 1), 4),
+        "icn_arrivals_windows": windows[:3] + (["..."] if len(windows) > 3 else []),
+        "lag_s": {s: row["lag_s"] for s, row in status["sources"].items()},
+    }
+
+
+def check_shutdown(port: int, tmp: Path) -> Dict[str, Any]:
+    env = dict(
+        os.environ,
+        API_ENCODING_KEY="bench",
+        **{f"API_{name}_BASE_URL": f"http://{SOURCE_HOSTS[source]}:{port}/{source}" for name, source in (
+            ("KAC", "kac_status"),
+            ("MOLIT", "molit_domestic"),
+            ("ICN_PASSENGER", "icn_passenger"),
+            ("ICN_ARRIVAL", "icn_arrivals"),
+        )},
+    )
+    workdir = tmp / "shutdown"
+    workdir.mkdir()
+    script = Path(__file__).resolve().parent / "ingestion_daemon.py"
+    proc = subprocess.Popen(
+        [sys.executable, str(script), "--interval", "kac_status=1", "--interval", "icn_arrivals=1", "--rate-limit", "0"],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    status_path = workdir / run_ingestion.DATA_ROOT / "ingestion_status.json"
+    deadline = time.monotonic() + 30
+    while not status_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    time.sleep(1.5)
+    sent = time.perf_counter()
+    proc.send_signal(signal.SIGTERM)
+    try:
+        _, stderr = proc.communicate(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        raise SystemExit("daemon did not stop within 30 s of SIGTERM")
+    status = json.loads(status_path.read_text())
+    state = json.loads((workdir / run_ingestion.DATA_ROOT / "ingestion_state.json").read_text())
+    if proc.returncode != 0 or status["state"] != "stopped" or set(state) != set(SOURCE_HOSTS):
+        raise SystemExit(f"unclean shutdown (exit {proc.returncode}, state {status['state']}): {stderr[-500:]}")
+    return {"exit_code": proc.returncode, "stop_s": round(time.perf_counter() - sent, 3), "polls": status["polls"]}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive the ingestion daemon with a fake clock and a stand-in API.")
+    parser.add_argument("--hours", type=float, default=6.0, help="Simulated run length.")
+    parser.add_argument("--start", default="2025-12-15 21:00", help="Simulated start, Korea time.")
+    parser.add_argument("--change-every", type=float, default=1800.0, help="Simulated seconds between data revisions.")
+    parser.add_argument("--total-count", type=int, default=300, help="Records each source reports.")
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    StandInHandler.total_count = args.total_count
+    server = start_server()
+    port = server.server_address[1]
+    start = pd.Timestamp(args.start, tz=EVENT_TZ).timestamp()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # run_ingestion writes under data/external relative to the working directory.
+        os.chdir(tmp)
+        try:
+            clock = FakeClock(start, args.change_every)
+            with run_ingestion.build_session() as session:
+                daemon = CountingDaemon(
+                    stand_in_specs(port),
+                    list(SOURCE_HOSTS),
+                    run_ingestion.ApiClient(session, run_ingestion.RateLimiter(None), retries=2, backoff_s=0.01),
+                    clock=clock,
+                )
+                # Stop once the simulated run is over; polls never sleep past it.
+                original_sleep = clock.sleep
+
+                def sleep(seconds: float, stop: threading.Event) -> None:
+                    original_sleep(seconds, stop)
+                    if clock.now() - start >= args.hours * 3600:
+                        stop.set()
+
+                clock.sleep = sleep  # type: ignore[method-assign]
+                wall = time.perf_counter()
+                daemon.run()
+                results = {"fake_clock": {**check_fake_run(daemon, clock, args), "wall_s": round(time.perf_counter() - wall, 2)}}
+            StandInHandler.queries.clear()
+            results["shutdown"] = check_shutdown(port, Path(tmp))
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
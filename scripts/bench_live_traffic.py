@@ -0,0 +1,198 @@
+"""
+Benchmarks the rolling live traffic counts (`ml/live_traffic.py`) against
+recounting the clean store on every refresh.
+
+`--days` of `kac_status` polling are simulated, one poll every `--poll-min`
+minutes. Each airport of `--airports` has `--flights` flights a day, and the
+schedule for a day is published the evening before. Each poll writes only
+the records that changed, as the daemon's cursors do: a `--change-rate`
+share of today's flights changes status and a few flights move to
+another hour. The store is compacted every `--compact-every` polls. After
+every poll:
+
+- incremental: `LiveTraffic.refresh` applies the new delta files;
+- recount: `read_records` over the window, then a groupby per (airport,
+  day, hour).
+
+Both must agree on every counter after every poll, including across
+midnight evictions and compactions. The report gives the refresh times of
+both paths and the cost of a `slot` lookup.
+
+A last check re-polls the same `icn_arrivals` board: keyed rows must count
+once in their scheduled hours, and rows stored keyless (content hash and
+fetch time, as before the source had a key) must not count at all.
+
+Example:
+    python scripts/bench_live_traffic.py --days 3 --poll-min 5 --flights 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml"))
+from api_store import EVENT_COLUMN, append_records, compact, prepare_records, read_records  # noqa: E402
+from live_traffic import LIVE_SOURCES, LiveTraffic  # noqa: E402
+
+SOURCE = "kac_status"
+PRIMARY_KEY = ["schDate", "airFln"]
+EVENT_TIME = {"fields": ["schDate", "std"], "format": "%Y%m%d%H%M"}
+AIRPORTS = ["GMP", "PUS", "CJU", "TAE", "KWJ", "CJJ", "MWX", "USN"]
+STATUSES = ["SCHEDULED", "BOARDING", "DEPARTED", "DELAYED", "CANCELLED"]
+
+
+class Schedule:
+    """One day's flights of every airport; rows change in place between polls."""
+
+    def __init__(self, day: pd.Timestamp, airports: List[str], flights: int, rng: np.random.Generator) -> None:
+        self.day = day
+        n = len(airports) * flights
+        self.airport = np.repeat(airports, flights)
+        self.flight = np.array([f"{a}{i:04d}" for a in airports for i in range(flights)])
+        self.minute = rng.integers(5 * 60, 24 * 60, n)
+        self.status = np.zeros(n, dtype=int)
+
+    def records(self, rows: np.ndarray) -> List[Dict[str, str]]:
+        return [
+            {
+                "schDate": f"{self.day:%Y%m%d}",
+                "airFln": self.flight[i],
+                "std": f"{self.minute[i] // 60:02d}{self.minute[i] % 60:02d}",
+                "airport": self.airport[i],
+                "rmkKor": STATUSES[self.status[i]],
+            }
+            for i in rows
+        ]
+
+
+def recount(root: Path, first_day: pd.Timestamp) -> Tuple[Dict, Dict]:
+    frame = read_records(root, SOURCE, start=first_day, columns=["airport"])
+    day, hour = frame[EVENT_COLUMN].dt.date, frame[EVENT_COLUMN].dt.hour
+    hours = frame.groupby([frame["airport"], day, hour]).size()
+    days = frame.groupby([frame["airport"], day]).size()
+    return {k: int(v) for k, v in hours.items()}, {k: int(v) for k, v in days.items()}
+
+
+def check_repolls(flights: int = 30) -> Dict[str, object]:
+    """Polls of an unchanged arrivals board, keyed and keyless, must not move the counts."""
+    now = pd.Timestamp("2025-12-15 15:00")
+    feed = LIVE_SOURCES["icn_arrivals"]
+    records = [
+        {"flightId": f"OZ{i:04d}", "scheduleDateTime": f"{now:%Y%m%d}{8 + i % 3:02d}{i % 60:02d}", "remark": "ARRIVED"}
+        for i in range(flights)
+    ]
+    expected = {("ICN", now.date(), 8 + h): sum(1 for i in range(flights) if i % 3 == h) for h in range(3)}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        live = LiveTraffic(root, sources={"icn_arrivals": feed}, refresh_s=0, now=lambda: now)
+        for fetch_hour in (11, 14):
+            fetched_at = f"{now.replace(hour=fetch_hour) - timedelta(hours=9):%Y%m%dT%H%M%SZ}"
+            append_records(root, "icn_arrivals", prepare_records(records, fetched_at, feed["primary_key"], feed["event_time"]))
+            append_records(root, "icn_arrivals", prepare_records(records, fetched_at))
+            live.refresh()
+            if dict(live.hour_counts) != expected or dict(live.day_counts) != {("ICN", now.date()): flights}:
+                raise SystemExit(f"re-polled arrivals counted as {dict(live.hour_counts)}, expected {expected}")
+    return {"flights": flights, "polls": 2, "hours": {h: n for (_, _, h), n in expected.items()}}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark incremental live traffic counts vs recounting the store.")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--poll-min", type=int, default=5)
+    parser.add_argument("--flights", type=int, default=600, help="Flights per airport and day.")
+    parser.add_argument("--airports", type=int, default=len(AIRPORTS))
+    parser.add_argument("--change-rate", type=float, default=0.02, help="Share of today's flights changing per poll.")
+    parser.add_argument("--compact-every", type=int, default=48, help="Polls between compactions.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    airports = AIRPORTS[: args.airports]
+    clock = {"now": pd.Timestamp("2025-12-15 00:00")}
+    polls_per_day = 24 * 60 // args.poll_min
+    incremental_ms: List[float] = []
+    recount_ms: List[float] = []
+    applied: List[int] = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        feed = {"airport_field": "airport", "primary_key": PRIMARY_KEY, "event_time": EVENT_TIME}
+        live = LiveTraffic(root, sources={SOURCE: feed}, refresh_s=0, now=lambda: clock["now"])
+        schedules: Dict[pd.Timestamp, Schedule] = {}
+        for poll in range(args.days * polls_per_day):
+            now = pd.Timestamp("2025-12-15") + timedelta(minutes=poll * args.poll_min)
+            clock["now"] = now
+            today = now.normalize()
+            fetched_at = f"{now - timedelta(hours=9):%Y%m%dT%H%M%SZ}"
+            batches = []
+            if today in schedules:
+                schedule = schedules[today]
+                changed = np.flatnonzero(rng.random(len(schedule.status)) < args.change_rate)
+                schedule.status[changed] = rng.integers(0, len(STATUSES), len(changed))
+                # Delays push a tenth of the changed flights into another hour.
+                moved = changed[: max(1, len(changed) // 10)]
+                schedule.minute[moved] = np.minimum(schedule.minute[moved] + 60, 24 * 60 - 1)
+                batches.append(schedule.records(changed))
+            for day in (today, today + timedelta(days=1)):
+                if day not in schedules and (day == today or now.hour >= 18):
+                    # A new day's schedule arrives in full.
+                    schedules[day] = Schedule(day, airports, args.flights, rng)
+                    batches.append(schedules[day].records(np.arange(len(schedules[day].flight))))
+            for records in batches:
+                append_records(root, SOURCE, prepare_records(records, fetched_at, PRIMARY_KEY, EVENT_TIME))
+            if args.compact_every and poll % args.compact_every == args.compact_every - 1:
+                compact(root, [SOURCE], min_files=2)
+
+            start = time.perf_counter()
+            applied.append(live.refresh())
+            incremental_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            hours, days = recount(root, today - timedelta(days=live.window_days - 1))
+            recount_ms.append((time.perf_counter() - start) * 1000)
+            if dict(live.hour_counts) != hours or dict(live.day_counts) != days:
+                raise SystemExit(f"poll {poll} ({now}): live counts differ from a recount of the store")
+
+        # Lookups between refreshes, as in the API.
+        live.refresh_s = 60.0
+        lookups = [(a, h) for a in airports for h in range(24)] * 50
+        weekday = clock["now"].weekday()
+        start = time.perf_counter()
+        hits = sum(live.slot(a, h, weekday) is not None for a, h in lookups)
+        slot_us = (time.perf_counter() - start) / len(lookups) * 1e6
+
+    def stats(values: List[float]) -> Dict[str, float]:
+        return {"mean": round(statistics.fmean(values), 3), "p95": round(float(np.percentile(values, 95)), 3), "max": round(max(values), 3)}
+
+    results = {
+        "polls": len(applied),
+        "records_applied": {"total": sum(applied), "mean_per_poll": round(statistics.fmean(applied), 1)},
+        "refresh_ms": {"incremental": stats(incremental_ms), "recount": stats(recount_ms)},
+        "slot_lookup_us": round(slot_us, 2),
+        "slot_hits": f"{hits}/{len(lookups)}",
+        "tracked_records": len(live.records),
+        "window_days": sorted({day.isoformat() for _, day in live.day_counts}),
+        "repolled_arrivals": check_repolls(),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Benchmarks the API's live update stream (`/api/v1/stream`) against
+dashboards polling the stats endpoints.
+
+The API runs under uvicorn in a subprocess on a copy of the train table and
+model, with an empty clean store as its live feed. Both runs last
+`--duration` seconds with `--clients` dashboards on one airport:
+
+- stream: every client holds one SSE connection. Every `--change-every`
+  seconds a batch of `icn_arrivals` records is appended to the clean store.
+  Halfway through, the train table is rewritten without its last day and the
+  model file is touched. Every client must receive every `traffic`, `stats`
+  and `model` event. Reported: delivery delay from the change to each
+  client's receipt, and bytes per client.
+- polling: every client refetches the dashboard's three stats endpoints
+  every `--poll-s` seconds, as the dashboard would have to. Reported:
+  requests, bytes and response times.
+
+Example:
+    python scripts/bench_live_updates.py --clients 200 --duration 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ml"))
+from api_store import EVENT_TZ, append_records, prepare_records  # noqa: E402
+from live_traffic import LIVE_SOURCES  # noqa: E402
+
+AIRPORT = "ICN"
+STATS_PATHS = ["/api/v1/stats/airport", "/api/v1/stats/hourly", "/api/v1/stats/timeseries"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(tmp: Path, port: int, poll_s: float) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        TRAIN_TABLE_PATH=str(tmp / "train_table.parquet"),
+        MODEL_DIR=str(tmp / "models"),
+        SERVING_DIR=str(tmp / "serving"),
+        MODEL_SELECTION_PATH=str(tmp / "model_selection.json"),
+        LIVE_CLEAN_DIR=str(tmp / "api_clean"),
+        LIVE_REFRESH_S="0",
+        STREAM_POLL_S=str(poll_s),
+        LOG_LEVEL="WARNING",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", "backend", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("API did not start")
+
+
+def append_arrivals(root: Path, batch: int, size: int) -> None:
+    now = pd.Timestamp.now(tz=EVENT_TZ)
+    fetched_at = f"{now.tz_convert('UTC'):%Y%m%dT%H%M%SZ}"
+    records = [
+        {"flightId": f"B{batch:03d}-{i:03d}", "scheduleDateTime": f"{now:%Y%m%d}{i % 24:02d}00", "gate": str(i % 40)}
+        for i in range(size)
+    ]
+    feed = LIVE_SOURCES["icn_arrivals"]
+    append_records(root, "icn_arrivals", prepare_records(records, fetched_at, feed["primary_key"], feed["event_time"]))
+
+
+async def sse_client(
+    client: httpx.AsyncClient,
+    url: str,
+    received: List[Tuple[str, int, float]],
+    stats: Dict[str, Any],
+    ready: asyncio.Event,
+    stop: asyncio.Event,
+) -> None:
+    async with client.stream("GET", url, params={"airport": AIRPORT}) as response:
+        event, event_id = None, 0
+        async for line in response.aiter_lines():
+            stats["bytes"] += len(line) + 1
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("id: "):
+                event_id = int(line[len("id: "):])
+            elif line.startswith("data: ") and event:
+                if event == "hello":
+                    ready.set()
+                else:
+                    received.append((event, event_id, time.perf_counter()))
+                    if event == "stats":
+                        stats["stats"] = json.loads(line[len("data: "):])
+            if stop.is_set():
+                break
+
+
+async def run_stream(base: str, tmp: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    stop = asyncio.Event()
+    received: List[List[Tuple[str, int, float]]] = [[] for _ in range(args.clients)]
+    stats: List[Dict[str, Any]] = [{"bytes": 0} for _ in range(args.clients)]
+    ready = [asyncio.Event() for _ in range(args.clients)]
+    limits = httpx.Limits(max_connections=args.clients + 10)
+    async with httpx.AsyncClient(base_url=base, timeout=None, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(sse_client(client, "/api/v1/stream", received[i], stats[i], ready[i], stop))
+            for i in range(args.clients)
+        ]
+        await asyncio.wait_for(asyncio.gather(*(r.wait() for r in ready)), 60)
+        # The watcher's first pass reports every slot once; let it settle.
+        await asyncio.sleep(2 * args.stream_poll_s + 1)
+        settled = [len(r) for r in received]
+
+        changes: List[Tuple[str, float]] = []
+        start = time.perf_counter()
+        batch = 0
+        halfway_done = False
+        while time.perf_counter() - start < args.duration:
+            changes.append(("traffic", time.perf_counter()))
+            await asyncio.to_thread(append_arrivals, tmp / "api_clean", batch, args.batch_size)
+            batch += 1
+            if not halfway_done and time.perf_counter() - start >= args.duration / 2:
+                table = pd.read_parquet(tmp / "train_table.parquet")
+                table = table[table["flight_date"] < table["flight_date"].max()]
+                changes.append(("stats", time.perf_counter()))
+                await asyncio.to_thread(table.to_parquet, tmp / "train_table.parquet", index=False)
+                changes.append(("model", time.perf_counter()))
+                os.utime(tmp / "models" / f"{args.model}.joblib")
+                halfway_done = True
+            await asyncio.sleep(args.change_every)
+        await asyncio.sleep(2 * args.stream_poll_s + 5)
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Delay of each event: from the latest change of its kind before the event's first receipt.
+    first_seen: Dict[int, Tuple[str, float]] = {}
+    for rows, n in zip(received, settled):
+        for event, event_id, at in rows[n:]:
+            if event_id not in first_seen or at < first_seen[event_id][1]:
+                first_seen[event_id] = (event, at)
+    delays: Dict[str, List[float]] = defaultdict(list)
+    for rows, n in zip(received, settled):
+        for event, event_id, at in rows[n:]:
+            cause = max((t for kind, t in changes if kind == event and t <= first_seen[event_id][1]), default=None)
+            if cause is not None:
+                delays[event].append(at - cause)
+    ids = [sorted({event_id for _, event_id, _ in rows[n:]}) for rows, n in zip(received, settled)]
+    if any(i != ids[0] for i in ids):
+        raise SystemExit("clients received different events")
+    kinds = {event for rows in received for event, _, _ in rows}
+    for kind in ("traffic", "stats", "model"):
+        if kind not in kinds:
+            raise SystemExit(f"no {kind} event was delivered")
+    # The rewritten table lost its last day: the delta removes it and moves `to_date`.
+    dropped = stats[0]["stats"]
+    if len(dropped.get("timeseries_removed", [])) != 1 or "to_date" not in dropped.get("airport_stats", {}):
+        raise SystemExit(f"unexpected stats delta: {json.dumps(dropped)[:300]}")
+    return {
+        "clients": args.clients,
+        "changes": {kind: sum(1 for k, _ in changes if k == kind) for kind in ("traffic", "stats", "model")},
+        "events_per_client": {kind: sum(1 for e, _, _ in received[0][settled[0]:] if e == kind) for kind in sorted(kinds)},
+        "delay_s": {
+            kind: {"p50": round(float(np.percentile(v, 50)), 3), "p95": round(float(np.percentile(v, 95)), 3)}
+            for kind, v in sorted(delays.items())
+        },
+        "kb_per_client": round(statistics.fmean(s["bytes"] for s in stats) / 1024, 1),
+        "stats_delta": {k: len(v) if isinstance(v, list) else v for k, v in dropped.items() if k != "airport"},
+    }
+
+
+async def run_polling(base: str, args: argparse.Namespace) -> Dict[str, Any]:
+    latencies: List[float] = []
+    counters = {"requests": 0, "bytes": 0, "errors": 0}
+    limits = httpx.Limits(max_connections=args.clients + 10)
+
+    async def dashboard(client: httpx.AsyncClient, offset: float) -> None:
+        await asyncio.sleep(offset)
+        end = time.perf_counter() + args.duration - offset
+        while time.perf_counter() < end:
+            round_start = time.perf_counter()
+            for path in STATS_PATHS:
+                t = time.perf_counter()
+                try:
+                    response = await client.get(path, params={"airport": AIRPORT})
+                    counters["bytes"] += len(response.content)
+                except httpx.HTTPError:
+                    counters["errors"] += 1
+                counters["requests"] += 1
+                latencies.append(time.perf_counter() - t)
+            await asyncio.sleep(max(0.0, args.poll_s - (time.perf_counter() - round_start)))
+
+    async with httpx.AsyncClient(base_url=base, timeout=120, limits=limits) as client:
+        await asyncio.gather(*(dashboard(client, i * args.poll_s / args.clients) for i in range(args.clients)))
+    return {
+        "clients": args.clients,
+        "poll_s": args.poll_s,
+        "requests": counters["requests"],
+        "errors": counters["errors"],
+        "kb_per_client": round(counters["bytes"] / args.clients / 1024, 1),
+        "response_s": {"p50": round(float(np.percentile(latencies, 50)), 3), "p95": round(float(np.percentile(latencies, 95)), 3)},
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the SSE update stream vs polling the stats endpoints.")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per run.")
+    parser.add_argument("--change-every", type=float, default=2.0, help="Seconds between ingested batches.")
+    parser.add_argument("--batch-size", type=int, default=20, help="Records per ingested batch.")
+    parser.add_argument("--stream-poll-s", type=float, default=1.0, help="STREAM_POLL_S of the API.")
+    parser.add_argument("--poll-s", type=float, default=5.0, help="Dashboard refetch interval of the polling run.")
+    parser.add_argument("--model", default="lightgbm")
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp_name:
+        tmp = Path(tmp_name)
+        shutil.copy(ROOT / "data" / "processed" / "train_table.parquet", tmp / "train_table.parquet")
+        (tmp / "models").mkdir()
+        shutil.copy(ROOT / "ml" / "artifacts" / "models" / f"{args.model}.joblib", tmp / "models")
+        (tmp / "model_selection.json").write_text(json.dumps({"selected": args.model}))
+        port = free_port()
+        proc = start_api(tmp, port, args.stream_poll_s)
+        base = f"http://127.0.0.1:{port}"
+        try:
+            results = {"stream": asyncio.run(run_stream(base, tmp, args))}
+            results["polling"] = asyncio.run(run_polling(base, args))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
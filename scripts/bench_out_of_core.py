@@ -0,0 +1,139 @@
+"""
+Benchmarks `03_train.py --out-of-core` against the in-memory LightGBM path as
+the train table grows.
+
+The real train table is tiled `--copies` times, each copy shifted by the
+table's date span, into a partitioned dataset. For every size the in-memory
+path (load, split, encode, fit) and the out-of-core path (scan, binned
+sequences, fit) each run in their own subprocess, so peak RSS is per path.
+
+Example:
+    python scripts/bench_out_of_core.py --copies 1 4 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+TRAIN_PATH = ROOT_DIR / "ml" / "pipelines" / "03_train.py"
+DEFAULT_TABLE = ROOT_DIR / "data" / "processed" / "train_table.parquet"
+METHODS = ["memory", "out_of_core"]
+
+
+def load_train() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("train", TRAIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # Registered before exec so its dataclasses can resolve their module.
+    sys.modules[spec.name] = module
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_tiled_dataset(table: Path, copies: int, root: Path) -> int:
+    """Partitioned dataset of `copies` back-to-back copies of `table`; returns its row count."""
+    sys.path.insert(0, str(ROOT_DIR / "ml"))
+    from table_io import write_partitioned_table
+
+    df = pd.read_parquet(table)
+    span = df["flight_date"].max() - df["flight_date"].min() + pd.Timedelta(days=1)
+    frames = (df.assign(flight_date=df["flight_date"] + span * copy) for copy in range(copies))
+    write_partitioned_table(frames, root)
+    return len(df) * copies
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(method: str, dataset: Path, n_estimators: int) -> Dict[str, object]:
+    module = load_train()
+    profiler = module.StageProfiler("bench_out_of_core")
+    start = time.perf_counter()
+    if method == "out_of_core":
+        args = argparse.Namespace(input=dataset, threads=None, random_state=42, n_estimators=n_estimators, ooc_holdout_months=1)
+        metrics, _ = module.train_out_of_core(args, profiler)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            df = module.load_dataset(dataset)
+            train_df, val_df, test_df = module.split_dataset(df, 0.3, 42)
+            preprocessor, features = module.build_preprocessor(df)
+            preprocessor.feature_names_in_ = features
+            module.encode_inputs(preprocessor, train_df, val_df, test_df, Path(tmp), profiler)
+            del df, train_df, val_df, test_df
+            metrics, _ = module.train_models(Path(tmp), 42, n_estimators, profiler, models=["lightgbm"])
+            metrics = metrics["lightgbm"]
+    return {
+        "method": method,
+        "wall_s": round(time.perf_counter() - start, 3),
+        "fit_s": metrics["benchmark"]["fit_s"],
+        "peak_rss_mb": round(max_rss_mb(), 1),
+        "roc_auc": round(metrics["roc_auc"], 4),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark out-of-core vs in-memory LightGBM training.")
+    parser.add_argument("--table", type=Path, default=DEFAULT_TABLE)
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    parser.add_argument("--worker", choices=METHODS, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--dataset", type=Path, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.worker:
+        row = run_worker(args.worker, args.dataset, args.n_estimators)
+        print(json.dumps(row))
+        return
+
+    results: List[Dict[str, object]] = []
+    for copies in args.copies:
+        with tempfile.TemporaryDirectory() as tmp:
+            dataset = Path(tmp) / "train_table"
+            rows = write_tiled_dataset(args.table, copies, dataset)
+            dataset_mb = sum(p.stat().st_size for p in dataset.rglob("*.parquet")) / (1024 * 1024)
+            for method in METHODS:
+                # Each worker saves its model and reports under its own working directory.
+                workdir = Path(tmp) / method
+                workdir.mkdir()
+                proc = subprocess.run(
+                    [sys.executable, str(Path(__file__).resolve()), "--worker", method, "--dataset", str(dataset), "--n-estimators", str(args.n_estimators)],
+                    capture_output=True,
+                    text=True,
+                    cwd=workdir,
+                )
+                if proc.returncode != 0:
+                    # A negative return code is the signal, e.g. -9 when the OOM killer stepped in.
+                    lines = proc.stderr.strip().splitlines()
+                    row: Dict[str, object] = {"method": method, "error": lines[-1] if lines else f"exit {proc.returncode}"}
+                else:
+                    row = json.loads(proc.stdout.strip().splitlines()[-1])
+                row.update(rows=rows, dataset_mb=round(dataset_mb, 1))
+                results.append(row)
+                print(json.dumps(row))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmarks the flights ⨝ congestion join in `ml/pipelines/03_build_train_table.py`:
+the packed-key sorted lookup against the pandas merge on object keys.
+
+Each join runs in its own subprocess so peak RSS is measured per path. The
+synthetic tables are written to parquet once and read by both workers.
+
+Example:
+    python scripts/bench_train_join.py --flights 10000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+TRAIN_TABLE_PATH = ROOT_DIR / "ml" / "pipelines" / "03_build_train_table.py"
+AIRPORTS = ["ICN", "GMP", "PUS", "CJU", "TAE", "KWJ", "CJJ", "MWX"]
+METHODS = ["merge", "packed"]
+
+
+def load_train_table() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("build_train_table", TRAIN_TABLE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_tables(n_flights: int, days: int, seed: int, numeric_features: List[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Prepared flights plus a congestion table missing ~5% of its (airport, date, hour) keys."""
+    rng = np.random.default_rng(seed)
+    n_keys = len(AIRPORTS) * days * 24
+    airport_idx = np.repeat(np.arange(len(AIRPORTS)), days * 24)
+    day = np.tile(np.repeat(np.arange(days), 24), len(AIRPORTS))
+    hour = np.tile(np.arange(24), len(AIRPORTS) * days)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(day, unit="D")
+    keep = rng.random(n_keys) >= 0.05
+    congestion = pd.DataFrame(
+        {
+            "airport_code": np.array(AIRPORTS, dtype=object)[airport_idx],
+            "airport_name_ko": np.array(AIRPORTS, dtype=object)[airport_idx],
+            "flight_date": dates,
+            "hour": pd.array(hour, dtype="Int64"),
+            "weekday": dates.weekday.astype("int32"),
+            "month": dates.month.astype("int32"),
+        }
+    )
+    for col in numeric_features:
+        values = rng.random(n_keys)
+        values[rng.random(n_keys) < 0.02] = np.nan
+        congestion[col] = values
+    congestion = congestion[keep].reset_index(drop=True)
+
+    key = rng.integers(0, n_keys, size=n_flights)
+    flight_dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(day[key], unit="D")
+    flights = pd.DataFrame(
+        {
+            "flight_date": flight_dates,
+            "scheduled_time": pd.array(hour[key] * 100 + rng.integers(0, 60, size=n_flights), dtype="Int64"),
+            "delay_label": pd.array(rng.integers(0, 2, size=n_flights), dtype="Int64"),
+            "hour": pd.array(hour[key], dtype="Int64"),
+            "weekday": flight_dates.weekday.astype("int32"),
+            "month": flight_dates.month.astype("int32"),
+            "airport_code": np.array(AIRPORTS, dtype=object)[airport_idx[key]],
+        }
+    )
+    return flights, congestion
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(method: str, flights_path: Path, congestion_path: Path) -> Dict[str, object]:
+    module = load_train_table()
+    flights = pd.read_parquet(flights_path)
+    congestion = pd.read_parquet(congestion_path)
+    loaded_mb = max_rss_mb()
+    start = time.perf_counter()
+    train = module.build_train_table(flights, congestion, index=module.congestion_index(congestion, method))
+    wall_s = time.perf_counter() - start
+    return {
+        "method": method,
+        "rows": int(len(train)),
+        "wall_s": round(wall_s, 3),
+        "peak_rss_mb": round(max_rss_mb(), 1),
+        "join_peak_mb": round(max_rss_mb() - loaded_mb, 1),
+    }
+
+
+def check_parity(module: ModuleType, flights: pd.DataFrame, congestion: pd.DataFrame) -> None:
+    expected = module.build_train_table(flights, congestion)
+    actual = module.build_train_table(flights, congestion, index=module.CongestionIndex(congestion))
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the train-table join.")
+    parser.add_argument("--flights", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check-rows", type=int, default=200_000, help="Rows used to check both joins agree.")
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON path for the results.")
+    parser.add_argument("--worker", choices=METHODS, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", type=Path, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.worker:
+        row = run_worker(args.worker, args.data_dir / "flights.parquet", args.data_dir / "congestion.parquet")
+        print(json.dumps(row))
+        return
+
+    module = load_train_table()
+    check_parity(module, *synthetic_tables(args.check_rows, args.days, args.seed, module.NUMERIC_FEATURES))
+
+    results: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        flights, congestion = synthetic_tables(args.flights, args.days, args.seed, module.NUMERIC_FEATURES)
+        flights.to_parquet(data_dir / "flights.parquet", index=False)
+        congestion.to_parquet(data_dir / "congestion.parquet", index=False)
+        del flights, congestion
+
+        for method in METHODS:
+            proc = subprocess.run(
+                [sys.executable, __file__, "--worker", method, "--data-dir", str(data_dir)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                # A negative return code is the signal, e.g. -9 when the OOM killer stepped in.
+                lines = proc.stderr.strip().splitlines()
+                row: Dict[str, object] = {"method": method, "error": lines[-1] if lines else f"exit {proc.returncode}"}
+            else:
+                row = json.loads(proc.stdout.strip().splitlines()[-1])
+            row["flights"] = args.flights
+            results.append(row)
+            print(json.dumps(row))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Long-running ingestion: polls each API source on its own interval.
+
+    python scripts/ingestion_daemon.py
+    python scripts/ingestion_daemon.py --sources kac_status icn_arrivals --interval kac_status=120
+
+Each source keeps a `SourceCursor` (`run_ingestion.py`) between polls. Its
+date parameter follows the clock, `from_time` windows resume where the last
+complete poll ended, and records delivered unchanged before are not written
+again. Cursors persist in `data/external/ingestion_state.json`, so a restart
+continues where the last run stopped. After every poll
+`data/external/ingestion_status.json` reports, per source, the last attempt
+and success, the lag since that success, how overdue the next poll is, and
+consecutive failures. Partitions of the clean store are compacted every
+`--compact-interval` seconds.
+
+SIGINT/SIGTERM let in-flight polls finish, save the cursors, mark the status
+file stopped and exit. The clock is injectable (`Clock`), so the schedule can
+be driven by a fake clock against a local stand-in server
+(`scripts/bench_ingestion_daemon.py`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+import run_ingestion
+from run_ingestion import ApiClient, RateLimiter, SourceCursor, build_session, build_specs, compact_clean, fetch_api
+
+STATE_PATH = run_ingestion.DATA_ROOT / "ingestion_state.json"
+STATUS_PATH = run_ingestion.DATA_ROOT / "ingestion_status.json"
+DEFAULT_INTERVAL_S = 600
+# A failed poll is retried after this long, or its interval if shorter.
+FAILURE_RETRY_S = 60
+# Record keys not delivered for this long are dropped from the cursors.
+SEEN_RETENTION_S = 2 * 24 * 3600
+COMPACT_INTERVAL_S = 3600
+
+
+class Clock:
+    """Wall clock; `sleep` wakes early when `stop` is set."""
+
+    def now(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float, stop: threading.Event) -> None:
+        stop.wait(max(seconds, 0.0))
+
+
+def iso(epoch: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds") if epoch is not None else None
+
+
+def write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+    os.replace(tmp, path)
+
+
+class IngestionDaemon:
+    def __init__(
+        self,
+        specs: Dict[str, Dict[str, Any]],
+        sources: List[str],
+        client: ApiClient,
+        clock: Optional[Clock] = None,
+        intervals: Optional[Dict[str, float]] = None,
+        state_path: Path = STATE_PATH,
+        status_path: Path = STATUS_PATH,
+        max_records: Optional[int] = None,
+        page_workers: int = run_ingestion.PAGE_WORKERS,
+        compact_interval_s: float = COMPACT_INTERVAL_S,
+        compact_min_files: int = run_ingestion.COMPACT_MIN_FILES,
+    ) -> None:
+        self.specs = specs
+        self.sources = sources
+        self.client = client
+        self.clock = clock or Clock()
+        self.intervals = {s: float((intervals or {}).get(s, specs[s].get("interval_s", DEFAULT_INTERVAL_S))) for s in sources}
+        self.state_path = state_path
+        self.status_path = status_path
+        self.max_records = max_records
+        self.page_workers = page_workers
+        self.compact_interval_s = compact_interval_s
+        self.compact_min_files = compact_min_files
+        self.stop = threading.Event()
+
+        state = json.loads(state_path.read_text()) if state_path.exists() else {}
+        self.cursors = {s: SourceCursor.from_dict(state.get(s, {})) for s in sources}
+        self.started_at = self.clock.now()
+        # Every source is due immediately on start.
+        self.health: Dict[str, Dict[str, Any]] = {
+            s: {"next_due": self.started_at, "last_attempt": None, "last_success": None, "consecutive_failures": 0, "last_error": None}
+            for s in sources
+        }
+        self.next_compaction = self.started_at + compact_interval_s
+        self.polls = 0
+
+    def poll(self, source: str) -> Dict[str, Any]:
+        now = self.clock.now()
+        health = self.health[source]
+        health["last_attempt"] = now
+        try:
+            result = fetch_api(
+                source,
+                self.specs[source],
+                self.max_records,
+                False,
+                self.client,
+                self.page_workers,
+                cursor=self.cursors[source],
+                epoch=now,
+            )
+        except Exception as exc:  # a poll must never take the daemon down
+            logging.exception("[%s] poll crashed", source)
+            result = {"source": source, "status": "failed", "error": str(exc)}
+        if result["status"] == "ok":
+            health.update(last_success=now, consecutive_failures=0, last_error=None, next_due=now + self.intervals[source])
+        else:
+            health["consecutive_failures"] += 1
+            health["last_error"] = result.get("error")
+            health["next_due"] = now + min(FAILURE_RETRY_S, self.intervals[source])
+        health["last_result"] = {k: result.get(k) for k in ("status", "records", "records_new", "pages", "retries", "fetch_s")}
+        self.cursors[source].prune(now - SEEN_RETENTION_S)
+        return result
+
+    def save(self, state: str = "running") -> None:
+        now = self.clock.now()
+        write_json(self.state_path, {s: cursor.to_dict() for s, cursor in self.cursors.items()})
+        sources = {}
+        for source, health in self.health.items():
+            last_success = health["last_success"]
+            sources[source] = {
+                "interval_s": self.intervals[source],
+                "last_attempt": iso(health["last_attempt"]),
+                "last_success": iso(last_success),
+                "lag_s": round(now - last_success, 1) if last_success is not None else None,
+                "next_due": iso(health["next_due"]),
+                "overdue_s": round(max(0.0, now - health["next_due"]), 1),
+                "consecutive_failures": health["consecutive_failures"],
+                "last_error": health["last_error"],
+                "window_end": self.cursors[source].window_end,
+                "tracked_keys": len(self.cursors[source].seen),
+                "last_result": health.get("last_result"),
+            }
+        write_json(
+            self.status_path,
+            {"state": state, "pid": os.getpid(), "started_at": iso(self.started_at), "updated_at": iso(now), "polls": self.polls, "sources": sources},
+        )
+
+    def run(self, max_polls: Optional[int] = None) -> None:
+        """Poll due sources until `stop` is set (or `max_polls` polls ran)."""
+        logging.info("Ingestion daemon started: %s", ", ".join(f"{s} every {self.intervals[s]:.0f}s" for s in self.sources))
+        with ThreadPoolExecutor(max_workers=len(self.sources)) as pool:
+            while not self.stop.is_set() and (max_polls is None or self.polls < max_polls):
+                now = self.clock.now()
+                due = [s for s in self.sources if self.health[s]["next_due"] <= now]
+                if not due:
+                    self.clock.sleep(min(h["next_due"] for h in self.health.values()) - now, self.stop)
+                    continue
+                list(pool.map(self.poll, due))
+                self.polls += len(due)
+                if self.clock.now() >= self.next_compaction:
+                    compact_clean(self.sources, self.compact_min_files)
+                    self.next_compaction = self.clock.now() + self.compact_interval_s
+                self.save()
+        self.save("stopped")
+        logging.info("Ingestion daemon stopped after %d polls", self.polls)
+
+
+def parse_interval(value: str) -> Tuple[str, float]:
+    source, _, seconds = value.partition("=")
+    if not seconds:
+        raise argparse.ArgumentTypeError(f"expected SOURCE=SECONDS, got {value!r}")
+    return source, float(seconds)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Poll the aviation APIs continuously.")
+    parser.add_argument("--sources", nargs="*", help="Subset of sources to poll. Default=all.")
+    parser.add_argument("--interval", type=parse_interval, action="append", default=[], help="Poll interval override, SOURCE=SECONDS.")
+    parser.add_argument("--max-records", type=int, default=None, help="Limit number of records stored per poll.")
+    parser.add_argument("--state", type=Path, default=STATE_PATH)
+    parser.add_argument("--status", type=Path, default=STATUS_PATH)
+    parser.add_argument("--max-per-host", type=int, default=run_ingestion.MAX_CONNECTIONS_PER_HOST)
+    parser.add_argument("--page-workers", type=int, default=run_ingestion.PAGE_WORKERS)
+    parser.add_argument("--rate-limit", type=float, default=run_ingestion.RATE_LIMIT, help="Requests per second per host (0 = unlimited).")
+    parser.add_argument("--retries", type=int, default=run_ingestion.RETRIES)
+    parser.add_argument("--backoff", type=float, default=run_ingestion.BACKOFF_S)
+    parser.add_argument("--compact-interval", type=float, default=COMPACT_INTERVAL_S, help="Seconds between clean store compactions.")
+    parser.add_argument("--compact-min-files", type=int, default=run_ingestion.COMPACT_MIN_FILES)
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+    args = parse_args()
+    service_key = os.getenv("API_ENCODING_KEY")
+    if not service_key:
+        raise RuntimeError("API_ENCODING_KEY env variable not set.")
+
+    # The daemon's cursors set the date parameters on every poll.
+    specs = build_specs(service_key, time.strftime("%Y%m%d"))
+    sources = []
+    for source in args.sources or list(specs):
+        if source not in specs:
+            logging.warning("Unknown source %s", source)
+        elif not specs[source]["url"]:
+            logging.warning("Source %s missing base URL; skipping", source)
+        else:
+            sources.append(source)
+    if not sources:
+        raise SystemExit("No sources to poll")
+
+    with build_session(args.max_per_host) as session:
+        client = ApiClient(session, RateLimiter(args.rate_limit or None), args.retries, args.backoff)
+        daemon = IngestionDaemon(
+            specs,
+            sources,
+            client,
+            intervals=dict(args.interval),
+            state_path=args.state,
+            status_path=args.status,
+            max_records=args.max_records,
+            page_workers=args.page_workers,
+            compact_interval_s=args.compact_interval,
+            compact_min_files=args.compact_min_files,
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: daemon.stop.set())
+        daemon.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,22 @@
 """
 Fetches data from the four public aviation APIs listed in docs/04_api_specs.md.
 
-Raw responses are stored under `data/external/api_raw/<source>/<timestamp>.json`
-and normalized tables under `data/external/api_clean/<source>/<timestamp>.parquet`.
+Raw responses are stored gzip-compressed and content-addressed under
+`data/external/api_raw/<source>/objects/<sha256[:2]>/<sha256>.json.gz`; every
+poll appends a line to `api_raw/<source>/manifest.jsonl`, and a response that
+is identical to an earlier one is recorded there without a new object.
+Normalized records are upserted by each source's primary key into the
+partitioned store `data/external/api_clean/source=<source>/date=<day>/`
+(`ml/api_store.py`); partitions that pile up `--compact-min-files` small files
+are compacted after the run, and `--compact-only` compacts without fetching.
+
+Sources are fetched concurrently over one pooled keep-alive session, with at
+most `--max-per-host` open connections per host. Paged sources report
+`totalCount` on the first page; the remaining pages are fetched in parallel
+(`--page-workers`) and merged into one clean table. Every request is paced by a
+per-host `--rate-limit` and retried with jittered exponential backoff on
+transient errors. Per-source timings, page, retry and new raw object counts
+are part of `api_ingestion_summary.json`.
 
 Example:
     python scripts/run_ingestion.py --max-records 50
@@ -11,33 +25,72 @@ Example:
 from __future__ import annotations
 
 import argparse
+import gzip
+import hashlib
 import json
 import logging
+import math
 import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
 
 import pandas as pd
 import requests
 import xmltodict
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml"))
+from api_store import (  # noqa: E402
+    COMPACT_MIN_FILES,
+    EVENT_TZ,
+    KEY_COLUMN,
+    SYSTEM_COLUMNS,
+    append_records,
+    compact,
+    prepare_records,
+)
 
 DATA_ROOT = Path("data/external")
 RAW_DIR = DATA_ROOT / "api_raw"
 CLEAN_DIR = DATA_ROOT / "api_clean"
-
-
-def utc_timestamp() -> str:
-    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-
-
-def ensure_dirs(source: str) -> tuple[Path, Path]:
+RAW_MANIFEST = "manifest.jsonl"
+RAW_OBJECTS = "objects"
+# Three of the four sources share apis.data.go.kr; the pool blocks instead of
+# opening more than this many connections to one host.
+MAX_CONNECTIONS_PER_HOST = 4
+# Distinct hosts kept in the session's pool.
+POOL_HOSTS = 8
+# Pages after the first fetched in parallel per source.
+PAGE_WORKERS = 4
+# Requests per second per host across all sources and pages.
+RATE_LIMIT = 10.0
+# Retries for connection errors, timeouts and these statuses.
+RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Base of the exponential backoff between retries.
+BACKOFF_S = 0.5
+
+_raw_manifest_lock = threading.Lock()
+
+
+def utc_timestamp(epoch: Optional[float] = None) -> str:
+    moment = datetime.fromtimestamp(epoch, timezone.utc) if epoch is not None else datetime.now(timezone.utc)
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def ensure_raw_dir(source: str) -> Path:
     raw_path = RAW_DIR / source
-    clean_path = CLEAN_DIR / source
     raw_path.mkdir(parents=True, exist_ok=True)
-    clean_path.mkdir(parents=True, exist_ok=True)
-    return raw_path, clean_path
+    return raw_path
 
 
 def parse_records(payload: Any, record_path: Iterable[str]) -> List[Dict[str, Any]]:
@@ -64,61 +117,337 @@ def parse_records(payload: Any, record_path: Iterable[str]) -> List[Dict[str, An
     return normalized
 
 
-def write_raw(source: str, timestamp: str, payload: Any) -> Path:
-    raw_dir, _ = ensure_dirs(source)
-    raw_path = raw_dir / f"{timestamp}.json"
-    with raw_path.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
-    return raw_path
-
-
-def write_clean(source: str, timestamp: str, records: List[Dict[str, Any]]) -> Path:
-    _, clean_dir = ensure_dirs(source)
-    df = pd.DataFrame(records) if records else pd.DataFrame([{"empty": True}])
-    df["source"] = source
-    df["fetched_at"] = timestamp
-    clean_path = clean_dir / f"{timestamp}.parquet"
-    df.to_parquet(clean_path, index=False)
-    return clean_path
-
-
-def fetch_api(name: str, spec: Dict[str, Any], max_records: Optional[int], dry_run: bool) -> Dict[str, Any]:
-    timestamp = utc_timestamp()
+def raw_object_path(source: str, digest: str) -> Path:
+    return RAW_DIR / source / RAW_OBJECTS / digest[:2] / f"{digest}.json.gz"
+
+
+def write_raw(source: str, timestamp: str, payload: Any, page: int = 1) -> Dict[str, Any]:
+    """Store `payload` once per distinct content and record the poll in the manifest.
+
+    The hash is taken over compact, key-sorted JSON, so the same response
+    always maps to the same object whatever its key order.
+    """
+    raw_dir = ensure_raw_dir(source)
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()
+    object_path = raw_object_path(source, digest)
+    new = not object_path.exists()
+    if new:
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = object_path.with_name(f"{object_path.name}.{threading.get_ident()}.tmp")
+        # mtime=0 keeps the compressed bytes a function of the payload alone.
+        tmp_path.write_bytes(gzip.compress(body, mtime=0))
+        os.replace(tmp_path, object_path)
+    entry = {"fetched_at": timestamp, "page": page, "sha256": digest, "bytes": len(body), "new": new}
+    with _raw_manifest_lock, (raw_dir / RAW_MANIFEST).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def read_raw(source: str, digest: str) -> Any:
+    return json.loads(gzip.decompress(raw_object_path(source, digest).read_bytes()))
+
+
+def iter_raw(source: str) -> Iterator[Tuple[Dict[str, Any], Any]]:
+    """(manifest entry, payload) for every recorded poll of `source`, oldest first.
+
+    Each distinct object is decompressed once; polls that returned the same
+    response share one payload object, so callers must not mutate it.
+    """
+    manifest = RAW_DIR / source / RAW_MANIFEST
+    if not manifest.exists():
+        return
+    payloads: Dict[str, Any] = {}
+    with manifest.open(encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            digest = entry["sha256"]
+            if digest not in payloads:
+                payloads[digest] = read_raw(source, digest)
+            yield entry, payloads[digest]
+
+
+@dataclass
+class SourceCursor:
+    """Incremental position of one source, kept by the ingestion daemon between polls.
+
+    `window_end` is the local time the last complete poll covered; sources
+    with a `cursor.from_param` only ask for what follows it (less
+    `overlap_min`). `seen` maps each record key to the digest of its fields
+    and the epoch it was last delivered, so unchanged records are dropped
+    before they reach the clean store.
+    """
+
+    window_end: Optional[str] = None
+    seen: Dict[str, List[Any]] = field(default_factory=dict)
+
+    def window_params(self, spec: Dict[str, Any], params: Dict[str, Any], now: pd.Timestamp) -> Dict[str, Any]:
+        config = spec.get("cursor", {})
+        params = dict(params)
+        if "date_param" in config:
+            params[config["date_param"]] = now.strftime(config.get("date_format", "%Y%m%d"))
+        if "from_param" in config:
+            start = now.normalize()
+            if self.window_end is not None:
+                # Re-read the overlap for late updates, but never before today.
+                start = max(start, pd.Timestamp(self.window_end) - pd.Timedelta(minutes=config.get("overlap_min", 60)))
+            params[config["from_param"]] = start.strftime(config.get("time_format", "%H%M"))
+        return params
+
+    def select(self, frame: pd.DataFrame, epoch: float) -> pd.DataFrame:
+        """Rows that are new or changed since they were last seen; records them as seen."""
+        if frame.empty:
+            return frame
+        fields = [c for c in frame.columns if c not in SYSTEM_COLUMNS]
+        digests = pd.util.hash_pandas_object(frame[fields], index=False).astype(str).tolist()
+        keep = []
+        for key, digest in zip(frame[KEY_COLUMN].tolist(), digests):
+            previous = self.seen.get(key)
+            keep.append(previous is None or previous[0] != digest)
+            self.seen[key] = [digest, epoch]
+        return frame[keep]
+
+    def prune(self, before_epoch: float) -> None:
+        self.seen = {key: value for key, value in self.seen.items() if value[1] >= before_epoch}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window_end": self.window_end, "seen": self.seen}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SourceCursor":
+        return cls(window_end=data.get("window_end"), seen=dict(data.get("seen", {})))
+
+
+def write_clean(
+    source: str,
+    timestamp: str,
+    records: List[Dict[str, Any]],
+    spec: Dict[str, Any],
+    cursor: Optional[SourceCursor] = None,
+    epoch: Optional[float] = None,
+) -> int:
+    """Upsert records into the partitioned clean store; returns the rows written.
+
+    With a cursor, records delivered unchanged by an earlier poll are skipped.
+    """
+    frame = prepare_records(records, timestamp, spec.get("primary_key"), spec.get("event_time"))
+    if cursor is not None:
+        frame = cursor.select(frame, epoch if epoch is not None else time.time())
+    append_records(CLEAN_DIR, source, frame)
+    return len(frame)
+
+
+def build_session(max_per_host: int = MAX_CONNECTIONS_PER_HOST) -> requests.Session:
+    """Keep-alive session shared by all fetch threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=max_per_host, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimiter:
+    """Spaces requests to each host at least `1 / rate` seconds apart, across threads."""
+
+    def __init__(self, rate: Optional[float]) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+@dataclass
+class ApiClient:
+    """Rate-limited GET with retries, shared by every source and page."""
+
+    session: requests.Session
+    limiter: RateLimiter
+    retries: int = RETRIES
+    backoff_s: float = BACKOFF_S
+
+    def get_payload(self, url: str, params: Dict[str, Any], timeout: float, fmt: str) -> Tuple[Any, int]:
+        """Parsed payload and the number of retries it took."""
+        attempt = 0
+        while True:
+            self.limiter.wait(url)
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    payload = response.json() if fmt == "json" else xmltodict.parse(response.text)
+                    return payload, attempt
+                error: Exception = requests.HTTPError(f"{response.status_code} {response.reason}", response=response)
+                retry_after = response.headers.get("Retry-After", "")
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error, retry_after = exc, ""
+            if attempt == self.retries:
+                raise error
+            # Exponential backoff with full jitter, unless the server says how long to wait.
+            delay = float(retry_after) if retry_after.isdigit() else random.uniform(0, self.backoff_s * 2**attempt)
+            attempt += 1
+            logging.warning("%s failed (%s); retry %d/%d in %.2fs", url, error, attempt, self.retries, delay)
+            time.sleep(delay)
+
+
+def total_count(payload: Any, total_path: Iterable[str]) -> Optional[int]:
+    data = payload
+    for key in total_path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    try:
+        return int(data)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_api(
+    name: str,
+    spec: Dict[str, Any],
+    max_records: Optional[int],
+    dry_run: bool,
+    client: ApiClient,
+    page_workers: int = PAGE_WORKERS,
+    cursor: Optional[SourceCursor] = None,
+    epoch: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Fetch every page of one source and store it.
+
+    `epoch` stands in for the current time (the daemon's clock); with a
+    `cursor`, the query window follows it and only new or changed records are
+    written, and the cursor's window advances when every page arrived.
+    """
+    epoch = epoch if epoch is not None else time.time()
+    timestamp = utc_timestamp(epoch)
     if dry_run:
         fake_payload = {"meta": {"dry_run": True}, "items": [{"message": f"{name}-sample", "ts": timestamp}]}
         write_raw(name, timestamp, fake_payload)
-        write_clean(name, timestamp, fake_payload["items"])
+        write_clean(name, timestamp, fake_payload["items"], {})
         logging.info("[%s] dry-run → stored placeholder entries", name)
         return {"source": name, "status": "dry-run", "records": len(fake_payload["items"])}
 
     params = spec.get("params", {}).copy()
+    now = pd.Timestamp(epoch, unit="s", tz="UTC").tz_convert(EVENT_TZ).tz_localize(None)
+    if cursor is not None:
+        params = cursor.window_params(spec, params, now)
     if max_records:
         if "numOfRows" in params:
-            params["numOfRows"] = max_records
+            params["numOfRows"] = min(int(params["numOfRows"]), max_records)
         elif "size" in params:
             params["size"] = max_records
+    fmt = spec.get("format", "xml")
+    timeout = spec.get("timeout", 30)
+    record_path = spec.get("record_path", [])
 
+    start = time.perf_counter()
     try:
-        response = requests.get(spec["url"], params=params, timeout=spec.get("timeout", 30))
-        response.raise_for_status()
-        text = response.text
-        if spec.get("format", "xml") == "json":
-            payload = response.json()
-        else:
-            payload = xmltodict.parse(text)
+        payload, retries = client.get_payload(spec["url"], params, timeout, fmt)
     except Exception as exc:
         logging.error("[%s] request failed: %s", name, exc)
         payload = {"error": str(exc)}
         write_raw(name, timestamp, payload)
-        return {"source": name, "status": "failed", "error": str(exc)}
+        return {"source": name, "status": "failed", "error": str(exc), "fetch_s": round(time.perf_counter() - start, 3)}
+    raw_new = int(write_raw(name, timestamp, payload)["new"])
+    records = parse_records(payload, record_path)
+
+    # Paged sources report totalCount on every page; fetch the rest in parallel.
+    total = total_count(payload, spec.get("total_path", [])) if "pageNo" in params else None
+    wanted = min(total, max_records) if total is not None and max_records else total
+    page_size = int(params.get("numOfRows", 0)) or len(records)
+    pages = max(1, math.ceil(wanted / page_size)) if wanted and page_size else 1
+    status, error = "ok", None
+
+    def fetch_page(page: int) -> Tuple[Any, int]:
+        return client.get_payload(spec["url"], {**params, "pageNo": page}, timeout, fmt)
+
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=min(page_workers, pages - 1)) as pool:
+            futures = [pool.submit(fetch_page, page) for page in range(2, pages + 1)]
+            # Pages are merged in order; a failed page leaves the source partial.
+            for page, future in enumerate(futures, start=2):
+                try:
+                    page_payload, page_retries = future.result()
+                except Exception as exc:
+                    logging.error("[%s] page %d failed: %s", name, page, exc)
+                    status, error = "partial", f"page {page}: {exc}"
+                    continue
+                retries += page_retries
+                raw_new += write_raw(name, timestamp, page_payload, page=page)["new"]
+                records.extend(parse_records(page_payload, record_path))
+    fetch_s = round(time.perf_counter() - start, 3)
 
-    write_raw(name, timestamp, payload)
-    records = parse_records(payload, spec.get("record_path", []))
     if max_records and len(records) > max_records:
         records = records[:max_records]
-    write_clean(name, timestamp, records)
-    logging.info("[%s] stored %d records", name, len(records))
-    return {"source": name, "status": "ok", "records": len(records)}
+    # Request params the records themselves lack, e.g. the service date.
+    for param in spec.get("context_params", []):
+        for record in records:
+            record.setdefault(param, params[param])
+    records_new = write_clean(name, timestamp, records, spec, cursor, epoch)
+    if cursor is not None and status == "ok":
+        cursor.window_end = now.isoformat()
+    logging.info("[%s] stored %d of %d records from %d page(s) (fetch %.2fs)", name, records_new, len(records), pages, fetch_s)
+    result = {
+        "source": name,
+        "status": status,
+        "records": len(records),
+        "records_new": records_new,
+        "total_count": total,
+        "pages": pages,
+        "retries": retries,
+        "raw_new": raw_new,
+        "fetch_s": fetch_s,
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def ingest(
+    specs: Dict[str, Dict[str, Any]],
+    sources: List[str],
+    max_records: Optional[int],
+    dry_run: bool,
+    workers: Optional[int] = None,
+    max_per_host: int = MAX_CONNECTIONS_PER_HOST,
+    page_workers: int = PAGE_WORKERS,
+    rate_limit: Optional[float] = RATE_LIMIT,
+    retries: int = RETRIES,
+    backoff_s: float = BACKOFF_S,
+) -> List[Dict[str, Any]]:
+    """Fetch `sources` concurrently; results keep the order of `sources`."""
+    runnable = []
+    for source in sources:
+        spec = specs.get(source)
+        if not spec:
+            logging.warning("Unknown source %s", source)
+            continue
+        if not spec["url"]:
+            logging.warning("Source %s missing base URL; skipping", source)
+            continue
+        runnable.append(source)
+    if not runnable:
+        return []
+
+    def run(source: str, client: ApiClient) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = fetch_api(source, specs[source], max_records, dry_run, client, page_workers)
+        # Includes time spent waiting for a pooled connection and writing files.
+        result["elapsed_s"] = round(time.perf_counter() - start, 3)
+        return result
+
+    with build_session(max_per_host) as session, ThreadPoolExecutor(max_workers=workers or len(runnable)) as pool:
+        client = ApiClient(session, RateLimiter(rate_limit), retries, backoff_s)
+        return list(pool.map(lambda source: run(source, client), runnable))
 
 
 def build_specs(service_key: str, today: str) -> Dict[str, Dict[str, Any]]:
@@ -135,6 +464,14 @@ def build_specs(service_key: str, today: str) -> Dict[str, Dict[str, Any]]:
                 "_type": "json",
             },
             "record_path": ["response", "body", "items", "item"],
+            "total_path": ["response", "body", "totalCount"],
+            # Items carry the flight and HHMM schedule time but not the day.
+            "context_params": ["schDate"],
+            "primary_key": ["schDate", "airFln", "std"],
+            "event_time": {"fields": ["schDate", "std"], "format": "%Y%m%d%H%M"},
+            # Daemon mode: poll interval and how the cursor moves the query.
+            "interval_s": 300,
+            "cursor": {"date_param": "schDate"},
         },
         "molit_domestic": {
             "url": os.getenv("API_MOLIT_BASE_URL", ""),
@@ -149,6 +486,11 @@ def build_specs(service_key: str, today: str) -> Dict[str, Dict[str, Any]]:
                 "_type": "json",
             },
             "record_path": ["response", "body", "items", "item"],
+            "total_path": ["response", "body", "totalCount"],
+            "primary_key": ["vihicleId", "depPlandTime"],
+            "event_time": {"fields": ["depPlandTime"], "format": "%Y%m%d%H%M"},
+            "interval_s": 900,
+            "cursor": {"date_param": "depPlandTime"},
         },
         "icn_passenger": {
             "url": os.getenv("API_ICN_PASSENGER_BASE_URL", ""),
@@ -161,6 +503,12 @@ def build_specs(service_key: str, today: str) -> Dict[str, Dict[str, Any]]:
                 "_type": "json",
             },
             "record_path": ["response", "body", "items", "item"],
+            "total_path": ["response", "body", "totalCount"],
+            # One row per day and hourly slot.
+            "primary_key": ["adate", "atime"],
+            "event_time": {"fields": ["adate"], "format": "%Y%m%d"},
+            # A whole-day forecast that is revised in place.
+            "interval_s": 1800,
         },
         "icn_arrivals": {
             "url": os.getenv("API_ICN_ARRIVAL_BASE_URL", ""),
@@ -173,15 +521,40 @@ def build_specs(service_key: str, today: str) -> Dict[str, Dict[str, Any]]:
                 "_type": "json",
             },
             "record_path": ["response", "body", "items", "item"],
+            "total_path": ["response", "body", "totalCount"],
+            # A flight's board entry, revised in place as its status changes.
+            "primary_key": ["flightId", "scheduleDateTime"],
+            "event_time": {"fields": ["scheduleDateTime"], "format": "%Y%m%d%H%M"},
+            "interval_s": 300,
+            "cursor": {"from_param": "from_time", "overlap_min": 60},
         },
     }
 
 
+def compact_clean(sources: Optional[List[str]], min_files: int) -> None:
+    start = time.perf_counter()
+    results = compact(CLEAN_DIR, sources, min_files=min_files)
+    for row in results:
+        logging.info(
+            "[%s] compacted %s: %d files, %d → %d rows", row["source"], row["partition"], row["files_in"], row["rows_in"], row["rows_out"]
+        )
+    if results:
+        logging.info("Compacted %d partitions in %.2fs", len(results), time.perf_counter() - start)
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Ingest external aviation APIs.")
     parser.add_argument("--max-records", type=int, default=None, help="Limit number of records stored per API.")
     parser.add_argument("--dry-run", action="store_true", help="Skip HTTP calls and create placeholder files.")
     parser.add_argument("--sources", nargs="*", help="Subset of sources to fetch. Default=all.")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent fetches (default: one per source).")
+    parser.add_argument("--max-per-host", type=int, default=MAX_CONNECTIONS_PER_HOST, help="Pooled connections per host.")
+    parser.add_argument("--page-workers", type=int, default=PAGE_WORKERS, help="Parallel page fetches per source.")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT, help="Requests per second per host (0 = unlimited).")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Retries per request on transient errors.")
+    parser.add_argument("--backoff", type=float, default=BACKOFF_S, help="Base backoff in seconds, doubled per retry.")
+    parser.add_argument("--compact-min-files", type=int, default=COMPACT_MIN_FILES, help="Compact clean partitions with at least this many files.")
+    parser.add_argument("--compact-only", action="store_true", help="Compact every clean partition with more than one file, without fetching.")
     return parser.parse_args()
 
 
@@ -189,6 +562,9 @@ def main() -> None:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     load_dotenv()
     args = parse_args()
+    if args.compact_only:
+        compact_clean(args.sources, min_files=2)
+        return
     service_key = os.getenv("API_ENCODING_KEY")
     if not service_key and not args.dry_run:
         raise RuntimeError("API_ENCODING_KEY env variable not set. Use --dry-run for offline testing.")
@@ -197,22 +573,26 @@ def main() -> None:
     specs = build_specs(service_key or "dry-run", today)
     sources = args.sources or list(specs.keys())
 
-    summary = []
-    for source in sources:
-        spec = specs.get(source)
-        if not spec:
-            logging.warning("Unknown source %s", source)
-            continue
-        if not spec["url"]:
-            logging.warning("Source %s missing base URL; skipping", source)
-            continue
-        result = fetch_api(source, spec, args.max_records, args.dry_run)
-        summary.append(result)
+    start = time.perf_counter()
+    summary = ingest(
+        specs,
+        sources,
+        args.max_records,
+        args.dry_run,
+        workers=args.workers,
+        max_per_host=args.max_per_host,
+        page_workers=args.page_workers,
+        rate_limit=args.rate_limit or None,
+        retries=args.retries,
+        backoff_s=args.backoff,
+    )
+    logging.info("Fetched %d sources in %.2fs", len(summary), time.perf_counter() - start)
 
     summary_path = DATA_ROOT / "api_ingestion_summary.json"
     summary_path.parent.mkdir(parents=True, exist_ok=True)
     summary_path.write_text(json.dumps(summary, indent=2, ensure_ascii=False))
     logging.info("Summary written to %s", summary_path)
+    compact_clean([row["source"] for row in summary], args.compact_min_files)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,307 @@
+"""
+Runs the ML pipeline stages declared in `ml/configs/pipeline.yaml` as a DAG.
+
+Each stage declares its script, args, input paths (`deps`) and output paths
+(`outs`). The runner records in a manifest a key per stage: the SHA-256 over
+the script, its args and the content hashes of its deps. A stage is skipped
+when its key and its outs match the last successful run, so only work
+downstream of a real change is repeated. Stages with no path between them (e.g.
+KAC workbook parsing and flight labeling) run concurrently.
+
+Examples:
+    python scripts/run_pipeline.py                     # everything that is stale
+    python scripts/run_pipeline.py build_train_table   # a stage and its upstream
+    python scripts/run_pipeline.py --dry-run
+    python scripts/run_pipeline.py train --force --jobs 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import logging
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_CONFIG = ROOT_DIR / "ml" / "configs" / "pipeline.yaml"
+MANIFEST_VERSION = 1
+GLOB_CHARS = set("*?[")
+LOG_TAIL_LINES = 20
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    args: List[str] = field(default_factory=list)
+    deps: List[str] = field(default_factory=list)
+    outs: List[str] = field(default_factory=list)
+    upstream: Set[str] = field(default_factory=set)
+
+
+def load_stages(config: Dict[str, Any]) -> Dict[str, Stage]:
+    stages = {
+        name: Stage(
+            name=name,
+            script=spec["script"],
+            args=[str(arg) for arg in spec.get("args", [])],
+            deps=list(spec.get("deps", [])),
+            outs=list(spec.get("outs", [])),
+        )
+        for name, spec in config["stages"].items()
+    }
+    producers: Dict[str, str] = {}
+    for stage in stages.values():
+        for out in stage.outs:
+            if out in producers:
+                raise ValueError(f"{out} is produced by both {producers[out]} and {stage.name}")
+            producers[out] = stage.name
+    for stage in stages.values():
+        for dep in stage.deps:
+            for out, producer in producers.items():
+                if producer != stage.name and (
+                    fnmatch.fnmatch(out, dep) or dep == out or dep.startswith(out.rstrip("/") + "/")
+                ):
+                    stage.upstream.add(producer)
+    topological_order(stages)
+    return stages
+
+
+def topological_order(stages: Dict[str, Stage]) -> List[str]:
+    order: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline has a cycle through {name}")
+        visiting.add(name)
+        for upstream in sorted(stages[name].upstream):
+            visit(upstream)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def select_stages(stages: Dict[str, Stage], targets: List[str]) -> Set[str]:
+    """Targets plus everything upstream of them (all stages when no targets)."""
+    if not targets:
+        return set(stages)
+    unknown = [name for name in targets if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+    selected: Set[str] = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(stages[name].upstream)
+    return selected
+
+
+class ContentHasher:
+    """SHA-256 of files and directories, memoized by (size, mtime) in the manifest."""
+
+    def __init__(self, cache: Dict[str, Dict[str, Any]]) -> None:
+        self.cache = cache
+
+    def file(self, path: Path) -> str:
+        stat = path.stat()
+        rel = str(path.relative_to(ROOT_DIR))
+        entry = self.cache.get(rel)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.cache[rel] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def path(self, path: Path) -> Optional[str]:
+        if path.is_file():
+            return self.file(path)
+        if path.is_dir():
+            digest = hashlib.sha256()
+            for child in sorted(p for p in path.rglob("*") if p.is_file()):
+                digest.update(f"{child.relative_to(path)}\0{self.file(child)}\n".encode())
+            return digest.hexdigest()
+        return None
+
+    def pattern(self, pattern: str) -> Dict[str, Optional[str]]:
+        if GLOB_CHARS & set(pattern):
+            return {str(p.relative_to(ROOT_DIR)): self.path(p) for p in sorted(ROOT_DIR.glob(pattern))}
+        return {pattern: self.path(ROOT_DIR / pattern)}
+
+
+def stage_key(stage: Stage, common_deps: List[str], hasher: ContentHasher) -> str:
+    inputs: Dict[str, Optional[str]] = {}
+    for pattern in [stage.script, *common_deps, *stage.deps]:
+        inputs.update(hasher.pattern(pattern))
+    payload = json.dumps({"script": stage.script, "args": stage.args, "inputs": inputs}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def output_hashes(stage: Stage, hasher: ContentHasher) -> Dict[str, Optional[str]]:
+    return {out: hasher.path(ROOT_DIR / out) for out in stage.outs}
+
+
+def is_fresh(stage: Stage, key: str, record: Optional[Dict[str, Any]], hasher: ContentHasher) -> bool:
+    if not record or record.get("key") != key:
+        return False
+    outs = output_hashes(stage, hasher)
+    return all(digest is not None for digest in outs.values()) and outs == record.get("outs")
+
+
+def read_manifest(path: Path) -> Dict[str, Any]:
+    if path.exists():
+        try:
+            manifest = json.loads(path.read_text())
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except ValueError:
+            logging.warning("Ignoring unreadable pipeline manifest %s", path)
+    return {"version": MANIFEST_VERSION, "files": {}, "stages": {}}
+
+
+def write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False))
+    tmp_path.replace(path)
+
+
+def run_stage(stage: Stage, log_dir: Path) -> tuple[int, float, Path]:
+    log_path = log_dir / f"{stage.name}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with log_path.open("w") as log:
+        proc = subprocess.run(
+            [sys.executable, stage.script, *stage.args],
+            cwd=ROOT_DIR,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return proc.returncode, time.perf_counter() - start, log_path
+
+
+def log_tail(path: Path) -> str:
+    lines = path.read_text(errors="replace").splitlines()
+    return "\n".join(lines[-LOG_TAIL_LINES:])
+
+
+def run_pipeline(
+    config: Dict[str, Any],
+    targets: List[str],
+    jobs: int = 2,
+    force: bool = False,
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    """Run the selected stages; returns each stage's status.
+
+    Hashing and manifest updates happen on this thread; workers only run the
+    stage subprocesses. A stage's key is computed when all of its upstream
+    stages have finished, so it sees their fresh outputs.
+    """
+    stages = load_stages(config)
+    selected = select_stages(stages, targets)
+    forced = set(targets or stages) if force else set()
+    manifest_path = ROOT_DIR / config.get("manifest", "data/pipeline_manifest.json")
+    log_dir = ROOT_DIR / config.get("log_dir", "logs/pipeline")
+    common_deps = list(config.get("common_deps", []))
+
+    manifest = read_manifest(manifest_path)
+    hasher = ContentHasher(manifest["files"])
+    status: Dict[str, str] = {}
+    keys: Dict[str, str] = {}
+    running: Dict[Future, str] = {}
+    pending = [name for name in topological_order(stages) if name in selected]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for name in list(pending):
+                upstream = stages[name].upstream & selected
+                if any(status.get(up) in ("failed", "blocked") for up in upstream):
+                    status[name] = "blocked"
+                    pending.remove(name)
+                    continue
+                if not all(up in status for up in upstream):
+                    continue
+                pending.remove(name)
+                if dry_run and any(status[up] == "would run" for up in upstream):
+                    status[name] = "would run"
+                    continue
+                keys[name] = stage_key(stages[name], common_deps, hasher)
+                if name not in forced and is_fresh(stages[name], keys[name], manifest["stages"].get(name), hasher):
+                    status[name] = "skipped"
+                    logging.info("[%s] up to date; skipping", name)
+                elif dry_run:
+                    status[name] = "would run"
+                else:
+                    logging.info("[%s] running %s %s", name, stages[name].script, " ".join(stages[name].args))
+                    running[pool.submit(run_stage, stages[name], log_dir)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                returncode, seconds, log_path = future.result()
+                if returncode != 0:
+                    status[name] = "failed"
+                    logging.error("[%s] failed (exit %d); last lines of %s:\n%s", name, returncode, log_path, log_tail(log_path))
+                    continue
+                status[name] = "ran"
+                manifest["stages"][name] = {
+                    "key": keys[name],
+                    "outs": output_hashes(stages[name], hasher),
+                    "seconds": round(seconds, 2),
+                    "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                }
+                write_manifest(manifest_path, manifest)
+                logging.info("[%s] done in %.1fs → %s", name, seconds, log_path)
+
+    if not dry_run:
+        write_manifest(manifest_path, manifest)
+    return status
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the ML pipeline stages that are out of date.")
+    parser.add_argument("stages", nargs="*", help="Stages to bring up to date (default: all).")
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG)
+    parser.add_argument("--jobs", type=int, default=2, help="Stages run concurrently.")
+    parser.add_argument("--force", action="store_true", help="Re-run the named stages (all with no names) even if fresh.")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would run without running it.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    config = yaml.safe_load(args.config.read_text())
+    status = run_pipeline(config, args.stages, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    for name, state in status.items():
+        logging.info("%-18s %s", name, state)
+    if any(state in ("failed", "blocked") for state in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()